@@ -0,0 +1,90 @@
+"""Compare the intersection detection engine with the former Counter based implementation, and time the whole
+topology cleaning stage using it (intersections lookup and lines splitting) on a synthetic network
+
+Run it from the repository root:
+    python -m benchmarks.bench_intersections --ways 50000 --network planar --scale 20000
+"""
+import argparse
+import itertools
+import time
+from collections import Counter
+from typing import List, Set, Tuple
+
+import numpy as np
+
+from benchmarks.synthetic import GENERATORS
+from osmrx.data_processing.overpass_data_builder import OverpassDataBuilder
+from osmrx.helpers.logger import Logger
+from osmrx.helpers.misc import quantize_coordinates
+from osmrx.topology.cleaner import TopologyCleaner
+from osmrx.topology.intersections import IntersectionIndex
+
+
+def build_ways(nb_ways: int, max_vertices: int, seed: int = 0) -> List[List[Tuple[float, float]]]:
+    """Build random ways sharing their end points, rounded at the OSM precision"""
+    rng = np.random.default_rng(seed)
+    ways = []
+    for _ in range(nb_ways):
+        nb_vertices = rng.integers(2, max_vertices)
+        coordinates = np.round(rng.random((nb_vertices, 2)) * 0.1 + [4.0, 46.0], 7)
+        ways.append(list(map(tuple, coordinates.tolist())))
+
+    for way, next_way in zip(ways[::2], ways[1::2]):
+        way[0] = next_way[-1]
+    return ways
+
+
+def counter_intersections(ways: List[List[Tuple[float, float]]]) -> Set[Tuple[float, float]]:
+    """The former implementation"""
+    all_coord_points = Counter(itertools.chain.from_iterable(ways))
+    return {coordinates for coordinates, count in all_coord_points.items() if count >= 2}
+
+
+def cleaning_stage(network: str, scale: int, repeat: int) -> float:
+    """Return the best duration of the topology cleaning stage on a synthetic network"""
+    logger = Logger(logger_level="warning").logger
+    elements = GENERATORS[network](scale)
+    durations = []
+    for _ in range(repeat):
+        line_features = OverpassDataBuilder(elements).line_features()
+        start = time.perf_counter()
+        arc_features = list(TopologyCleaner(logger, line_features, None).build_arc_features())
+        durations.append(time.perf_counter() - start)
+    print(f"cleaning: {min(durations) * 1000:.1f} ms ({network} network, {len(elements)} ways, "
+          f"{len(arc_features)} lines built)")
+    return min(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ways", type=int, default=50000)
+    parser.add_argument("--max-vertices", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--network", choices=list(GENERATORS), default="planar")
+    parser.add_argument("--scale", type=int, default=20000,
+                        help="ways by direction (grid), nodes (planar) or ways (rural)")
+    args = parser.parse_args()
+
+    ways = build_ways(args.ways, args.max_vertices)
+    print(f"{args.ways} ways, {sum(map(len, ways))} vertices")
+
+    timings = {}
+    for name, func in [("counter", counter_intersections), ("numpy", IntersectionIndex.from_ways)]:
+        durations = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = func(ways)
+            durations.append(time.perf_counter() - start)
+        timings[name] = min(durations)
+        print(f"{name:>8}: {timings[name] * 1000:.1f} ms ({len(result)} intersections)")
+
+    expected = np.sort(quantize_coordinates(list(counter_intersections(ways))))
+    assert np.array_equal(expected, IntersectionIndex.from_ways(ways).keys), "Results are different!"
+    print(f"speedup: x{timings['counter'] / timings['numpy']:.2f}")
+
+    # the detection is a part of the cleaning stage only: the lines lookup and split are timed with it
+    cleaning_stage(args.network, args.scale, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
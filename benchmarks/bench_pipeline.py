@@ -0,0 +1,165 @@
+"""Run the whole pipeline on synthetic OSM-like data (see benchmarks.synthetic), offline, and record the time and
+the peak memory of each stage: overpass data building, topology cleaning, graph building, shortest paths and
+isochrones.
+
+The results are written as JSON, and compared to a baseline (a former result file) if set: the stages slower or
+using more memory than the baseline, beyond the tolerance, are reported and the exit code is 1.
+
+Run it from the repository root:
+    python -m benchmarks.bench_pipeline --network grid --scale 60 --output results.json
+    python -m benchmarks.bench_pipeline --network grid --scale 60 --baseline results.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from benchmarks.synthetic import GENERATORS, nodes_elements
+from osmrx.data_processing.overpass_data_builder import OverpassDataBuilder
+from osmrx.globals.queries import OsmFeatureModes
+from osmrx.helpers.logger import Logger
+from osmrx.network.network_rx import OsmNetworkManager
+from osmrx.topology.cleaner import TopologyCleaner
+
+
+def measure(run: Callable[[Any], Any], setup: Callable[[], Any] = lambda: None, repeat: int = 1,
+            memory: bool = True) -> Dict[str, float]:
+    """Return the best duration (seconds) of a stage, and its peak memory (MB) measured on an extra run (tracemalloc
+    slows down the run, and traces the python and numpy allocations only, not the GEOS ones). setup builds the stage
+    input, out of the measures: the stages may consume it"""
+    durations = []
+    for _ in range(repeat):
+        stage_input = setup()
+        start = time.perf_counter()
+        run(stage_input)
+        durations.append(time.perf_counter() - start)
+    result = {"seconds": min(durations)}
+
+    if memory:
+        stage_input = setup()
+        tracemalloc.start()
+        try:
+            run(stage_input)
+            result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_pipeline(network: str, scale: int, mode: OsmFeatureModes, nb_connected_nodes: int, nb_routes: int,
+                 nb_isochrones: int, repeat: int = 1, memory: bool = True, seed: int = 0) -> Dict[str, Any]:
+    """Run each stage on the synthetic data and return their measures"""
+    logger = Logger(logger_level="warning").logger
+    elements = GENERATORS[network](scale, seed=seed)
+    nodes = nodes_elements(elements, nb_connected_nodes, seed=seed)
+    stages = {}
+
+    def build_features():
+        return OverpassDataBuilder(elements).line_features(), OverpassDataBuilder(nodes).point_features()
+
+    stages["overpass_data_builder"] = measure(lambda _: build_features(), repeat=repeat, memory=memory)
+    stages["topology_cleaner"] = measure(
+        lambda features: list(TopologyCleaner(logger, *features).build_arc_features()), build_features,
+        repeat=repeat, memory=memory,
+    )
+
+    def build_network(features):
+        network_manager = OsmNetworkManager(mode, logger=logger)
+        network_manager.connected_nodes = features[1]
+        network_manager.line_features = features[0]
+        return network_manager
+
+    stages["network_build"] = measure(build_network, build_features, repeat=repeat, memory=memory)
+    network_manager = build_network(build_features())
+
+    rng = np.random.default_rng(seed)
+    graph_nodes = network_manager.graph.nodes()
+    routes = [(graph_nodes[from_position], graph_nodes[to_position])
+              for from_position, to_position in rng.integers(0, len(graph_nodes), (nb_routes, 2)).tolist()]
+    sources = [graph_nodes[position] for position in rng.integers(0, len(graph_nodes), nb_isochrones).tolist()]
+
+    def shortest_paths(_):
+        # the path geometries are built, as returned to the users
+        return [path.path for from_node, to_node in routes
+                for path in network_manager.compute_shortest_path(from_node, to_node)]
+
+    def isochrones(_):
+        return [network_manager.compute_isochrone_from_distance(source, [0, 250, 500, 1000]).data
+                for source in sources]
+
+    stages["shortest_paths"] = measure(shortest_paths, repeat=repeat, memory=memory)
+    stages["isochrones"] = measure(isochrones, repeat=repeat, memory=memory)
+
+    return {
+        "parameters": {"network": network, "scale": scale, "mode": mode.value,
+                       "connected_nodes": nb_connected_nodes, "routes": nb_routes, "isochrones": nb_isochrones,
+                       "seed": seed},
+        "data": {"ways": len(elements), "vertices": sum(len(element["geometry"]) for element in elements),
+                 "graph_nodes": network_manager.graph.num_nodes(), "graph_edges": network_manager.graph.num_edges()},
+        "environment": {"python": platform.python_version(), "machine": platform.machine()},
+        "stages": stages,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return the regressions found: the stage measures above the baseline ones by more than the tolerance"""
+    regressions = []
+    if results["parameters"] != baseline["parameters"]:
+        regressions.append(f"parameters are different from the baseline ones: {baseline['parameters']}")
+        return regressions
+
+    for stage, measures in results["stages"].items():
+        for measure_name, value in measures.items():
+            baseline_value = baseline["stages"].get(stage, {}).get(measure_name, None)
+            if baseline_value is not None and value > baseline_value * (1 + tolerance):
+                regressions.append(f"{stage} {measure_name}: {value:.3f} (baseline {baseline_value:.3f}, "
+                                   f"+{(value / baseline_value - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--network", choices=list(GENERATORS), default="grid")
+    parser.add_argument("--scale", type=int, default=60,
+                        help="ways by direction (grid), nodes (planar) or ways (rural)")
+    parser.add_argument("--mode", choices=[mode.value for mode in (OsmFeatureModes.vehicle,
+                                                                   OsmFeatureModes.pedestrian)],
+                        default=OsmFeatureModes.vehicle.value)
+    parser.add_argument("--connected-nodes", type=int, default=20)
+    parser.add_argument("--routes", type=int, default=50)
+    parser.add_argument("--isochrones", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory measures")
+    parser.add_argument("--output", help="JSON file to write the results")
+    parser.add_argument("--baseline", help="JSON results file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="relative increase allowed")
+    args = parser.parse_args()
+
+    results = run_pipeline(args.network, args.scale, OsmFeatureModes(args.mode), args.connected_nodes, args.routes,
+                           args.isochrones, repeat=args.repeat, memory=not args.no_memory)
+    print(f"{args.network} network ({args.scale}): {results['data']}")
+    for stage, measures in results["stages"].items():
+        peak = f", peak {measures['peak_mb']:.2f} MB" if "peak_mb" in measures else ""
+        print(f"{stage:>22}: {measures['seconds'] * 1000:.1f} ms{peak}")
+
+    if args.output is not None:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+            output_file.write("\n")
+
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if len(regressions) > 0:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
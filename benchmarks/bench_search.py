@@ -0,0 +1,79 @@
+"""Compare the point to point search algorithms of GraphCore.compute_shortest_path on a grid network, including
+the contraction hierarchy (its preprocessing is timed apart)
+
+The grid is made of residential ways, crossed by a primary way every 10 ways: the fastest paths (time weight) use
+a road hierarchy, as on a real network.
+
+Run it from the repository root:
+    python -m benchmarks.bench_search --size 100 --weight time
+"""
+import argparse
+import time
+from typing import Dict, List
+
+import numpy as np
+from shapely import LineString
+
+from osmrx.globals.queries import OsmFeatureModes
+from osmrx.helpers.logger import Logger
+from osmrx.network.network_rx import NetworkRxCore
+from osmrx.network.speed_profile import SpeedProfile
+
+
+def build_grid(size: int, spacing: float = 0.001, primary_every: int = 10, seed: int = 0) -> List[Dict]:
+    """Build a grid of 2 ways crossing at each vertex, slightly jittered, around (4.0, 46.0)"""
+    rng = np.random.default_rng(seed)
+    grid = np.stack(np.meshgrid(np.arange(size), np.arange(size), indexing="ij"), axis=-1) * spacing
+    grid = np.round(grid + rng.random(grid.shape) * spacing * 0.3 + [4.0, 46.0], 7)
+
+    ways = [grid[row, :] for row in range(size)] + [grid[:, column] for column in range(size)]
+    return [{"geometry": LineString(way), "id": str(position),
+             "highway": "primary" if (position % size) % primary_every == 0 else "residential"}
+            for position, way in enumerate(ways)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=100)
+    parser.add_argument("--routes", type=int, default=20)
+    parser.add_argument("--weight", choices=["length", "time"], default="time")
+    args = parser.parse_args()
+
+    network = NetworkRxCore(directed=False, logger=Logger(logger_level="warning").logger)
+    network.speed_profile = SpeedProfile.from_mode(OsmFeatureModes.vehicle)
+    network.connected_nodes = []
+    start = time.perf_counter()
+    network.line_features = build_grid(args.size)
+    print(f"{args.size}x{args.size} grid: {network.graph.num_nodes()} nodes, {network.graph.num_edges()} edges "
+          f"built in {time.perf_counter() - start:.1f} s")
+
+    rng = np.random.default_rng(1)
+    nodes = network.graph.nodes()
+    routes = [(nodes[from_position], nodes[to_position])
+              for from_position, to_position in rng.integers(0, len(nodes), (args.routes, 2))]
+
+    start = time.perf_counter()
+    contraction_hierarchy = network.prepare_contraction_hierarchy(args.weight)
+    print(f"contraction hierarchy: {contraction_hierarchy.nb_shortcuts} shortcuts "
+          f"prepared in {time.perf_counter() - start:.1f} s")
+
+    costs = {}
+    for algorithm in ["dijkstra", "astar", "bidirectional", "contraction"]:
+        # warm up: the adjacencies are built once
+        network.compute_shortest_path(*routes[0], weight=args.weight, algorithm=algorithm)
+        start = time.perf_counter()
+        paths = [network.compute_shortest_path(from_node, to_node, weight=args.weight, algorithm=algorithm)
+                 for from_node, to_node in routes]
+        duration = time.perf_counter() - start
+        costs[algorithm] = [
+            (path[0].length if args.weight == "length" else path[0].cumulative_times[-1]) if path else 0.0
+            for path in paths
+        ]
+        print(f"{algorithm:>13}: {duration / len(routes) * 1000:.1f} ms by route")
+
+    for algorithm in ["astar", "bidirectional", "contraction"]:
+        assert np.allclose(costs["dijkstra"], costs[algorithm]), f"{algorithm} results are different!"
+
+
+if __name__ == "__main__":
+    main()
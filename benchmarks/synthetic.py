@@ -0,0 +1,127 @@
+"""Synthetic OSM-like data: overpass elements (ways with their geometry, nodes) of configurable size, to run the
+whole pipeline offline
+
+The coordinates are rounded at the OSM precision, around (4.0, 46.0), and the ways are connected on shared
+vertices: as the overpass data.
+"""
+from typing import Dict, List
+
+import numpy as np
+from scipy.spatial import Delaunay
+
+ORIGIN: np.ndarray = np.array([4.0, 46.0])
+OSM_DECIMALS: int = 7
+
+HIGHWAYS: List[str] = ["primary", "secondary", "tertiary", "residential", "service", "unclassified"]
+
+
+def _way_element(way_id: int, coordinates: np.ndarray, tags: Dict) -> Dict:
+    return {
+        "type": "way",
+        "id": way_id,
+        "geometry": [{"lat": latitude, "lon": longitude}
+                     for longitude, latitude in np.round(coordinates, OSM_DECIMALS).tolist()],
+        "tags": tags,
+    }
+
+
+def _random_tags(rng: np.random.Generator) -> Dict:
+    tags = {"highway": HIGHWAYS[rng.integers(len(HIGHWAYS))]}
+    if rng.random() < 0.2:
+        tags["oneway"] = "yes"
+    if rng.random() < 0.3:
+        tags["maxspeed"] = str(int(rng.choice([30, 50, 70, 90])))
+    return tags
+
+
+def grid_city(size: int, spacing: float = 0.001, block_vertices: int = 3, seed: int = 0) -> List[Dict]:
+    """A city grid: size ways by direction crossing at each vertex, with intermediate vertices between the
+    crossings, a primary way every 10 ways and some one ways"""
+    rng = np.random.default_rng(seed)
+    crossings = np.stack(np.meshgrid(np.arange(size), np.arange(size), indexing="ij"), axis=-1) * spacing
+    crossings = crossings + rng.random(crossings.shape) * spacing * 0.2 + ORIGIN
+
+    # the intermediate vertices are interpolated between the crossings: the ways share the crossings only
+    fractions = (np.arange(block_vertices) / block_vertices)[np.newaxis, :, np.newaxis]
+    ways = [crossings[row, :] for row in range(size)] + [crossings[:, column] for column in range(size)]
+    elements = []
+    for position, way in enumerate(ways):
+        coordinates = way[:-1, np.newaxis, :] + (way[1:] - way[:-1])[:, np.newaxis, :] * fractions
+        coordinates = np.concatenate([coordinates.reshape(-1, 2), way[-1:]])
+        tags = {"highway": "primary" if (position % size) % 10 == 0 else "residential"}
+        if (position % size) % 3 == 1:
+            tags["oneway"] = "yes"
+        elements.append(_way_element(position + 1, coordinates, tags))
+    return elements
+
+
+def random_planar(nb_nodes: int, extent: float = 0.1, max_way_edges: int = 5, seed: int = 0) -> List[Dict]:
+    """A random planar network: the edges of a Delaunay triangulation of random nodes, chained in ways of a few
+    edges"""
+    rng = np.random.default_rng(seed)
+    nodes = np.round(rng.random((nb_nodes, 2)) * extent + ORIGIN, OSM_DECIMALS)
+    triangles = Delaunay(nodes).simplices
+    edges = np.sort(np.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [0, 2]]]), axis=1)
+    edges = np.unique(edges, axis=0)
+    # sparser than a triangulation, as a road network
+    edges = edges[rng.random(len(edges)) < 0.6]
+
+    edges_by_node = {}
+    for edge_position, (from_node, to_node) in enumerate(edges.tolist()):
+        edges_by_node.setdefault(from_node, []).append(edge_position)
+        edges_by_node.setdefault(to_node, []).append(edge_position)
+
+    elements = []
+    used = np.zeros(len(edges), dtype=bool)
+    for edge_position in range(len(edges)):
+        if used[edge_position]:
+            continue
+        # walk along free edges to build a way
+        used[edge_position] = True
+        way_nodes = edges[edge_position].tolist()
+        for _ in range(rng.integers(1, max_way_edges + 1) - 1):
+            next_edges = [position for position in edges_by_node[way_nodes[-1]] if not used[position]]
+            if len(next_edges) == 0:
+                break
+            used[next_edges[0]] = True
+            from_node, to_node = edges[next_edges[0]].tolist()
+            way_nodes.append(to_node if from_node == way_nodes[-1] else from_node)
+        elements.append(_way_element(len(elements) + 1, nodes[way_nodes], _random_tags(rng)))
+    return elements
+
+
+def rural_ways(nb_ways: int, nb_vertices: int = 200, extent: float = 0.5, seed: int = 0) -> List[Dict]:
+    """Long winding ways with many vertices, connected at their ends to the previous ways"""
+    rng = np.random.default_rng(seed)
+    step = extent / nb_vertices
+    elements = []
+    way_ends = [ORIGIN + extent / 2]
+    for _ in range(nb_ways):
+        start = way_ends[rng.integers(len(way_ends))]
+        headings = np.cumsum(rng.normal(0.0, 0.3, nb_vertices - 1)) + rng.random() * 2 * np.pi
+        steps = np.stack([np.cos(headings), np.sin(headings)], axis=1) * step
+        coordinates = np.round(start + np.concatenate([[[0.0, 0.0]], np.cumsum(steps, axis=0)]), OSM_DECIMALS)
+        elements.append(_way_element(len(elements) + 1, coordinates,
+                                     {"highway": str(rng.choice(["tertiary", "unclassified", "track"]))}))
+        way_ends.append(coordinates[-1])
+    return elements
+
+
+def nodes_elements(elements: List[Dict], nb_nodes: int, offset: float = 0.0002, seed: int = 0) -> List[Dict]:
+    """Nodes (POIs) near the ways vertices, to connect to the network"""
+    rng = np.random.default_rng(seed)
+    vertices = np.array([[coordinates["lon"], coordinates["lat"]]
+                         for element in elements for coordinates in element["geometry"]])
+    positions = rng.integers(len(vertices), size=nb_nodes)
+    coordinates = np.round(vertices[positions] + (rng.random((nb_nodes, 2)) - 0.5) * offset, OSM_DECIMALS)
+    first_id = max((element["id"] for element in elements), default=0) + 1
+    return [{"type": "node", "id": first_id + position, "lat": latitude, "lon": longitude,
+             "tags": {"amenity": "poi"}}
+            for position, (longitude, latitude) in enumerate(coordinates.tolist())]
+
+
+GENERATORS = {
+    "grid": grid_city,
+    "planar": random_planar,
+    "rural": rural_ways,
+}
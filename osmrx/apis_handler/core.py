@@ -1,25 +1,41 @@
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
 from typing import TYPE_CHECKING
 
-from requests_futures import sessions
-
+from osmrx.apis_handler.session import HttpSession
+from osmrx.helpers.instrumentation import Instrumentation
 from osmrx.helpers.misc import retry
 
 if TYPE_CHECKING:
     from logging import Logger
+    from requests import Response
+    from osmrx.apis_handler.response_cache import ResponseCache
 
 
 class ErrorRequest(Exception):
     pass
 
 
+class ErrorCacheMiss(ErrorRequest):
+    pass
+
+
 class ApiCore:
 
-    __NB_WORKER: int = 1
     __WORKED_STATUS_CODE: int = 200
 
-    def __init__(self, logger: "Logger"):
+    # process-wide response cache, see set_response_cache
+    response_cache: "ResponseCache | None" = None
+
+    def __init__(self, logger: "Logger", response_cache: "ResponseCache | None" = None):
         self.logger = logger
+        if response_cache is not None:
+            self.response_cache = response_cache
+
+    @classmethod
+    def set_response_cache(cls, response_cache: "ResponseCache | None") -> None:
+        """Set the response cache used by all the APIs (None to disable it)"""
+        ApiCore.response_cache = response_cache
 
     def check_request_response(self, response) -> None:
         python_class_name = self.__class__.__name__
@@ -36,11 +52,48 @@ class ApiCore:
                 f"{response_result_message}"
             )
 
-    @retry(ErrorRequest, tries=4, delay=3, backoff=2, logger=None)
     def request_query(self, url: str, parameters: Dict, headers: Dict) -> Dict:
+        """Return the response from the response cache if set, otherwise query the API"""
+        with Instrumentation.shared().stage("api.query", api=self.__class__.__name__) as measure:
+            if self.response_cache is None:
+                return self._request(url, parameters, headers)
+
+            response = self.response_cache.get(url, parameters)
+            if response is not None:
+                self.logger.info(f"{self.__class__.__name__}: Query found in the cache")
+                measure.count("cache_hits")
+                return response
 
-        session = sessions.FuturesSession(max_workers=self.__NB_WORKER)
-        response = session.get(url, params=parameters, headers=headers)
+            if self.response_cache.offline:
+                raise ErrorCacheMiss(f"{self.__class__.__name__}: Query not found in the cache (offline mode)")
+
+            response = self._request(url, parameters, headers)
+            self.response_cache.set(url, parameters, response)
+            return response
+
+    def request_queries(self, queries: List[Tuple[str, Dict, Dict]], max_concurrency: int | None = None
+                        ) -> List[Dict]:
+        """Run several queries (url, parameters, headers) at once, the responses are returned in the same order
+
+        max_concurrency: maximum number of queries in flight (default: the session max_workers)
+        """
+        max_concurrency = max_concurrency or HttpSession.shared().max_workers
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            return list(executor.map(lambda query: self.request_query(*query), queries))
+
+    @retry(ErrorRequest, tries=4, delay=3, backoff=2, logger=None)
+    def _request(self, url: str, parameters: Dict, headers: Dict) -> Dict:
+        with Instrumentation.shared().stage("api.request", api=self.__class__.__name__) as measure:
+            response = HttpSession.shared().get(url, parameters, headers)
+
+            self.check_request_response(response)
+            measure.count("bytes", len(response.result().content))
+            return response.result().json()
+
+    @retry(ErrorRequest, tries=4, delay=3, backoff=2, logger=None)
+    def _request_stream(self, url: str, parameters: Dict, headers: Dict) -> "Response":
+        """Return the response once its headers are received, its body has to be read (iter_content)"""
+        response = HttpSession.shared().get(url, parameters, headers, stream=True)
 
         self.check_request_response(response)
-        return response.result().json()
+        return response.result()
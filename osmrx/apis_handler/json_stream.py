@@ -0,0 +1,63 @@
+import codecs
+import json
+import re
+from typing import Any, Dict, Generator, Iterable
+
+
+class ErrorJsonStream(ValueError):
+    pass
+
+
+def iter_json_array(chunks: Iterable[bytes], key: str = "elements", encoding: str = "utf-8"
+                    ) -> Generator[Dict[str, Any], Any, None]:
+    """Yield the objects of a json array (found with its key) one by one, while reading the chunks of a json
+    document: the whole document is never loaded.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder(encoding)()
+    array_start = re.compile(rf'"{re.escape(key)}"\s*:\s*\[')
+    separators = re.compile(r"[\s,]*")
+
+    buffer = ""
+    position = None  # position in the buffer, None until the array is found
+    # length to read before decoding again an incomplete object: doubled after each failure, so that a large object
+    # is not decoded again on each chunk (the decoding stays linear)
+    decode_length = 0
+    chunks = iter(chunks)
+    stream_ended = False
+
+    while True:
+        if position is None:
+            array_found = array_start.search(buffer)
+            if array_found is not None:
+                position = array_found.end()
+        else:
+            position = separators.match(buffer, position).end()
+            if position < len(buffer) and (len(buffer) - position >= decode_length or stream_ended):
+                if buffer[position] == "]":
+                    return
+                try:
+                    value, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    # the object is not complete: read the next chunks
+                    decode_length = 2 * (len(buffer) - position)
+                else:
+                    decode_length = 0
+                    yield value
+                    continue
+
+        if stream_ended:
+            raise ErrorJsonStream(f"The json array '{key}' is not complete")
+
+        chunk = next(chunks, None)
+        if chunk is None:
+            stream_ended = True
+            buffer += text_decoder.decode(b"", final=True)
+        else:
+            # drop what has been read
+            if position is not None:
+                buffer, position = buffer[position:], 0
+            else:
+                # keep the end of the buffer, the key could be split on 2 chunks
+                buffer = buffer[-len(key) - 16:]
+            buffer += text_decoder.decode(chunk)
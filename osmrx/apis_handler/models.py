@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Tuple
 from typing import TYPE_CHECKING
 from dataclasses import dataclass
 
@@ -31,6 +31,22 @@ class Bbox:
         """Cast to a string"""
         return f"{self._min_x}, {self._min_y}, {self._max_x}, {self._max_y}"
 
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Return the bounds as floats"""
+        return float(self._min_x), float(self._min_y), float(self._max_x), float(self._max_y)
+
+    def split(self, nb_columns: int, nb_rows: int) -> "List[Bbox]":
+        """Split the bbox on a grid of nb_columns x nb_rows tiles"""
+        min_x, min_y, max_x, max_y = self.bounds
+        x_steps = [min_x + (max_x - min_x) * column / nb_columns for column in range(nb_columns + 1)]
+        y_steps = [min_y + (max_y - min_y) * row / nb_rows for row in range(nb_rows + 1)]
+        return [
+            Bbox(tile_min_x, tile_min_y, tile_max_x, tile_max_y)
+            for tile_min_x, tile_max_x in zip(x_steps, x_steps[1:])
+            for tile_min_y, tile_max_y in zip(y_steps, y_steps[1:])
+        ]
+
 
 @dataclass
 class NominatimItem:
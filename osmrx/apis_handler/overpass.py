@@ -1,6 +1,8 @@
-from typing import Dict
+from typing import Any, Dict, Generator, Iterable, List
 
 from osmrx.apis_handler.core import ApiCore
+from osmrx.apis_handler.json_stream import iter_json_array
+from osmrx.helpers.instrumentation import Instrumentation, StageMeasure
 
 
 class ErrorOverpassApi(ValueError):
@@ -9,6 +11,8 @@ class ErrorOverpassApi(ValueError):
 
 class OverpassApi(ApiCore):
 
+    __STREAM_CHUNK_SIZE: int = 64 * 1024
+
     __OVERPASS_URL: str = "https://www.overpass-api.de/api/interpreter"
     __OVERPASS_QUERY_PREFIX: str = "[out:json];"
 
@@ -20,3 +24,33 @@ class OverpassApi(ApiCore):
     def query(self, query: str) -> Dict:
         parameters = self._build_parameters(query)
         return self.request_query(self.__OVERPASS_URL, parameters, {})
+
+    def stream_query(self, query: str) -> Generator[Dict, Any, None]:
+        """Yield the elements found one by one while the response is downloaded (bounded memory).
+
+        If a response cache is set, the response is read from (or stored on) the cache: it is fully loaded.
+        """
+        parameters = self._build_parameters(query)
+        if self.response_cache is not None:
+            yield from self.request_query(self.__OVERPASS_URL, parameters, {})["elements"]
+            return
+
+        with Instrumentation.shared().stage("api.stream", api=self.__class__.__name__) as measure:
+            with self._request_stream(self.__OVERPASS_URL, parameters, {}) as response:
+                chunks = response.iter_content(chunk_size=self.__STREAM_CHUNK_SIZE)
+                for element in iter_json_array(self._count_bytes(chunks, measure), "elements"):
+                    measure.count("elements")
+                    yield element
+
+    @staticmethod
+    def _count_bytes(chunks: Iterable[bytes], measure: StageMeasure) -> Generator[bytes, Any, None]:
+        for chunk in chunks:
+            measure.count("bytes", len(chunk))
+            yield chunk
+
+    def query_many(self, queries: List[str], max_concurrency: int | None = None) -> List[Dict]:
+        """Run several queries at once (at most max_concurrency in flight), return the responses in order"""
+        return self.request_queries(
+            [(self.__OVERPASS_URL, self._build_parameters(query), {}) for query in queries],
+            max_concurrency=max_concurrency,
+        )
@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict
+
+from osmrx.helpers.cache import DiskCache
+
+
+class ResponseCache:
+    """Cache of the APIs responses: an in-memory LRU in front of a disk cache, keyed by url and parameters
+
+    Any object providing the offline attribute and the get/set methods can be used as a response cache (see
+    ApiCore.set_response_cache).
+    """
+
+    def __init__(self, directory: str | None = "osmrx_cache/responses", ttl: float | None = 7 * 24 * 3600,
+                 max_size: int | None = 1024 ** 3, memory_items: int = 32, offline: bool = False) -> None:
+        """
+        directory: where the responses are written, None to use the memory only
+        ttl: time to live of a response in seconds (None: never expires)
+        max_size: maximum size of the disk cache in bytes (None: unbounded)
+        memory_items: number of responses kept in memory
+        offline: if True, a response not cached raises an ErrorCacheMiss instead of querying the API
+        """
+        self._ttl = ttl
+        self._memory_items = memory_items
+        self._memory: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._memory_lock = threading.Lock()  # queries can run concurrently (see ApiCore.request_queries)
+        self._disk = DiskCache(directory, max_size=max_size, ttl=ttl) if directory is not None else None
+        self.offline = offline
+
+    @staticmethod
+    def build_key(url: str, parameters: Dict) -> str:
+        """Build the key of a query"""
+        return DiskCache.build_key(url, sorted(parameters.items()))
+
+    def get(self, url: str, parameters: Dict) -> Any:
+        """Return the response cached, None if not found or expired"""
+        key = self.build_key(url, parameters)
+
+        with self._memory_lock:
+            if key in self._memory:
+                created_at, response = self._memory[key]
+                if self._ttl is None or time.time() - created_at <= self._ttl:
+                    self._memory.move_to_end(key)
+                    return response
+                del self._memory[key]
+
+        if self._disk is not None:
+            entry = self._disk.get_entry(key)
+            if entry is not None:
+                created_at, response = entry
+                self._set_memory(key, response, created_at)  # the TTL still runs from the disk creation
+                return response
+
+        return None
+
+    def set(self, url: str, parameters: Dict, response: Any) -> None:
+        """Store a response"""
+        key = self.build_key(url, parameters)
+        self._set_memory(key, response)
+        if self._disk is not None:
+            self._disk.set(key, response)
+
+    def _set_memory(self, key: str, response: Any, created_at: float | None = None) -> None:
+        with self._memory_lock:
+            self._memory[key] = (time.time() if created_at is None else created_at, response)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self._memory_items:
+                self._memory.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all the responses cached"""
+        with self._memory_lock:
+            self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
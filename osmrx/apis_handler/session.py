@@ -0,0 +1,64 @@
+from concurrent.futures import Future
+from typing import Dict, Tuple
+
+from requests.adapters import HTTPAdapter
+from requests_futures import sessions
+
+
+class HttpSession:
+    """Process-wide http session shared by the APIs: its connections are pooled (keep-alive) and several
+    queries can be in flight at once"""
+
+    _shared_session: "HttpSession | None" = None
+
+    def __init__(self, pool_size: int = 8, max_workers: int = 4,
+                 timeout: float | Tuple[float, float] = (10, 300)) -> None:
+        """
+        pool_size: number of connections kept alive by host
+        max_workers: number of queries in flight at once
+        timeout: the connect and read timeouts in seconds
+        """
+        self._pool_size = pool_size
+        self._max_workers = max_workers
+        self._timeout = timeout
+
+        self._session = sessions.FuturesSession(max_workers=max_workers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    @classmethod
+    def shared(cls) -> "HttpSession":
+        """Return the process-wide session (built with the default settings if not configured)"""
+        if HttpSession._shared_session is None:
+            HttpSession._shared_session = cls()
+        return HttpSession._shared_session
+
+    @classmethod
+    def configure(cls, pool_size: int = 8, max_workers: int = 4,
+                  timeout: float | Tuple[float, float] = (10, 300)) -> "HttpSession":
+        """Replace the process-wide session"""
+        if HttpSession._shared_session is not None:
+            HttpSession._shared_session.close()
+        HttpSession._shared_session = cls(pool_size=pool_size, max_workers=max_workers, timeout=timeout)
+        return HttpSession._shared_session
+
+    @property
+    def pool_size(self) -> int:
+        return self._pool_size
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    @property
+    def timeout(self) -> float | Tuple[float, float]:
+        return self._timeout
+
+    def get(self, url: str, parameters: Dict, headers: Dict, stream: bool = False) -> Future:
+        """Send a GET query, return a future of the response (its body is read on demand if stream is True)"""
+        return self._session.get(url, params=parameters, headers=headers, timeout=self._timeout, stream=stream)
+
+    def close(self) -> None:
+        """Close the connections and the workers"""
+        self._session.close()
@@ -1,15 +1,21 @@
-from typing import Dict
+from typing import Any, Dict, Generator, Iterable
 from typing import List
 
 from shapely import Point
 from shapely import LineString
 
 from osmrx.globals.queries import OsmFeatureTypes
+from osmrx.helpers.instrumentation import Instrumentation
 
 ID_OSM_FIELD: str = "id"
 
 
 class OverpassDataBuilder:
+    """Build the features from the overpass elements.
+
+    The elements can be a generator (streamed from the API, see OverpassApi.stream_query): they are read once,
+    so only one of the features builders can be consumed.
+    """
     __GEOMETRY_FIELD: str = "geometry"
     __LAT_FIELD: str = "lat"
     __LNG_FIELD: str = "lon"
@@ -18,42 +24,59 @@ class OverpassDataBuilder:
     __OSM_URL_FIELD: str = "osm_url"
     __OSM_URL = "https://www.openstreetmap.org"
 
-    _line_features = None
-
-    def __init__(self, overpass_data: List[Dict]) -> None:
+    def __init__(self, overpass_data: Iterable[Dict]) -> None:
 
         self._prepare_data(overpass_data)
 
-    def _prepare_data(self, raw_data: List[Dict]):
-        self._grouped_features = {
-            "points": filter(
-                lambda x: x[self.__FEATURE_TYPE_OSM_FIELD] == OsmFeatureTypes.node.value,
-                raw_data,
-            ),
-            "lines": filter(
-                lambda x: x[self.__FEATURE_TYPE_OSM_FIELD] == OsmFeatureTypes.way.value,
-                raw_data,
-            )
-        }
+    @classmethod
+    def from_tiles(cls, tiles_data: Iterable[Iterable[Dict]]) -> "OverpassDataBuilder":
+        """Merge the elements of several queries (tiles): an element found on several tiles is kept once"""
+        return cls(cls._unique_elements(tiles_data))
+
+    @classmethod
+    def _unique_elements(cls, tiles_data: Iterable[Iterable[Dict]]) -> Generator[Dict, Any, None]:
+        elements_found = set()
+        for tile_data in tiles_data:
+            for element in tile_data:
+                element_key = (element[cls.__FEATURE_TYPE_OSM_FIELD], element[ID_OSM_FIELD])
+                if element_key not in elements_found:
+                    elements_found.add(element_key)
+                    yield element
+
+    def _prepare_data(self, raw_data: Iterable[Dict]):
+        self._raw_data = raw_data
+
+    def _elements(self, feature_type: OsmFeatureTypes) -> Generator[Dict, Any, None]:
+        return (
+            element for element in self._raw_data
+            if element[self.__FEATURE_TYPE_OSM_FIELD] == feature_type.value
+        )
+
+    def iter_point_features(self) -> Generator[Dict, Any, None]:
+        """Yield the point features one by one (the stage measured includes the time spent by the consumer)"""
+        with Instrumentation.shared().stage("data.point_features") as measure:
+            for uuid_enum, feature in enumerate(self._elements(OsmFeatureTypes.node), start=1):
+                geometry = Point(feature[self.__LNG_FIELD], feature[self.__LAT_FIELD])
+                measure.count("nodes")
+                yield self._build_properties(uuid_enum, geometry, feature)
+
+    def iter_line_features(self) -> Generator[Dict, Any, None]:
+        """Yield the line features one by one (the stage measured includes the time spent by the consumer)"""
+        with Instrumentation.shared().stage("data.line_features") as measure:
+            for uuid_enum, feature in enumerate(self._elements(OsmFeatureTypes.way), start=1):
+                geometry = LineString(
+                    [(coordinates[self.__LNG_FIELD], coordinates[self.__LAT_FIELD])
+                     for coordinates in feature[self.__GEOMETRY_FIELD]]
+                )
+                measure.count("ways")
+                measure.count("vertices", len(feature[self.__GEOMETRY_FIELD]))
+                yield self._build_properties(uuid_enum, geometry, feature)
 
     def point_features(self) -> List[Dict]:
-        point_features = []
-        data = self._grouped_features["points"]
-        for uuid_enum, feature in enumerate(data, start=1):
-            geometry = Point(feature[self.__LNG_FIELD], feature[self.__LAT_FIELD])
-            point_features.append(self._build_properties(uuid_enum, geometry, feature))
-        return point_features
+        return list(self.iter_point_features())
 
     def line_features(self) -> List[Dict]:
-        line_features = []
-        data = self._grouped_features["lines"]
-        for uuid_enum, feature in enumerate(data, start=1):
-            geometry = LineString(
-                [(coordinates[self.__LNG_FIELD], coordinates[self.__LAT_FIELD])
-                 for coordinates in feature[self.__GEOMETRY_FIELD]]
-            )
-            line_features.append(self._build_properties(uuid_enum, geometry, feature))
-        return line_features
+        return list(self.iter_line_features())
 
     def _build_properties(self, uuid_enum: int, geometry: Point | LineString, properties: Dict) -> Dict:
         tags_attributes = properties.get(self.__PROPERTIES_OSM_FIELD, {})
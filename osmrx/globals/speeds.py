@@ -0,0 +1,48 @@
+from osmrx.globals.queries import OsmFeatureModes
+
+
+# travel speeds (km/h) by highway value, used when the maxspeed tag is missing or not usable
+highway_speeds: dict = {
+    OsmFeatureModes.vehicle: {
+        "speeds": {
+            "motorway": 110,
+            "motorway_link": 60,
+            "trunk": 90,
+            "trunk_link": 50,
+            "primary": 70,
+            "primary_link": 40,
+            "secondary": 60,
+            "secondary_link": 40,
+            "tertiary": 50,
+            "tertiary_link": 30,
+            "unclassified": 40,
+            "residential": 30,
+            "living_street": 10,
+            "service": 20,
+            "pedestrian": 10,
+            "track": 15,
+            "road": 30,
+            "bus_guideway": 30,
+            "escape": 20,
+            "raceway": 30,
+            "bridleway": 10,
+            "corridor": 10,
+            "path": 10,
+        },
+        "default_speed": 30,
+        "use_maxspeed": True,
+    },
+    OsmFeatureModes.pedestrian: {
+        "speeds": {
+            "steps": 2.5,
+        },
+        "default_speed": 5,
+        "use_maxspeed": False,
+    },
+}
+
+# maxspeed values which are not numbers (km/h)
+maxspeed_values: dict = {
+    "walk": 5,
+    "living_street": 10,
+}
@@ -0,0 +1,105 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+from typing import Any, Tuple
+
+
+class DiskCache:
+    """Store python objects as pickle files, with a TTL and a size bounded LRU eviction
+
+    The file modification time is the creation time (used by the TTL), the file access time is the
+    last time the value has been read (used by the LRU eviction).
+    """
+
+    __FILE_EXTENSION: str = ".pkl"
+
+    def __init__(self, directory: str, max_size: int | None = None, ttl: float | None = None) -> None:
+        """
+        directory: where the files are written
+        max_size: maximum size of the cache in bytes, the least recently used values are evicted (None: unbounded)
+        ttl: time to live of a value in seconds (None: never expires)
+        """
+        self._directory = directory
+        self._max_size = max_size
+        self._ttl = ttl
+
+        os.makedirs(self._directory, exist_ok=True)
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    @staticmethod
+    def build_key(*values: Any) -> str:
+        """Build a key from any values having a stable repr"""
+        return hashlib.sha256(repr(values).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, f"{key}{self.__FILE_EXTENSION}")
+
+    def _is_expired(self, path: str) -> bool:
+        return self._ttl is not None and time.time() - os.path.getmtime(path) > self._ttl
+
+    def __contains__(self, key: str) -> bool:
+        path = self._path(key)
+        return os.path.isfile(path) and not self._is_expired(path)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the value stored, or the default value if missing or expired"""
+        entry = self.get_entry(key)
+        return entry[1] if entry is not None else default
+
+    def get_entry(self, key: str) -> Tuple[float, Any] | None:
+        """Return the creation time (epoch seconds) and the value stored, None if missing or expired"""
+        path = self._path(key)
+        try:
+            if self._is_expired(path):
+                self.delete(key)
+                return None
+            with open(path, "rb") as input_file:
+                created_at = os.fstat(input_file.fileno()).st_mtime
+                value = pickle.load(input_file)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+        # refresh the access time for the LRU eviction
+        os.utime(path, (time.time(), created_at))
+        return created_at, value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value (written atomically) and evict the least recently used values if needed"""
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        with os.fdopen(file_descriptor, "wb") as output_file:
+            pickle.dump(value, output_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self._path(key))
+        self._evict()
+
+    def delete(self, key: str) -> None:
+        """Remove a value"""
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        """Remove all the values"""
+        for entry in self._entries():
+            os.remove(entry.path)
+
+    def _entries(self):
+        return [entry for entry in os.scandir(self._directory)
+                if entry.is_file() and entry.name.endswith(self.__FILE_EXTENSION)]
+
+    def _evict(self) -> None:
+        if self._max_size is None:
+            return
+
+        entries = sorted(self._entries(), key=lambda entry: entry.stat().st_atime)
+        total_size = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if total_size <= self._max_size:
+                break
+            total_size -= entry.stat().st_size
+            os.remove(entry.path)
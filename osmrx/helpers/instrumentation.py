@@ -0,0 +1,189 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Generator, List, Tuple
+
+
+class StageMeasure:
+    """The measures of a stage run: its wall time and item counts (ways, vertices, edges, bytes...)"""
+
+    __slots__ = ("_stage", "_labels", "_counts", "_start", "_seconds")
+
+    def __init__(self, stage: str, labels: Dict[str, str]) -> None:
+        self._stage = stage
+        self._labels = labels
+        self._counts: Dict[str, int | float] = {}
+        self._start = time.perf_counter()
+        self._seconds = None
+
+    @property
+    def stage(self) -> str:
+        return self._stage
+
+    @property
+    def labels(self) -> Dict[str, str]:
+        """Return the stage labels (e.g. the api or the algorithm used)"""
+        return self._labels
+
+    @property
+    def counts(self) -> Dict[str, int | float]:
+        return self._counts
+
+    @property
+    def seconds(self) -> float | None:
+        """Return the wall time of the stage, None while it runs"""
+        return self._seconds
+
+    def count(self, name: str, value: int | float = 1) -> None:
+        """Add to an item count"""
+        self._counts[name] = self._counts.get(name, 0) + value
+
+    def stop(self) -> None:
+        self._seconds = time.perf_counter() - self._start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"stage": self._stage, "labels": self._labels, "seconds": self._seconds, "counts": self._counts}
+
+
+class CallbackSink:
+    """Call a function with each stage measure"""
+
+    def __init__(self, callback: Callable[[StageMeasure], None]) -> None:
+        self._callback = callback
+
+    def emit(self, measure: StageMeasure) -> None:
+        self._callback(measure)
+
+
+class JsonLogSink:
+    """Append each stage measure to a file, as a JSON line"""
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+
+    def emit(self, measure: StageMeasure) -> None:
+        line = json.dumps({"timestamp": time.time(), **measure.to_dict()})
+        with self._lock, open(self._path, "a") as log_file:
+            log_file.write(f"{line}\n")
+
+
+class PrometheusSink:
+    """Sum the stage measures and write them to a file in the Prometheus text format (e.g. for the node exporter
+    textfile collector): the file is replaced at most once by flush interval (seconds), on a measure, and on
+    flush() or close()"""
+
+    __HELPS: Dict[str, str] = {
+        "stage_calls_total": "Number of runs of the stage",
+        "stage_seconds_total": "Wall time spent in the stage",
+        "stage_items_total": "Items processed by the stage",
+    }
+
+    def __init__(self, path: str, prefix: str = "osmrx", flush_interval: float = 10.0) -> None:
+        self._path = path
+        self._prefix = prefix
+        self._flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._calls: Dict[Tuple, int] = {}
+        self._seconds: Dict[Tuple, float] = {}
+        self._items: Dict[Tuple, float] = {}
+        self._last_flush = time.monotonic()
+
+    def emit(self, measure: StageMeasure) -> None:
+        stage_labels = (("stage", measure.stage), *sorted(measure.labels.items()))
+        with self._lock:
+            self._calls[stage_labels] = self._calls.get(stage_labels, 0) + 1
+            self._seconds[stage_labels] = self._seconds.get(stage_labels, 0.0) + measure.seconds
+            for name, value in measure.counts.items():
+                item_labels = (*stage_labels, ("item", name))
+                self._items[item_labels] = self._items.get(item_labels, 0) + value
+            flush_due = time.monotonic() - self._last_flush >= self._flush_interval
+        if flush_due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the counters to the file, the measures are still summed while it is written"""
+        with self._write_lock:
+            with self._lock:
+                self._last_flush = time.monotonic()
+                counters = (("stage_calls_total", dict(self._calls)), ("stage_seconds_total", dict(self._seconds)),
+                            ("stage_items_total", dict(self._items)))
+
+            lines = []
+            for metric, values in counters:
+                lines.append(f"# HELP {self._prefix}_{metric} {self.__HELPS[metric]}")
+                lines.append(f"# TYPE {self._prefix}_{metric} counter")
+                lines.extend(f"{self._prefix}_{metric}{{{self._format_labels(labels)}}} {value}"
+                             for labels, value in values.items())
+
+            # the file is never read half written
+            temporary_path = f"{self._path}.tmp"
+            with open(temporary_path, "w") as metrics_file:
+                metrics_file.write("\n".join(lines) + "\n")
+            os.replace(temporary_path, self._path)
+
+    def close(self) -> None:
+        """Write the last counters, to call once the measures are done (e.g. before the process exits)"""
+        self.flush()
+
+    @staticmethod
+    def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+        escaped_labels = (
+            (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+            for name, value in labels
+        )
+        return ",".join(f'{name}="{value}"' for name, value in escaped_labels)
+
+
+class Instrumentation:
+    """Process-wide instrumentation: the stages of the pipeline (api queries, data building, topology cleaning,
+    graph building, graph queries) are measured and sent to the sinks added (see CallbackSink, JsonLogSink,
+    PrometheusSink). Without any sink, the measures are dropped.
+
+    The stages run on other processes (see the topology workers) are not measured, and the time of a streamed
+    stage includes the time spent by its consumer.
+    """
+
+    _shared_instrumentation: "Instrumentation | None" = None
+
+    def __init__(self) -> None:
+        self._sinks: List[Any] = []
+
+    @classmethod
+    def shared(cls) -> "Instrumentation":
+        """Return the process-wide instrumentation"""
+        if Instrumentation._shared_instrumentation is None:
+            Instrumentation._shared_instrumentation = cls()
+        return Instrumentation._shared_instrumentation
+
+    @property
+    def sinks(self) -> List[Any]:
+        return self._sinks
+
+    def add_sink(self, sink: Any) -> None:
+        """Add a sink: an object with an emit(measure: StageMeasure) method"""
+        self._sinks.append(sink)
+
+    def remove_sink(self, sink: Any) -> None:
+        self._sinks.remove(sink)
+
+    def clear_sinks(self) -> None:
+        self._sinks = []
+
+    @contextmanager
+    def stage(self, stage: str, **labels: str) -> Generator[StageMeasure, Any, None]:
+        """Measure the code run in the context, its item counts are added on the measure yielded. The measure is
+        sent to the sinks once the stage is done, even if it failed (with a failed count)"""
+        measure = StageMeasure(stage, labels)
+        try:
+            yield measure
+        except Exception:
+            measure.count("failed")
+            raise
+        finally:
+            measure.stop()
+            for sink in self._sinks:
+                sink.emit(measure)
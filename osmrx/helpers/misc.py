@@ -1,9 +1,15 @@
 import time
+from typing import List
 
 from functools import wraps
 
+import numpy as np
 from pyproj import Geod
-from shapely import Point, Polygon
+import shapely
+from shapely import LineString, Point, Polygon
+
+COORDINATES_PRECISION: float = 1e7
+COORDINATES_OFFSET: np.ndarray = np.array([180.0, 90.0])
 
 
 def retry(exceptions_to_check, tries: int = 4, delay: int = 3, backoff: int = 2, logger=None):
@@ -44,3 +50,24 @@ def buffer_point(lon: float, lat: float, buffer_dist: float | int) -> Polygon:
     lon2, lat2, _ = geod.fwd(lon, lat, 180, buffer_dist)
     lon_diff, lat_diff = abs(lon1 - lon2), abs(lat1 - lat2)
     return Point(lat, lon).buffer(max(lon_diff, lat_diff))
+
+
+def geodesic_lengths(geometries: List[LineString]) -> np.ndarray:
+    """Compute the wgs84 lengths (in meters) of all the LineStrings with a single geodesic call"""
+    if len(geometries) == 0:
+        return np.zeros(0)
+    coordinates, lines_indices = shapely.get_coordinates(geometries, return_index=True)
+    _, _, segments_lengths = Geod(ellps='WGS84').inv(
+        coordinates[:-1, 0], coordinates[:-1, 1], coordinates[1:, 0], coordinates[1:, 1]
+    )
+    # consecutive coordinates belonging to 2 different lines are not segments
+    is_segment = lines_indices[:-1] == lines_indices[1:]
+    return np.bincount(lines_indices[:-1][is_segment], weights=segments_lengths[is_segment],
+                       minlength=len(geometries))
+
+
+def quantize_coordinates(coordinates: np.ndarray) -> np.ndarray:
+    """Pack wgs84 (lon, lat) coordinates into uint64 keys (1e-7 degree precision, the OSM one)"""
+    coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+    quantized = np.rint((coordinates + COORDINATES_OFFSET) * COORDINATES_PRECISION).astype(np.uint64)
+    return (quantized[:, 0] << np.uint64(32)) | quantized[:, 1]
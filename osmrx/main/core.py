@@ -1,3 +1,5 @@
+from typing import Tuple
+
 from osmrx.apis_handler.models import Bbox, Location
 from osmrx.apis_handler.overpass import OverpassApi
 from osmrx.apis_handler.query_builder import QueryBuilder
@@ -14,6 +16,8 @@ class OsmNetworkHandler(Logger):
         self._query = None
         self._raw_data = None
         self._graph_manager: OsmNetworkManager | None = None
+        self._tiles: Tuple[int, int] | None = None
+        self._max_concurrency: int | None = None
 
         super().__init__()
 
@@ -55,18 +59,40 @@ class OsmNetworkHandler(Logger):
         self.logger.info("Building the query")
         return QueryBuilder(self.osm_feature_mode)
 
+    def _set_tiles(self, tiles: Tuple[int, int] | None, max_concurrency: int | None) -> None:
+        """Set the grid (nb_columns, nb_rows) used to split a bbox query, and the number of tiles queried at once"""
+        self._tiles = tiles
+        self._max_concurrency = max_concurrency
+
     def _execute_query(self) -> OverpassDataBuilder:
         """Execute the query with the Overpass API"""
         if self._query is not None:
+            if self._tiles is not None and isinstance(self.geo_filter, Bbox):
+                return self._execute_tiled_query()
+
             self.logger.info("Execute the query")
-            raw_data = OverpassApi(logger=self.logger).query(self._query)
-            return OverpassDataBuilder(raw_data["elements"])
+            # the elements are streamed: they are built while the response is downloaded
+            return OverpassDataBuilder(OverpassApi(logger=self.logger).stream_query(self._query))
+
+    def _execute_tiled_query(self) -> OverpassDataBuilder:
+        """Execute a query by tile concurrently, the features found on several tiles are merged"""
+        tiles = self.geo_filter.split(*self._tiles)
+        query_builder = QueryBuilder(self.osm_feature_mode)
+        queries = [query_builder.from_geo_filter(tile) for tile in tiles]
+
+        self.logger.info(f"Execute the query on {len(tiles)} tiles")
+        responses = OverpassApi(logger=self.logger).query_many(queries, max_concurrency=self._max_concurrency)
+        return OverpassDataBuilder.from_tiles([response["elements"] for response in responses])
 
     @property
     def data(self) -> None:
         raise NotImplemented
 
-    def _execute(self):
+    def _set_query(self) -> None:
+        """Build the query from the geo filter"""
         base_query = self._build_query()
         self._query = base_query.from_geo_filter(self.geo_filter)
+
+    def _execute(self):
+        self._set_query()
         self._execute_query()
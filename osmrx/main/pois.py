@@ -27,12 +27,18 @@ class Pois(OsmNetworkPoi):
     def __init__(self):
         super().__init__()
 
-    def from_bbox(self, bounds: Tuple[float, float, float, float]):
-        """Find Points of interest from bbox"""
+    def from_bbox(self, bounds: Tuple[float, float, float, float], tiles: Tuple[int, int] | None = None,
+                  max_concurrency: int | None = 2):
+        """Find Points of interest from bbox
+        tiles: (nb_columns, nb_rows) grid used to split the bbox in several queries (large areas)
+        max_concurrency: number of tiles queried at once
+        """
         self.geo_filter = Bbox(*bounds)
+        self._set_tiles(tiles, max_concurrency)
         self._execute()
 
     def from_location(self, location: str):
         """Find Points of interest from location"""
         self.geo_filter = Location(location, logger=self.logger)
+        self._set_tiles(None, None)
         self._execute()
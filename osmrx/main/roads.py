@@ -8,20 +8,25 @@ from osmrx.network.isochrones_feature import IsochronesFeature
 from osmrx.network.path_feature import PathFeature
 from osmrx.helpers.misc import buffer_point
 from osmrx.main.core import OsmNetworkHandler
+from osmrx.network.graph_cache import GraphCache
 from osmrx.topology.checker import TopologyChecker
 
 
 class OsmNetworkRoads(OsmNetworkHandler):
 
-    def __init__(self, osm_feature_mode: str, nodes_to_connect: List[Dict] | None = None) -> None:
+    def __init__(self, osm_feature_mode: str, nodes_to_connect: List[Dict] | None = None,
+                 graph_cache: GraphCache | None = None, topology_workers: int | None = None) -> None:
         super().__init__(osm_feature_mode=osm_feature_mode)
         self._graph_manager.connected_nodes = nodes_to_connect
+        self._graph_manager.topology_workers = topology_workers
+        self._graph_cache = graph_cache
 
     def _execute_query(self) -> None:
         """Execute the query with the Overpass API"""
         raw_data = super()._execute_query()
         if raw_data is not None:
-            self._raw_data = raw_data.line_features()
+            # consumed by the topology cleaning
+            self._raw_data = raw_data.iter_line_features()
 
     @property
     def additional_nodes(self) -> List[Dict] | None:
@@ -49,52 +54,100 @@ class OsmNetworkRoads(OsmNetworkHandler):
     def graph(self) -> rx.PyGraph | rx.PyDiGraph:
         return self._graph_manager.graph
 
+    def _load_cached_graph(self) -> bool:
+        """Load the graph from the graph cache, return True if found"""
+        if self._graph_cache is None:
+            return False
+
+        graph_state = self._graph_cache.get_graph(self.osm_feature_mode, self._query,
+                                                  self._graph_manager.connected_nodes,
+                                                  self._graph_manager.speed_profile)
+        if graph_state is None:
+            return False
+
+        self._graph_manager.load_state(graph_state)
+        self.logger.info("Graph loaded from the cache")
+        return True
+
+    def _cache_graph(self) -> None:
+        """Store the graph built on the graph cache"""
+        if self._graph_cache is not None and self._graph_manager.features is not None:
+            self._graph_cache.set_graph(self.osm_feature_mode, self._query, self._graph_manager.connected_nodes,
+                                        self._graph_manager.dump_state(), self._graph_manager.speed_profile)
+
     def _execute(self):
-        """Continue the execution by building the graph"""
-        super()._execute()
+        """Continue the execution by building the graph (or by loading it from the graph cache)"""
+        self._set_query()
+        if self._load_cached_graph():
+            return
+
+        self._execute_query()
         self._build_graph()
+        self._cache_graph()
 
 
 class Roads(OsmNetworkRoads):
     """To manage roads"""
 
-    def __init__(self, mode: str, nodes_to_connect: List[Dict] | None = None):
-        super().__init__(osm_feature_mode=mode, nodes_to_connect=nodes_to_connect)
-
-    def from_bbox(self, bounds: Tuple[float, float, float, float]):
-        """Find roads from bbox"""
+    def __init__(self, mode: str, nodes_to_connect: List[Dict] | None = None, graph_cache: GraphCache | None = None,
+                 topology_workers: int | None = None):
+        """
+        graph_cache: to store the graphs built, see GraphCache
+        topology_workers: number of processes used to clean the topology (None: on the current process)
+        """
+        super().__init__(osm_feature_mode=mode, nodes_to_connect=nodes_to_connect, graph_cache=graph_cache,
+                         topology_workers=topology_workers)
+
+    def from_bbox(self, bounds: Tuple[float, float, float, float], tiles: Tuple[int, int] | None = None,
+                  max_concurrency: int | None = 2):
+        """Find roads from bbox
+        tiles: (nb_columns, nb_rows) grid used to split the bbox in several queries (large areas)
+        max_concurrency: number of tiles queried at once
+        """
         self.geo_filter = Bbox(*bounds)
+        self._set_tiles(tiles, max_concurrency)
         self._execute()
 
     def from_location(self, location: str):
         """Find roads from location"""
         self.geo_filter = Location(location, logger=self.logger)
+        self._set_tiles(None, None)
         self._execute()
 
 
 class GraphAnalysis(Roads):
     # TODO improvements needed
 
-    def __init__(self, mode: str, nodes_to_connect: List[Point]):
+    def __init__(self, mode: str, nodes_to_connect: List[Point], graph_cache: GraphCache | None = None,
+                 topology_workers: int | None = None):
         """
         nodes_to_connectes: must be ordered
         """
         unique_nodes = set(nodes_to_connect)  # remove duplicate nodes for the graph
         unique_nodes_to_connect = [{"topo_uuid": 999999 + enum, "geometry": node}
                                    for enum, node in enumerate(unique_nodes)]
-        super().__init__(mode=mode, nodes_to_connect=unique_nodes_to_connect)
+        super().__init__(mode=mode, nodes_to_connect=unique_nodes_to_connect, graph_cache=graph_cache,
+                         topology_workers=topology_workers)
 
         self._steps_nodes = nodes_to_connect
 
-    def get_shortest_path(self) -> Generator[PathFeature, Any, None]:
-        """Compute a shortest path from a source node to a target node"""
+    def get_shortest_path(self, weight: str = "length", algorithm: str = "dijkstra"
+                          ) -> Generator[PathFeature, Any, None]:
+        """Compute a shortest path from a source node to a target node
+        weight: length to get the shortest path, time to get the fastest one (see SpeedProfile)
+        algorithm: dijkstra, astar, bidirectional or contraction (see GraphCore.compute_shortest_path)
+        """
         assert len(self._steps_nodes) > 1, "At least, You need 2 points to compute a path"
         bounds = MultiPolygon(list(
             map(lambda point: buffer_point(point.y, point.x, 100), self._steps_nodes)
         )).bounds
         self.from_bbox(tuple([bounds[1], bounds[0], bounds[3], bounds[2]]))
+        if algorithm == "contraction" and not self._graph_manager.has_contraction_hierarchy(weight):
+            # prepared once, and stored with the graph to be reused
+            self._graph_manager.prepare_contraction_hierarchy(weight)
+            self._cache_graph()
         for from_point, to_point in list(zip(self._steps_nodes, self._steps_nodes[1:])):
-            paths = self._graph_manager.compute_shortest_path(from_point, to_point)
+            paths = self._graph_manager.compute_shortest_path(from_point, to_point, weight, algorithm)
             for path in paths:
                 yield path
             self.logger.info(f"Shortest path(s) built from {from_point.wkt} to {to_point.wkt}.")
@@ -109,3 +162,73 @@ class GraphAnalysis(Roads):
             isochrones = self._graph_manager.compute_isochrone_from_distance(node, intervals, precision)
             self.logger.info(f"Isochrones {isochrones.intervals} built from {node.wkt}.")
             return isochrones
+
+    def isochrones_from_time(self, intervals: List[int | float], precision: float = 1.0) -> IsochronesFeature:
+        """Compute isochrones from a node based on travel times (minutes)"""
+        assert len(self._steps_nodes) == 1, "You need 1 point to compute an isochrone"
+
+        # the area reachable at the highest speed of the mode (tagged speeds included)
+        max_distance = self._graph_manager.speed_profile.max_speed / 3.6 * max(intervals) * 60
+        for node in self._steps_nodes:
+            area = buffer_point(node.y, node.x, max_distance + 100).bounds
+            self.from_bbox(tuple([area[1], area[0], area[3], area[2]]))
+            isochrones = self._graph_manager.compute_isochrone_from_time(node, intervals, precision)
+            self.logger.info(f"Isochrones {isochrones.intervals} built from {node.wkt}.")
+            return isochrones
+
+
+class GraphSession(Roads):
+    """Load a graph once (from a bbox or a location), then compute any number of shortest paths and isochrones on it.
+
+    The points are snapped on their nearest graph node at query time: the graph is never rebuilt.
+    """
+
+    def __init__(self, mode: str, graph_cache: GraphCache | None = None, topology_workers: int | None = None):
+        """
+        graph_cache: to store the graphs built, see GraphCache
+        topology_workers: number of processes used to clean the topology (None: on the current process)
+        """
+        super().__init__(mode=mode, graph_cache=graph_cache, topology_workers=topology_workers)
+
+    def snap(self, points: List[Point]) -> List[Point]:
+        """Return the nearest graph node of each point"""
+        assert self._graph_manager.features is not None, "Load a graph first (from_bbox or from_location)"
+        return self._graph_manager.nearest_nodes(points)
+
+    def get_shortest_path(self, points: List[Point], weight: str = "length", algorithm: str = "dijkstra",
+                          snap_on_edges: bool = False) -> Generator[PathFeature, Any, None]:
+        """Compute the shortest paths between the ordered points (at least 2), snapped on the graph
+        weight: length to get the shortest path, time to get the fastest one (see SpeedProfile)
+        algorithm: dijkstra, astar, bidirectional or contraction (see GraphCore.compute_shortest_path)
+        snap_on_edges: if True, the points are snapped on their nearest edge, on virtual nodes removed after the
+        query (see NetworkRxCore.virtual_nodes)
+        """
+        assert len(points) > 1, "At least, You need 2 points to compute a path"
+        if not snap_on_edges:
+            nodes = self.snap(points)
+            for from_node, to_node in zip(nodes, nodes[1:]):
+                paths = self._graph_manager.compute_shortest_path(from_node, to_node, weight, algorithm)
+                for path in paths:
+                    yield path
+            return
+
+        assert self._graph_manager.features is not None, "Load a graph first (from_bbox or from_location)"
+        with self._graph_manager.virtual_nodes(points) as nodes:
+            # the paths stay valid once the virtual nodes are removed
+            paths = [
+                path
+                for from_node, to_node in zip(nodes, nodes[1:])
+                for path in self._graph_manager.compute_shortest_path(from_node, to_node, weight, algorithm)
+            ]
+        for path in paths:
+            yield path
+
+    def isochrones_from_distance(self, point: Point, intervals: List[int], precision: float = 1.0
+                                 ) -> IsochronesFeature:
+        """Compute isochrones from a point (snapped on the graph) based on distances (meters)"""
+        return self._graph_manager.compute_isochrone_from_distance(self.snap([point])[0], intervals, precision)
+
+    def isochrones_from_time(self, point: Point, intervals: List[int | float], precision: float = 1.0
+                             ) -> IsochronesFeature:
+        """Compute isochrones from a point (snapped on the graph) based on travel times (minutes)"""
+        return self._graph_manager.compute_isochrone_from_time(self.snap([point])[0], intervals, precision)
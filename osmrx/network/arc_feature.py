@@ -1,11 +1,15 @@
 from typing import Dict, List, Literal
 
 from pyproj import Geod
+import shapely
 from shapely import LineString, Point
 
 
+GEOD = Geod(ellps="WGS84")
+
+
 class ArcFeature:
-    __slots__ = ("_topo_uuid", "_geometry", "_topo_status", "_attributes", "_direction")
+    __slots__ = ("_topo_uuid", "_geometry", "_topo_status", "_attributes", "_direction", "_length", "_travel_time")
 
     def __init__(self, geometry: LineString):
         self._topo_uuid = None
@@ -13,6 +17,8 @@ class ArcFeature:
         self._topo_status = None
         self._direction = "forward"
         self._attributes = {}
+        self._length = None
+        self._travel_time = None
         self._geometry = geometry
 
     @property
@@ -30,27 +36,41 @@ class ArcFeature:
     @direction.setter
     def direction(self, direction: Literal["forward", "backward"]):
         self._direction = direction
-        self._refresh_geometry()
 
     @property
     def geometry(self) -> LineString:
-        return self._geometry
-
-    def _refresh_geometry(self):
+        """Return the geometry in the edge direction: a backward edge keeps the forward geometry and reverses it
+        on demand"""
         if self._direction == "backward":
-            self._geometry = LineString(self.coordinates[::-1])
+            return shapely.reverse(self._geometry)
+        return self._geometry
 
     @property
     def coordinates(self) -> List[float]:
-        return list(self._geometry.coords)
+        coordinates = list(self._geometry.coords)
+        if self._direction == "backward":
+            return coordinates[::-1]
+        return coordinates
 
     @property
     def from_point(self) -> Point:
-        return Point(self.coordinates[0])
+        return Point(self._geometry.coords[-1 if self._direction == "backward" else 0])
 
     @property
     def to_point(self) -> Point:
-        return Point(self.coordinates[-1])
+        return Point(self._geometry.coords[0 if self._direction == "backward" else -1])
+
+    def reversed_feature(self) -> "ArcFeature":
+        """Return the backward edge of this forward edge: the geometry, the attributes and the weights are shared,
+        not copied"""
+        arc_feature = ArcFeature(self._geometry)
+        arc_feature._topo_uuid = self._topo_uuid
+        arc_feature._topo_status = self._topo_status
+        arc_feature._attributes = self._attributes
+        arc_feature._length = self._length
+        arc_feature._travel_time = self._travel_time
+        arc_feature._direction = "backward"
+        return arc_feature
 
     @property
     def topo_status(self) -> str:
@@ -64,8 +84,25 @@ class ArcFeature:
 
     @property
     def length(self) -> float:
-        """Compute the length of a wg84 LineString in meters"""
-        return Geod(ellps="WGS84").geometry_length(self.geometry)
+        """Return the length of a wg84 LineString in meters, computed once"""
+        if self._length is None:
+            self._length = GEOD.geometry_length(self._geometry)
+        return self._length
+
+    @length.setter
+    def length(self, length: float):
+        """Set the length (in meters) computed in bulk (see geodesic_lengths)"""
+        self._length = length
+
+    @property
+    def travel_time(self) -> float | None:
+        """Return the travel time in seconds, None if no speed profile is used (see SpeedProfile)"""
+        return self._travel_time
+
+    @travel_time.setter
+    def travel_time(self, travel_time: float | None):
+        """Set the travel time (in seconds)"""
+        self._travel_time = travel_time
 
     @property
     def attributes(self) -> Dict[str, any]:
@@ -0,0 +1,202 @@
+import heapq
+import math
+from typing import Dict, List, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from osmrx.network.search import Adjacency
+
+
+class ContractionHierarchy:
+    """Shortcut overlay of a fixed graph, to answer shortest path queries by exploring a few nodes.
+
+    The nodes are contracted one by one (the least important first): a shortcut replaces the paths going through
+    a contracted node when no other path (witness) is as short. A query is a bidirectional dijkstra going up the
+    hierarchy only, the shortcuts found are unpacked to return the path on the original edges.
+    """
+
+    # the witness searches are bounded: a shortcut may be added while not needed, the paths stay the shortest
+    __WITNESS_MAX_SETTLED_NODES: int = 64
+    __EDGE_DIFFERENCE_FACTOR: int = 2
+
+    def __init__(self, upward_adjacency: Adjacency, downward_adjacency: Adjacency,
+                 shortcuts_middles: Dict[Tuple[int, int], int], nb_shortcuts: int) -> None:
+        """
+        upward_adjacency: edges to a higher node, searched from the source
+        downward_adjacency: reversed edges from a higher node, searched from the target
+        shortcuts_middles: the contracted node of each shortcut (from node, to node)
+        """
+        self._upward_adjacency = upward_adjacency
+        self._downward_adjacency = downward_adjacency
+        self._shortcuts_middles = shortcuts_middles
+        self._nb_shortcuts = nb_shortcuts
+
+    @property
+    def nb_shortcuts(self) -> int:
+        return self._nb_shortcuts
+
+    @classmethod
+    def from_graph(cls, weighted_graph: csr_matrix, directed: bool) -> "ContractionHierarchy":
+        """Contract a graph (see GraphCore.get_weighted_graph)"""
+        edges = weighted_graph.tocoo()
+        nb_nodes = weighted_graph.shape[0]
+        outgoing: List[Dict[int, float]] = [{} for _ in range(nb_nodes)]
+        incoming: List[Dict[int, float]] = [{} for _ in range(nb_nodes)]
+        edges_found = zip(edges.row.tolist(), edges.col.tolist(), edges.data.tolist())
+        if not directed:
+            edges_found = [*edges_found, *zip(edges.col.tolist(), edges.row.tolist(), edges.data.tolist())]
+        for from_node, to_node, weight in edges_found:
+            if from_node != to_node and weight < outgoing[from_node].get(to_node, math.inf):
+                outgoing[from_node][to_node] = weight
+                incoming[to_node][from_node] = weight
+
+        return cls._contract(nb_nodes, outgoing, incoming)
+
+    @classmethod
+    def _contract(cls, nb_nodes: int, outgoing: List[Dict[int, float]], incoming: List[Dict[int, float]]
+                  ) -> "ContractionHierarchy":
+        levels = [0] * nb_nodes
+        queue = [(cls._priority(node, outgoing, incoming, levels), node) for node in range(nb_nodes)]
+        heapq.heapify(queue)
+
+        upward_edges, downward_edges = [], []
+        shortcuts_middles = {}
+        nb_shortcuts = 0
+        while queue:
+            _, node = heapq.heappop(queue)
+            # lazy update: the priority may have increased since the node was queued
+            priority = cls._priority(node, outgoing, incoming, levels)
+            if queue and priority > queue[0][0]:
+                heapq.heappush(queue, (priority, node))
+                continue
+
+            for from_node, to_node, weight in list(cls._shortcuts(node, outgoing, incoming)):
+                outgoing[from_node][to_node] = weight
+                incoming[to_node][from_node] = weight
+                shortcuts_middles[(from_node, to_node)] = node
+                nb_shortcuts += 1
+
+            # the remaining neighbors are contracted later: they are higher in the hierarchy
+            upward_edges.extend((node, to_node, weight) for to_node, weight in outgoing[node].items())
+            downward_edges.extend((node, from_node, weight) for from_node, weight in incoming[node].items())
+            for to_node in outgoing[node]:
+                del incoming[to_node][node]
+            for from_node in incoming[node]:
+                del outgoing[from_node][node]
+            for neighbor in outgoing[node].keys() | incoming[node].keys():
+                levels[neighbor] = max(levels[neighbor], levels[node] + 1)
+            outgoing[node], incoming[node] = {}, {}
+
+        return cls(cls._adjacency(nb_nodes, upward_edges), cls._adjacency(nb_nodes, downward_edges),
+                   shortcuts_middles, nb_shortcuts)
+
+    @staticmethod
+    def _adjacency(nb_nodes: int, edges: List[Tuple[int, int, float]]) -> Adjacency:
+        edges = np.array(edges, dtype=np.float64).reshape(-1, 3)
+        return Adjacency(nb_nodes, edges[:, 0].astype(np.int64), edges[:, 1].astype(np.int64), edges[:, 2])
+
+    @classmethod
+    def _priority(cls, node: int, outgoing: List[Dict[int, float]], incoming: List[Dict[int, float]],
+                  levels: List[int]) -> int:
+        """Edge difference (shortcuts added - edges removed) and level in the hierarchy: to keep the graph sparse
+        and to spread the contraction"""
+        nb_shortcuts = sum(1 for _ in cls._shortcuts(node, outgoing, incoming))
+        edge_difference = nb_shortcuts - len(outgoing[node]) - len(incoming[node])
+        return cls.__EDGE_DIFFERENCE_FACTOR * edge_difference + levels[node]
+
+    @classmethod
+    def _shortcuts(cls, node: int, outgoing: List[Dict[int, float]], incoming: List[Dict[int, float]]):
+        """Yield the shortcuts (from node, to node, weight) needed to contract a node"""
+        for from_node, from_weight in incoming[node].items():
+            targets = {to_node: from_weight + to_weight for to_node, to_weight in outgoing[node].items()
+                       if to_node != from_node}
+            if not targets:
+                continue
+
+            witness_costs = cls._witness_costs(from_node, node, targets, outgoing)
+            for to_node, weight in targets.items():
+                if witness_costs.get(to_node, math.inf) > weight:
+                    yield from_node, to_node, weight
+
+    @classmethod
+    def _witness_costs(cls, from_node: int, excluded_node: int, targets: Dict[int, float],
+                       outgoing: List[Dict[int, float]]) -> Dict[int, float]:
+        """Bounded dijkstra from a node avoiding the node contracted, until the targets are settled or beyond their
+        cost through the node contracted"""
+        max_cost = max(targets.values())
+        targets_to_settle = len(targets)
+        costs = {from_node: 0.0}
+        queue = [(0.0, from_node)]
+        nb_settled = 0
+        while queue and nb_settled < cls.__WITNESS_MAX_SETTLED_NODES:
+            cost, node = heapq.heappop(queue)
+            if cost > max_cost:
+                break
+            if cost > costs[node]:
+                continue
+            nb_settled += 1
+            if node in targets:
+                targets_to_settle -= 1
+                if targets_to_settle == 0:
+                    break
+
+            for neighbor, weight in outgoing[node].items():
+                neighbor_cost = cost + weight
+                if neighbor != excluded_node and neighbor_cost < costs.get(neighbor, math.inf):
+                    costs[neighbor] = neighbor_cost
+                    heapq.heappush(queue, (neighbor_cost, neighbor))
+        return costs
+
+    def shortest_path(self, from_indice: int, to_indice: int) -> List[int] | None:
+        """Return the nodes of the shortest path on the original edges, None if the target is not reached"""
+        if from_indice == to_indice:
+            return [from_indice]
+
+        costs = ({from_indice: 0.0}, {to_indice: 0.0})
+        predecessors = ({from_indice: None}, {to_indice: None})
+        queues = ([(0.0, from_indice)], [(0.0, to_indice)])
+        adjacencies = (self._upward_adjacency, self._downward_adjacency)
+
+        best_cost, meeting_node = math.inf, None
+        # both searches go up until their frontier is above the best path found
+        while (queues[0] and queues[0][0][0] < best_cost) or (queues[1] and queues[1][0][0] < best_cost):
+            direction = 0 if queues[0] and (not queues[1] or queues[0][0][0] <= queues[1][0][0]) else 1
+            cost, node = heapq.heappop(queues[direction])
+            if cost > costs[direction][node]:
+                continue
+
+            path_cost = cost + costs[1 - direction].get(node, math.inf)
+            if path_cost < best_cost:
+                best_cost, meeting_node = path_cost, node
+
+            for neighbor, weight in adjacencies[direction].neighbors(node):
+                neighbor_cost = cost + weight
+                if neighbor_cost < costs[direction].get(neighbor, math.inf):
+                    costs[direction][neighbor] = neighbor_cost
+                    predecessors[direction][neighbor] = node
+                    heapq.heappush(queues[direction], (neighbor_cost, neighbor))
+
+        if meeting_node is None:
+            return None
+
+        nodes_indices = [meeting_node]
+        while predecessors[0][nodes_indices[-1]] is not None:
+            nodes_indices.append(predecessors[0][nodes_indices[-1]])
+        nodes_indices.reverse()
+        while predecessors[1][nodes_indices[-1]] is not None:
+            nodes_indices.append(predecessors[1][nodes_indices[-1]])
+        return self._unpack(nodes_indices)
+
+    def _unpack(self, nodes_indices: List[int]) -> List[int]:
+        """Replace the shortcuts by the original edges"""
+        path = [nodes_indices[0]]
+        edges_to_unpack = list(zip(nodes_indices, nodes_indices[1:]))[::-1]
+        while edges_to_unpack:
+            from_node, to_node = edges_to_unpack.pop()
+            middle_node = self._shortcuts_middles.get((from_node, to_node), None)
+            if middle_node is None:
+                path.append(to_node)
+            else:
+                edges_to_unpack.extend([(middle_node, to_node), (from_node, middle_node)])
+        return path
@@ -0,0 +1,40 @@
+from typing import Any, Dict, List
+
+from osmrx.globals.queries import OsmFeatureModes
+from osmrx.helpers.cache import DiskCache
+from osmrx.network.speed_profile import SpeedProfile
+
+
+class GraphCache(DiskCache):
+    """Store the built graphs (cleaned ArcFeatures, graph and its mappings) on disk.
+
+    A graph is identified by the network mode, the overpass query, the topology parameters (the nodes to
+    connect) and the speed profile of its travel times: a warm start skips both the overpass query and the topology
+    cleaning.
+    """
+
+    # to increase when the graph state changes
+    __VERSION: int = 5
+
+    def __init__(self, directory: str = "osmrx_cache/graphs", max_size: int | None = 2 * 1024 ** 3,
+                 ttl: float | None = 24 * 3600) -> None:
+        super().__init__(directory, max_size=max_size, ttl=ttl)
+
+    def graph_key(self, mode: OsmFeatureModes, query: str, connected_nodes: List[Dict] | None,
+                  speed_profile: SpeedProfile | None = None) -> str:
+        """Build the key of a graph"""
+        nodes_to_connect = tuple(sorted(
+            node["geometry"].wkb_hex for node in connected_nodes
+        )) if connected_nodes is not None else None
+        speed_profile_digest = speed_profile.digest() if speed_profile is not None else None
+        return self.build_key(self.__VERSION, mode.value, query, nodes_to_connect, speed_profile_digest)
+
+    def get_graph(self, mode: OsmFeatureModes, query: str, connected_nodes: List[Dict] | None,
+                  speed_profile: SpeedProfile | None = None) -> Dict[str, Any] | None:
+        """Return the graph state stored (see GraphCore.dump_state), None if not found"""
+        return self.get(self.graph_key(mode, query, connected_nodes, speed_profile))
+
+    def set_graph(self, mode: OsmFeatureModes, query: str, connected_nodes: List[Dict] | None,
+                  graph_state: Dict[str, Any], speed_profile: SpeedProfile | None = None) -> None:
+        """Store a graph state (see GraphCore.dump_state)"""
+        self.set(self.graph_key(mode, query, connected_nodes, speed_profile), graph_state)
@@ -1,41 +1,70 @@
 from typing import List, Dict
 
+import numpy as np
 import rustworkx as rx
+import shapely
 from rustworkx import PathLengthMapping
-from shapely import MultiPoint, Point, concave_hull
+from shapely import Point, concave_hull
 
 
 class IsochronesFeature:
     _intervals = None
     _intervals_data = None
 
+    __SECONDS_BY_MINUTE: int = 60
+
     def __init__(self, from_node: Point, precision: int = 1):
         self._from_node = from_node  # to be sure to have an ischrone on the from node
         self._precision = precision
         self._data = []
+        self._value_field = "distance"
+        self._weight_by_unit = 1  # to convert the intervals to the weights of the shortest path lengths
 
     def from_distances(self, intervals: List[int]):
+        """Set the intervals in meters, the shortest path lengths are in meters"""
         self.intervals = intervals
         self._intervals_data = {interval: list() for interval in self.intervals[::-1]}
 
-    def from_times(self):
-        # TODO support time
-        ...
+    def from_times(self, intervals: List[int | float]):
+        """Set the intervals in minutes, the shortest path lengths are travel times in seconds"""
+        self.from_distances(intervals)
+        self._value_field = "time"
+        self._weight_by_unit = self.__SECONDS_BY_MINUTE
+
+    def to_weight(self, value: float) -> float:
+        """Convert an interval value to the unit of the shortest path lengths"""
+        return value * self._weight_by_unit
+
+    def build(self, graph: rx.PyGraph | rx.PyDiGraph, shortest_path_lengths: PathLengthMapping | Dict[int, float]):
+        """Build the isochrones from the graph nodes (Point) and the shortest path lengths by node indice (see
+        build_from_coordinates)"""
+        nodes_coordinates = np.full((max(graph.node_indices(), default=-1) + 1, 2), np.nan)
+        nodes_coordinates[np.array(graph.node_indices(), dtype=np.int64)] = shapely.get_coordinates(graph.nodes())
+        self.build_from_coordinates(nodes_coordinates, shortest_path_lengths)
 
-    def build(self, graph: rx.PyGraph | rx.PyDiGraph, shortest_path_lengths: PathLengthMapping):
+    def build_from_coordinates(self, nodes_coordinates: np.ndarray,
+                               shortest_path_lengths: PathLengthMapping | Dict[int, float] | np.ndarray):
+        """Build the isochrones from the nodes coordinates (by node indice) and the shortest path lengths: a
+        mapping by node indice or an array by node indice (inf if not reached)"""
         if self._intervals is None:
             raise ValueError("None interval defined")
 
-        for indice, length in shortest_path_lengths.items():
-            for interval in self.intervals[::-1]:
-                if length < interval[-1]:
-                    self._intervals_data[interval].append(
-                        graph.get_node_data(indice))
+        if not isinstance(shortest_path_lengths, np.ndarray):
+            shortest_path_lengths = lengths_to_array(shortest_path_lengths, nodes_coordinates.shape[0])
 
-        for interval, geom in self._intervals_data.items():
+        # nodes sorted by length: the nodes of an interval are the first ones, up to its upper bound
+        nodes_reached = np.flatnonzero(np.isfinite(shortest_path_lengths))
+        nodes_reached = nodes_reached[np.argsort(shortest_path_lengths[nodes_reached], kind="stable")]
+        upper_bounds = np.array([self.to_weight(interval[-1]) for interval in self._intervals_data],
+                                dtype=np.float64)
+        nb_nodes_by_interval = np.searchsorted(shortest_path_lengths[nodes_reached], upper_bounds, side="left")
+        coordinates_reached = nodes_coordinates[nodes_reached]
+
+        for interval, nb_nodes in zip(self._intervals_data, nb_nodes_by_interval.tolist()):
+            coordinates = coordinates_reached[:nb_nodes]
             if 0 in interval:
-                geom.append(self._from_node)
-            self._intervals_data[interval] = concave_hull(MultiPoint(geom), self._precision)
+                coordinates = np.vstack([coordinates, shapely.get_coordinates(self._from_node)])
+            self._intervals_data[interval] = concave_hull(shapely.multipoints(coordinates), self._precision)
         self._clean_iso()
 
     def _clean_iso(self):
@@ -47,10 +76,10 @@ class IsochronesFeature:
             if pos < len(isochrones_to_clean) - 1:
                 next_isochrone = isochrones_to_clean[pos + 1]
                 self._data.append({"geometry": geom.difference(next_isochrone[-1]),
-                                   "distance": interval})
+                                   self._value_field: interval})
             else:
                 self._data.append({"geometry": geom,
-                                   "distance": interval})
+                                   self._value_field: interval})
 
     @property
     def data(self) -> List[Dict]:
@@ -63,3 +92,12 @@ class IsochronesFeature:
     @intervals.setter
     def intervals(self, intervals: List[float | int]):
         self._intervals = list(zip(intervals, intervals[1:]))
+
+
+def lengths_to_array(shortest_path_lengths: PathLengthMapping | Dict[int, float], nb_nodes: int) -> np.ndarray:
+    """Convert shortest path lengths by node indice to an array by node indice (inf if not reached)"""
+    lengths = np.full(nb_nodes, np.inf)
+    lengths[np.fromiter(shortest_path_lengths.keys(), dtype=np.int64, count=len(shortest_path_lengths))] = (
+        np.fromiter(shortest_path_lengths.values(), dtype=np.float64, count=len(shortest_path_lengths))
+    )
+    return lengths
@@ -1,29 +1,56 @@
-import copy
-from typing import List, Dict
-from typing import TYPE_CHECKING
+import concurrent.futures
+from contextlib import contextmanager
+from typing import Any, Generator, Iterable, List, Dict, Tuple
 
+import numpy as np
 import rustworkx as rx
-from shapely import Point
+import shapely
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from shapely import LineString, Point
+from shapely.ops import substring
 
+from osmrx.helpers.instrumentation import Instrumentation
 from osmrx.helpers.logger import Logger
+from osmrx.helpers.misc import geodesic_lengths, quantize_coordinates
+from osmrx.network.arc_feature import ArcFeature
+from osmrx.network.contraction import ContractionHierarchy
 from osmrx.network.isochrones_feature import IsochronesFeature
+from osmrx.network.nodes_index import NodesIndex
 from osmrx.network.path_feature import PathFeature
+from osmrx.network.search import Adjacency, GreatCircleHeuristic, astar_path, bidirectional_dijkstra_path
+from osmrx.network.speed_profile import SpeedProfile
 from osmrx.topology.cleaner import TopologyCleaner
 
 from osmrx.globals.queries import OsmFeatureModes
 
-if TYPE_CHECKING:
-    from osmrx.network.arc_feature import ArcFeature
-
 
 class GraphCore:
     """Class dedicated to manage/wrappe graph function"""
 
+    # attributes defining a built graph (see dump_state)
+    _state_attributes: Tuple[str, ...] = ("_graph", "_nodes_mapping", "_edges_mapping", "_edges_weights",
+                                          "_edges_times", "_contraction_hierarchies")
+    # edges weights available to compute paths: length (meters) and time (seconds, see SpeedProfile)
+    _weights: Tuple[str, ...] = ("length", "time")
+    # point to point search algorithms, see compute_shortest_path
+    _algorithms: Tuple[str, ...] = ("dijkstra", "astar", "bidirectional", "contraction")
+
+    __MATRIX_CELLS_BY_CHUNK: int = 2 ** 24  # distances computed by a single search chunk (memory bound)
+    __CHUNKS_BY_WORKER: int = 4
+
     def __init__(self, directed: bool = False):
         self.logger = None
         self._graph = None
-        self._nodes_mapping = {}
+        self._nodes_mapping = {}  # node indice by quantized coordinates key (see quantize_coordinates)
         self._edges_mapping = {}
+        self._edges_weights = {}
+        self._edges_times = {}
+        self._weighted_graphs = {}
+        self._search_data = {}  # search graphs, adjacencies and nodes coordinates of the searches
+        self._contraction_hierarchies = {}
+        self._nodes_coordinates = None
+        self._nodes_index = None  # refreshed when nodes are added or removed, see nearest_nodes
         self.directed = directed
 
         if directed:
@@ -46,57 +73,402 @@ class GraphCore:
         """Return the graph"""
         return self._graph
 
+    def dump_state(self) -> Dict[str, Any]:
+        """Return the built graph data, to be stored (see GraphCache)"""
+        return {attribute: getattr(self, attribute) for attribute in self._state_attributes}
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """Restore a built graph from the data returned by dump_state"""
+        for attribute in self._state_attributes:
+            setattr(self, attribute, state[attribute])
+        self._weighted_graphs = {}
+        self._search_data = {}
+        self._nodes_coordinates = None
+        self._nodes_index = None
+
+    @staticmethod
+    def _node_key(node_value: Point) -> int:
+        """Return the key of a node in the nodes mapping: its quantized coordinates"""
+        return int(quantize_coordinates(node_value.coords[0])[0])
+
     def _add_nodes(self, node_value: Point) -> int:
         """Add a node"""
-        if node_value not in self._nodes_mapping:
-            self._nodes_mapping[node_value] = self.graph.add_node(node_value)
-        return self._nodes_mapping[node_value]
+        node_key = self._node_key(node_value)
+        if node_key not in self._nodes_mapping:
+            self._nodes_mapping[node_key] = self.graph.add_node(node_value)
+            self._nodes_coordinates = None
+            if self._nodes_index is not None:
+                self._nodes_index.add([self._nodes_mapping[node_key]], node_value.coords[0])
+        return self._nodes_mapping[node_key]
 
     def add_edge(self, from_node_value: Point, to_node_value: Point, attr: "ArcFeature") -> None:
         """add ege based on 2 nodes"""
         from_indice = self._add_nodes(from_node_value)
         to_indice = self._add_nodes(to_node_value)
         if attr.topo_uuid not in self._edges_mapping:
-            self._edges_mapping[attr.topo_uuid] = self.graph.add_edge(from_indice, to_indice, attr)
+            edge_indice = self.graph.add_edge(from_indice, to_indice, attr)
+            self._edges_mapping[attr.topo_uuid] = edge_indice
+            self._edges_weights[edge_indice] = attr.length
+            if attr.travel_time is not None:
+                self._edges_times[edge_indice] = attr.travel_time
+            self._reset_caches()
         else:
             raise ValueError(f"{attr.topo_uuid} edge exists: it should not!")
 
+    def add_edges(self, arc_features: List["ArcFeature"]) -> None:
+        """Add edges in bulk: their nodes are found from the quantized coordinates of the lines ends, without
+        building a Point by edge"""
+        if len(arc_features) == 0:
+            return
+
+        topo_uuids = [arc_feature.topo_uuid for arc_feature in arc_features]
+        topo_uuids_found = set()
+        for topo_uuid in topo_uuids:
+            if topo_uuid in self._edges_mapping or topo_uuid in topo_uuids_found:
+                raise ValueError(f"{topo_uuid} edge exists: it should not!")
+            topo_uuids_found.add(topo_uuid)
+
+        # the backward edges share the forward geometry: their ends are swapped
+        coordinates, lines_indices = shapely.get_coordinates(
+            [arc_feature._geometry for arc_feature in arc_features], return_index=True
+        )
+        starts = np.searchsorted(lines_indices, np.arange(len(arc_features)), side="left")
+        ends = np.searchsorted(lines_indices, np.arange(len(arc_features)), side="right") - 1
+        backward = np.fromiter((arc_feature.direction == "backward" for arc_feature in arc_features), dtype=bool,
+                               count=len(arc_features))
+        ends_coordinates = coordinates[np.concatenate([np.where(backward, ends, starts),
+                                                       np.where(backward, starts, ends)])]
+
+        nodes_keys, first_positions, inverse = np.unique(
+            quantize_coordinates(ends_coordinates), return_index=True, return_inverse=True
+        )
+        nodes_keys = nodes_keys.tolist()
+        new_nodes = [position for position, node_key in enumerate(nodes_keys) if node_key not in self._nodes_mapping]
+        if len(new_nodes) > 0:
+            new_nodes_coordinates = ends_coordinates[first_positions[new_nodes]]
+            new_nodes_indices = self.graph.add_nodes_from(shapely.points(new_nodes_coordinates).tolist())
+            self._nodes_mapping.update(zip((nodes_keys[position] for position in new_nodes), new_nodes_indices))
+            if self._nodes_index is not None:
+                self._nodes_index.add(list(new_nodes_indices), new_nodes_coordinates)
+        nodes_indices = np.array([self._nodes_mapping[node_key] for node_key in nodes_keys], dtype=np.int64)
+
+        from_indices, to_indices = np.split(nodes_indices[inverse.reshape(-1)], 2)
+        edges_indices = self.graph.add_edges_from(
+            list(zip(from_indices.tolist(), to_indices.tolist(), arc_features))
+        )
+        self._edges_mapping.update(zip(topo_uuids, edges_indices))
+        self._edges_weights.update((edge_indice, arc_feature.length)
+                                   for edge_indice, arc_feature in zip(edges_indices, arc_features))
+        self._edges_times.update((edge_indice, arc_feature.travel_time)
+                                 for edge_indice, arc_feature in zip(edges_indices, arc_features)
+                                 if arc_feature.travel_time is not None)
+        self._reset_caches()
+
+    def _reset_caches(self) -> None:
+        """Drop the data built from the graph edges and nodes"""
+        self._weighted_graphs = {}
+        self._search_data = {}
+        self._contraction_hierarchies = {}
+        self._nodes_coordinates = None
+
+    @property
+    def weighted_graph(self) -> csr_matrix:
+        """Return the graph as a sparse matrix of edge lengths"""
+        return self.get_weighted_graph("length")
+
+    def get_weighted_graph(self, weight: str = "length") -> csr_matrix:
+        """Return the graph as a sparse matrix of edge weights (length or time), built once from the stored
+        weights"""
+        if weight not in self._weights:
+            raise ValueError(f"{weight} weight not supported, use one of {self._weights}")
+
+        if weight not in self._weighted_graphs:
+            edges_weights = self._edges_weights if weight == "length" else self._edges_times
+            if len(edges_weights) != self.graph.num_edges():
+                raise ValueError(f"{weight} weight not found on all the edges: set a speed profile to use times")
+            self._weighted_graphs[weight] = self._build_weighted_graph(weight, edges_weights)
+        return self._weighted_graphs[weight]
+
+    def _build_weighted_graph(self, weight: str, edges_weights: Dict[int, float]) -> csr_matrix:
+        """Build the sparse matrix of a weight from the weights of all the edges"""
+        edges = np.array(self.graph.edge_list(), dtype=np.int64).reshape(-1, 2)
+        weights = np.fromiter((edges_weights[edge_indice] for edge_indice in self.graph.edge_indices()),
+                              dtype=np.float64, count=len(edges))
+        nb_nodes = max(self.graph.node_indices(), default=-1) + 1
+        return csr_matrix((weights, (edges[:, 0], edges[:, 1])), shape=(nb_nodes, nb_nodes))
+
+    @property
+    def nodes_coordinates(self) -> np.ndarray:
+        """Return the nodes coordinates by node indice (nan for a removed node), built once"""
+        if self._nodes_coordinates is None:
+            nb_nodes = max(self.graph.node_indices(), default=-1) + 1
+            self._nodes_coordinates = np.full((nb_nodes, 2), np.nan)
+            self._nodes_coordinates[np.array(self.graph.node_indices(), dtype=np.int64)] = (
+                shapely.get_coordinates(self.graph.nodes())
+            )
+        return self._nodes_coordinates
+
+    def _search_graph(self, weight: str) -> csr_matrix:
+        """Return the matrix read by the native searches, always run as directed: on an undirected graph, the
+        weighted graph with its edges in both directions (the lowest weight kept), built once. Else scipy would
+        transpose the whole matrix on each search"""
+        if self._directed:
+            return self.get_weighted_graph(weight)
+
+        if ("search_graph", weight) not in self._search_data:
+            weighted_graph = self.get_weighted_graph(weight).tocoo()
+            from_indices = np.concatenate([weighted_graph.row, weighted_graph.col])
+            to_indices = np.concatenate([weighted_graph.col, weighted_graph.row])
+            weights = np.concatenate([weighted_graph.data, weighted_graph.data])
+            order = np.lexsort((weights, to_indices, from_indices))
+            from_indices, to_indices, weights = from_indices[order], to_indices[order], weights[order]
+            first = np.ones(len(order), dtype=bool)  # the lowest weight of each (from node, to node) pair
+            first[1:] = (from_indices[1:] != from_indices[:-1]) | (to_indices[1:] != to_indices[:-1])
+            self._search_data[("search_graph", weight)] = csr_matrix(
+                (weights[first], (from_indices[first], to_indices[first])), shape=weighted_graph.shape
+            )
+        return self._search_data[("search_graph", weight)]
+
+    def _dijkstra(self, from_indice: int, return_predecessors: bool = False, cutoff: float | None = None,
+                  weight: str = "length"):
+        """Run a native single source dijkstra on the edge weights, the nodes beyond the cutoff are not expanded
+        (their distance is inf)"""
+        return dijkstra(self._search_graph(weight), directed=True, indices=from_indice,
+                        return_predecessors=return_predecessors, limit=np.inf if cutoff is None else cutoff)
+
+    def compute_distances_within(self, from_node: Point, cutoff: float) -> Dict[int, float]:
+        """Compute the distances (meters) from a node to the nodes reached within the cutoff, by node indice.
+        The search stops at the cutoff: once the search graph is built, its cost depends on the area covered"""
+        distances = self._dijkstra(self.get_node_indice(from_node), cutoff=cutoff)
+        nodes_reached = np.flatnonzero(np.isfinite(distances))
+        return dict(zip(nodes_reached.tolist(), distances[nodes_reached].tolist()))
+
+    def distance_matrix(self, origins: List[Point], destinations: List[Point], weight: str = "length",
+                        cutoff: float | None = None, workers: int | None = None) -> np.ndarray:
+        """Compute the shortest path costs (length or time) from each origin to each destination, without
+        building the paths: a matrix (origins, destinations), inf if a destination is not reached (or beyond the
+        cutoff)
+
+        workers: number of processes running the searches (None: on the current process)
+        """
+        origins_indices = np.array([self.get_node_indice(node) for node in origins], dtype=np.int64)
+        destinations_indices = np.array([self.get_node_indice(node) for node in destinations], dtype=np.int64)
+        search_graph = self._search_graph(weight)
+
+        # a search chunk returns the distances to all the nodes
+        chunk_size = max(1, self.__MATRIX_CELLS_BY_CHUNK // max(search_graph.shape[0], 1))
+        if workers is not None:
+            chunk_size = min(chunk_size, max(1, len(origins_indices) // (workers * self.__CHUNKS_BY_WORKER)))
+        origins_chunks = [origins_indices[start:start + chunk_size]
+                          for start in range(0, len(origins_indices), chunk_size)]
+        if len(origins_chunks) == 0:
+            return np.empty((0, len(destinations_indices)))
+
+        with Instrumentation.shared().stage("query.distance_matrix", weight=weight,
+                                            workers=str(workers or 1)) as measure:
+            if workers is None:
+                rows = [
+                    compute_distances_rows(search_graph, origins_chunk, destinations_indices, cutoff)
+                    for origins_chunk in origins_chunks
+                ]
+            else:
+                with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=workers,
+                    initializer=_init_distance_matrix_process,
+                    initargs=(search_graph, destinations_indices, cutoff),  # sent once by process
+                ) as executor:
+                    rows = list(executor.map(_compute_distances_rows, origins_chunks))
+            measure.count("cells", len(origins_indices) * len(destinations_indices))
+        return np.vstack(rows)
+
+    def nearest_nodes_indices(self, coordinates: np.ndarray) -> np.ndarray:
+        """Return the indices of the nearest nodes of some coordinates (lon, lat), see NodesIndex: built on the
+        first lookup, then refreshed when nodes are added or removed"""
+        if self._nodes_index is None:
+            nodes_indices = np.flatnonzero(~np.isnan(self.nodes_coordinates[:, 0]))
+            self._nodes_index = NodesIndex(nodes_indices, self.nodes_coordinates[nodes_indices])
+        nodes_indices, _ = self._nodes_index.nearest(coordinates)
+        return nodes_indices
+
+    def nearest_nodes(self, points: List[Point]) -> List[Point]:
+        """Return the nearest graph node of each point"""
+        nodes_indices = self.nearest_nodes_indices(shapely.get_coordinates(points))
+        return [self.graph[node_indice] for node_indice in nodes_indices.tolist()]
+
+    def nearest_node(self, point: Point) -> Point:
+        """Return the nearest graph node of a point"""
+        return self.nearest_nodes([point])[0]
+
     def get_node_indice(self, node_value: Point) -> int | None:
         """Return the node value from indice"""
-        if node_value in self._nodes_mapping:
-            return self._nodes_mapping[node_value]
+        node_indice = self._nodes_mapping.get(self._node_key(node_value), None)
+        if node_indice is not None:
+            return node_indice
         raise ValueError(f"{node_value} node not found!")
 
-    def compute_shortest_path(self, from_node: Point, to_node: Point) -> List[PathFeature]:
-        """Compute a shortest path from a node to an ohter node"""
-        edges = rx.dijkstra_shortest_paths(
-            self.graph,
-            self.get_node_indice(from_node),
-            self.get_node_indice(to_node),
-            weight_fn=lambda edge: edge.length)
-
-        return [
-            PathFeature(self.graph, node_indices)
-            for _, node_indices in edges.items()
-        ]
+    def compute_shortest_path(self, from_node: Point, to_node: Point, weight: str = "length",
+                              algorithm: str = "dijkstra") -> List[PathFeature]:
+        """Compute a shortest path from a node to an ohter node, the shortest by length or by time
+
+        algorithm: dijkstra (native, explores all the directions), astar (guided to the target by the great circle
+        distance), bidirectional (dijkstra from the source and from the target) or contraction (on the contraction
+        hierarchy, prepared on the first query, see prepare_contraction_hierarchy)
+        """
+        with Instrumentation.shared().stage("query.shortest_path", algorithm=algorithm, weight=weight) as measure:
+            from_indice = self.get_node_indice(from_node)
+            to_indice = self.get_node_indice(to_node)
+            if from_indice == to_indice:
+                return []
+
+            node_indices = self._find_path_nodes(from_indice, to_indice, weight, algorithm)
+            if node_indices is None:
+                # no path found
+                return []
+            measure.count("paths")
+            measure.count("path_nodes", len(node_indices))
+            return [self._build_path(node_indices)]
+
+    def _find_path_nodes(self, from_indice: int, to_indice: int, weight: str, algorithm: str) -> List[int] | None:
+        if algorithm == "dijkstra":
+            return self._dijkstra_path(from_indice, to_indice, weight)
+        elif algorithm == "astar":
+            return astar_path(self._adjacency(weight), from_indice, to_indice,
+                              self._great_circle_heuristic(to_indice, weight))
+        elif algorithm == "bidirectional":
+            return bidirectional_dijkstra_path(self._adjacency(weight), self._adjacency(weight, reverse=True),
+                                               from_indice, to_indice)
+        elif algorithm == "contraction":
+            return self.prepare_contraction_hierarchy(weight).shortest_path(from_indice, to_indice)
+        raise ValueError(f"{algorithm} algorithm not supported, use one of {self._algorithms}")
+
+    def _edges_lookup(self) -> Tuple[csr_matrix, Dict[str, np.ndarray]]:
+        """Return the edge indice of each (from node, to node) pair, as a sparse matrix of signed indices + 1
+        (negative when an undirected edge is read backward), and the edges weights by edge indice, built once"""
+        if "edges_lookup" not in self._search_data:
+            edges = np.array(self.graph.edge_list(), dtype=np.int64).reshape(-1, 2)
+            edges_indices = np.array(self.graph.edge_indices(), dtype=np.int64)
+            from_indices, to_indices, values = edges[:, 0], edges[:, 1], edges_indices + 1
+            if not self._directed:
+                from_indices, to_indices = (np.concatenate([from_indices, to_indices]),
+                                            np.concatenate([to_indices, from_indices]))
+                values = np.concatenate([values, -values])
+            nb_nodes = max(self.graph.node_indices(), default=-1) + 1
+            edges_lookup = csr_matrix((values, (from_indices, to_indices)), shape=(nb_nodes, nb_nodes))
+
+            nb_edges = max(edges_indices.tolist(), default=-1) + 1
+            edges_weights = {}
+            for weight, weights in (("length", self._edges_weights), ("time", self._edges_times)):
+                if len(weights) == len(edges_indices):
+                    edges_weights[weight] = np.full(nb_edges, np.nan)
+                    edges_weights[weight][np.fromiter(weights, dtype=np.int64, count=len(weights))] = (
+                        np.fromiter(weights.values(), dtype=np.float64, count=len(weights)))
+            self._search_data["edges_lookup"] = (edges_lookup, edges_weights)
+        return self._search_data["edges_lookup"]
+
+    def _build_path(self, node_indices: List[int]) -> PathFeature:
+        """Build a path from its nodes: its edges and cumulative weights are found with array lookups"""
+        edges_lookup, edges_weights = self._edges_lookup()
+        node_indices = np.asarray(node_indices, dtype=np.int64)
+        values = np.asarray(edges_lookup[node_indices[:-1], node_indices[1:]]).reshape(-1)
+        edges_indices = np.abs(values) - 1
+        cumulative_weights = {
+            weight: np.concatenate([[0.0], np.cumsum(weights[edges_indices])])
+            for weight, weights in edges_weights.items()
+        }
+        return PathFeature(self.graph, node_indices, edges_indices, values < 0,
+                           cumulative_weights.get("length", None), cumulative_weights.get("time", None))
+
+    def has_contraction_hierarchy(self, weight: str = "length") -> bool:
+        """Return True if the contraction hierarchy of a weight is prepared"""
+        return weight in self._contraction_hierarchies
+
+    def prepare_contraction_hierarchy(self, weight: str = "length") -> ContractionHierarchy:
+        """Build the contraction hierarchy of a weight, once: it is kept with the graph state (see GraphCache) and
+        reset when an edge is added. Worth it when many paths are computed on a graph which does not change"""
+        if weight not in self._contraction_hierarchies:
+            with Instrumentation.shared().stage("graph.contraction", weight=weight) as measure:
+                self._contraction_hierarchies[weight] = ContractionHierarchy.from_graph(
+                    self.get_weighted_graph(weight), self._directed
+                )
+                measure.count("shortcuts", self._contraction_hierarchies[weight].nb_shortcuts)
+            if self.logger is not None:
+                self.logger.info(f"Contraction hierarchy prepared on {weight} "
+                                 f"({self._contraction_hierarchies[weight].nb_shortcuts} shortcuts)")
+        return self._contraction_hierarchies[weight]
+
+    def _dijkstra_path(self, from_indice: int, to_indice: int, weight: str) -> List[int] | None:
+        _, predecessors = self._dijkstra(from_indice, return_predecessors=True, weight=weight)
+        if predecessors[to_indice] < 0:
+            return None
+
+        node_indices = [to_indice]
+        while node_indices[-1] != from_indice:
+            node_indices.append(int(predecessors[node_indices[-1]]))
+        return node_indices[::-1]
+
+    def _adjacency(self, weight: str, reverse: bool = False) -> Adjacency:
+        """Return the outgoing edges (incoming ones if reverse) of the nodes, used by the python searches"""
+        if (weight, reverse) not in self._search_data:
+            weighted_graph = self.get_weighted_graph(weight).tocoo()
+            from_indices, to_indices, weights = weighted_graph.row, weighted_graph.col, weighted_graph.data
+            if not self._directed:
+                from_indices, to_indices = (np.concatenate([from_indices, to_indices]),
+                                            np.concatenate([to_indices, from_indices]))
+                weights = np.concatenate([weights, weights])
+            if reverse:
+                from_indices, to_indices = to_indices, from_indices
+            self._search_data[(weight, reverse)] = Adjacency(weighted_graph.shape[0], from_indices, to_indices,
+                                                             weights)
+        return self._search_data[(weight, reverse)]
+
+    def _great_circle_heuristic(self, to_indice: int, weight: str) -> GreatCircleHeuristic:
+        """Return the A* heuristic to a target node: the great circle distance, as a travel time for the time weight
+        (at the highest speed found on the edges)"""
+        if "nodes_radians" not in self._search_data:
+            nodes_radians = np.radians(self.nodes_coordinates)
+            self._search_data["nodes_radians"] = (nodes_radians[:, 0].tolist(), nodes_radians[:, 1].tolist())
+
+        if weight == "time" and "max_speed" not in self._search_data:
+            self.get_weighted_graph("time")  # check the travel times
+            lengths = np.fromiter(map(self._edges_weights.get, self._edges_times), dtype=np.float64)
+            times = np.fromiter(self._edges_times.values(), dtype=np.float64)
+            self._search_data["max_speed"] = np.max(lengths[times > 0] / times[times > 0], initial=0.0)
+
+        cost_by_meter = 1.0
+        if weight == "time":
+            cost_by_meter = 1 / self._search_data["max_speed"] if self._search_data["max_speed"] > 0 else 0.0
+        return GreatCircleHeuristic(*self._search_data["nodes_radians"], to_indice, cost_by_meter)
 
     def compute_isochrone_from_distance(self, from_node: Point, intervals: List[int],
                                         precision: float | int = 1.0) -> IsochronesFeature:
-        """Compute isochrone from a distance interval"""
+        """Compute isochrone from a distance interval (meters)"""
+        return self._compute_isochrone(from_node, intervals, precision, "length")
+
+    def compute_isochrone_from_time(self, from_node: Point, intervals: List[int | float],
+                                    precision: float | int = 1.0) -> IsochronesFeature:
+        """Compute isochrone from a time interval (minutes), based on the edges travel times"""
+        return self._compute_isochrone(from_node, intervals, precision, "time")
+
+    def _compute_isochrone(self, from_node: Point, intervals: List[int | float], precision: float | int,
+                           weight: str) -> IsochronesFeature:
         intervals.sort()
         assert intervals[0] == 0, "The intervals must start with 0"
 
-        from_node_indice = self.get_node_indice(from_node)
-        weight_attribute_func = lambda edge: edge.length  # noqa
-
-        if self._directed:
-            edges = rx.digraph_dijkstra_shortest_path_lengths(self.graph, from_node_indice, weight_attribute_func)
+        iso_session = IsochronesFeature(from_node, precision)
+        if weight == "time":
+            iso_session.from_times(intervals)
         else:
-            edges = rx.dijkstra_shortest_path_lengths(self.graph, from_node_indice, weight_attribute_func)
+            iso_session.from_distances(intervals)
 
-        iso_session = IsochronesFeature(from_node, precision)
-        iso_session.from_distances(intervals)
-        iso_session.build(self.graph, edges)
+        with Instrumentation.shared().stage("query.isochrone", weight=weight) as measure:
+            from_node_indice = self.get_node_indice(from_node)
+            # the nodes beyond the largest interval are not explored
+            distances = self._dijkstra(from_node_indice, cutoff=iso_session.to_weight(intervals[-1]), weight=weight)
+            # the source node is excluded, as done by rustworkx
+            distances[from_node_indice] = np.inf
+            measure.count("nodes_reached", int(np.isfinite(distances).sum()))
+
+            iso_session.build_from_coordinates(self.nodes_coordinates, distances)
         return iso_session
 
     def _build_data_and_graph(self):
@@ -107,6 +479,8 @@ class GraphCore:
 
 class NetworkRxCore(GraphCore):
     """Base class to build a graph from data"""
+    _state_attributes: Tuple[str, ...] = GraphCore._state_attributes + ("_features",)
+
     def __init__(self, directed: bool = False, logger: Logger | None = None):
 
         super().__init__(directed=directed)
@@ -115,6 +489,9 @@ class NetworkRxCore(GraphCore):
 
         self._connected_nodes = None
         self._line_features = []  # TODO support None value
+        self._topology_workers = None
+        self._speed_profile = None
+        self._virtual_state = None  # virtual nodes and edges inserted, and the graph caches before them
 
         if logger is None:
             self.logger = Logger().logger
@@ -122,13 +499,13 @@ class NetworkRxCore(GraphCore):
             self.logger = logger  # TODO: add a logger if not set
 
     @property
-    def line_features(self) -> List[Dict]:
-        """return the connected nodes added"""
+    def line_features(self) -> Iterable[Dict]:
+        """return the line features used to build the graph"""
         return self._line_features
 
     @line_features.setter
-    def line_features(self, line_features: List[Dict]):
-        """Set the nodes to connect on the network and build the graph
+    def line_features(self, line_features: Iterable[Dict]):
+        """Set the line features and build the graph, they can be a generator (consumed once)
         Be careful, set the connected nodes before using this function"""
         self._line_features = line_features
         self._build_data_and_graph()
@@ -143,6 +520,27 @@ class NetworkRxCore(GraphCore):
         """Set the nodes to connect on the network, avoid to add duplicated nodes"""
         self._connected_nodes = connected_nodes
 
+    @property
+    def topology_workers(self) -> int | None:
+        """return the number of processes used to clean the topology"""
+        return self._topology_workers
+
+    @topology_workers.setter
+    def topology_workers(self, topology_workers: int | None):
+        """Set the number of processes used to clean the topology (None: on the current process)"""
+        self._topology_workers = topology_workers
+
+    @property
+    def speed_profile(self) -> SpeedProfile | None:
+        """return the speed profile used to compute the edges travel times"""
+        return self._speed_profile
+
+    @speed_profile.setter
+    def speed_profile(self, speed_profile: SpeedProfile | None):
+        """Set the speed profile used to compute the edges travel times (None: no travel time)
+        Be careful, set it before building the graph"""
+        self._speed_profile = speed_profile
+
     @property
     def features(self) -> "List[ArcFeature]":
         """Return the graph features from the graph"""
@@ -151,20 +549,229 @@ class NetworkRxCore(GraphCore):
     def _build_data_and_graph(self):
         """Topology cleaning and graph building"""
         # TODO remove ids attributes constraint on TopologyCleaner
-        arc_features = TopologyCleaner(self.logger, self._line_features, self.connected_nodes, 
-                                       None).build_arc_features()
-
-        _ = [self._adding_edge(arc_feature)
-             for arc_feature in arc_features]
+        arc_features = list(TopologyCleaner(self.logger, self._line_features, self.connected_nodes,
+                                            None, workers=self._topology_workers).build_arc_features())
+
+        # geodesic lengths are computed once, in bulk, and used as edge weights
+        lengths = geodesic_lengths([arc_feature.geometry for arc_feature in arc_features])
+        for arc_feature, length in zip(arc_features, lengths.tolist()):
+            arc_feature.length = length
+
+        # travel times too, as a second edge weight
+        if self._speed_profile is not None:
+            travel_times = self._speed_profile.travel_times(
+                lengths, [arc_feature.attributes for arc_feature in arc_features]
+            )
+            for arc_feature, travel_time in zip(arc_features, travel_times.tolist()):
+                arc_feature.travel_time = travel_time
+
+        with Instrumentation.shared().stage("graph.build", directed=str(self._directed)) as measure:
+            self.add_edges([edge_feature
+                            for arc_feature in arc_features
+                            for edge_feature in self._edge_features(arc_feature)])
+            measure.count("arc_features", len(arc_features))
+            measure.count("edges", self.graph.num_edges())
+            measure.count("nodes", self.graph.num_nodes())
         super()._build_data_and_graph()
 
-    def _adding_edge(self, arc_feature: "ArcFeature"):
-        """Add edge on graph function"""
-        self.add_edge(
-            arc_feature.from_point,
-            arc_feature.to_point,
-            arc_feature
-        )
+    def _edge_features(self, arc_feature: "ArcFeature") -> List["ArcFeature"]:
+        """Return the edges to add for an arc feature"""
+        return [arc_feature]
+
+    def add_virtual_nodes(self, points: List[Point]) -> List[Point]:
+        """Insert temporary nodes on the built graph, at the projection of each point on its nearest edge, and
+        return them (the graph node of each point).
+
+        The edges found are kept: they are overlaid by edges split at the virtual nodes. The graph caches are kept
+        aside and restored by remove_virtual_nodes, to call once the queries are done (see virtual_nodes).
+        """
+        if self._virtual_state is not None:
+            raise ValueError("Virtual nodes are already inserted: remove them first")
+
+        edges_tree, edges_indices = self._edges_tree()
+        # one edge by point (the forward and backward edges are at the same distance)
+        points_positions, tree_positions = edges_tree.query_nearest(points, all_matches=False)
+        nearest_edges = np.empty(len(points), dtype=np.int64)
+        nearest_edges[points_positions] = edges_indices[tree_positions]
+
+        # the points of an edge (and of its reverse edge) split it together
+        points_by_edge = {}
+        for point, edge_indice in zip(points, nearest_edges.tolist()):
+            endpoints = frozenset(self.graph.get_edge_endpoints_by_index(edge_indice))
+            points_by_edge.setdefault(endpoints, []).append(point)
+
+        self._virtual_state = {
+            "nodes": [], "edges": [], "paths": [],
+            "caches": (self._weighted_graphs, self._search_data, self._contraction_hierarchies),
+        }
+        with Instrumentation.shared().stage("graph.virtual_nodes") as measure:
+            nodes_found = {}
+            for endpoints, edge_points in points_by_edge.items():
+                nodes_found.update(self._split_edges_virtually(endpoints, edge_points))
+            measure.count("nodes_added", len(self._virtual_state["nodes"]))
+            measure.count("edges_added", len(self._virtual_state["edges"]))
+        return [nodes_found[point] for point in points]
+
+    def _edges_tree(self) -> Tuple[shapely.STRtree, np.ndarray]:
+        """Return a spatial index of the edges geometries, built once"""
+        if "edges_tree" not in self._search_data:
+            edges_indices = np.array(self.graph.edge_indices(), dtype=np.int64)
+            self._search_data["edges_tree"] = (
+                shapely.STRtree([edge.geometry for edge in self.graph.edges()]), edges_indices
+            )
+        return self._search_data["edges_tree"]
+
+    def _split_edges_virtually(self, endpoints: frozenset, points: List[Point]) -> Dict[Point, Point]:
+        """Overlay the edges between 2 nodes (both directions) by edges split at the projection of the points"""
+        from_indice, to_indice = (sorted(endpoints) * 2)[:2]  # a loop has a single endpoint
+        edges_indices = {*self.graph.edge_indices_from_endpoints(from_indice, to_indice),
+                         *self.graph.edge_indices_from_endpoints(to_indice, from_indice)}
+
+        reference = self.graph.get_edge_data_by_index(min(edges_indices)).geometry
+        projections = shapely.line_interpolate_point(reference, shapely.line_locate_point(reference, points))
+        nodes_found = {}
+        virtual_nodes = {}
+        for point, projection in zip(points, projections):
+            node = Point(projection.coords[0])
+            if self._node_key(node) not in self._nodes_mapping:
+                node_indice = self._add_nodes(node)
+                self._virtual_state["nodes"].append(node_indice)
+                virtual_nodes[node_indice] = node
+            # a projection on an edge end is its existing node
+            nodes_found[point] = self.graph[self.get_node_indice(node)]
+
+        virtual_nodes = list(virtual_nodes.values())
+        for edge_indice in sorted(edges_indices):
+            self._add_virtual_edges(edge_indice, virtual_nodes)
+        return nodes_found
+
+    def _add_virtual_edges(self, edge_indice: int, virtual_nodes: List[Point]) -> None:
+        """Add the parts of an edge split at the virtual nodes, their weights are in proportion of their lengths"""
+        if len(virtual_nodes) == 0:
+            return
+
+        arc_feature = self.graph.get_edge_data_by_index(edge_indice)
+        geometry = arc_feature.geometry
+        positions = shapely.line_locate_point(geometry, virtual_nodes)
+        order = np.argsort(positions, kind="stable")
+
+        # the parts end exactly on the nodes coordinates: the nodes are found by their coordinates
+        boundaries = [geometry.coords[0], *(virtual_nodes[node_position].coords[0] for node_position in order),
+                      geometry.coords[-1]]
+        cuts = [0.0, *positions[order].tolist(), geometry.length]
+        parts = [
+            LineString([start_coordinates, *shapely.get_coordinates(substring(geometry, start, end))[1:-1].tolist(),
+                        end_coordinates])
+            for start, end, start_coordinates, end_coordinates in zip(cuts, cuts[1:], boundaries, boundaries[1:])
+        ]
+        lengths = geodesic_lengths(parts)
+        for position, (part, length) in enumerate(zip(parts, lengths.tolist())):
+            virtual_feature = ArcFeature(part)
+            virtual_feature.topo_uuid = f"virtual_{edge_indice}_{position}"
+            virtual_feature.topo_status = "virtual"
+            virtual_feature.attributes = arc_feature.attributes
+            virtual_feature.length = length
+            if arc_feature.travel_time is not None:
+                virtual_feature.travel_time = arc_feature.travel_time * length / max(lengths.sum(), 1e-12)
+            self.add_edge(virtual_feature.from_point, virtual_feature.to_point, virtual_feature)
+            self._virtual_state["edges"].append(self._edges_mapping[virtual_feature.topo_uuid])
+
+    def remove_virtual_nodes(self) -> None:
+        """Remove the virtual nodes and edges, and restore the graph caches"""
+        if self._virtual_state is None:
+            return
+
+        # the paths found on virtual edges read them before they are removed (their indices are reused)
+        virtual_edges = np.array(self._virtual_state["edges"], dtype=np.int64)
+        for path in self._virtual_state["paths"]:
+            if np.isin(path.edges_indices, virtual_edges).any():
+                path.detach()
+
+        for edge_indice in self._virtual_state["edges"]:
+            arc_feature = self.graph.get_edge_data_by_index(edge_indice)
+            del self._edges_mapping[arc_feature.topo_uuid]
+            del self._edges_weights[edge_indice]
+            self._edges_times.pop(edge_indice, None)
+            self.graph.remove_edge_from_index(edge_indice)
+        for node_indice in self._virtual_state["nodes"]:
+            del self._nodes_mapping[self._node_key(self.graph[node_indice])]
+            self.graph.remove_node(node_indice)
+        if self._nodes_index is not None:
+            self._nodes_index.remove(self._virtual_state["nodes"])
+
+        self._weighted_graphs, self._search_data, self._contraction_hierarchies = self._virtual_state["caches"]
+        self._nodes_coordinates = None
+        self._virtual_state = None
+
+    @contextmanager
+    def virtual_nodes(self, points: List[Point]) -> Generator[List[Point], Any, None]:
+        """Insert virtual nodes for the queries run in the context (see add_virtual_nodes)"""
+        try:
+            yield self.add_virtual_nodes(points)
+        finally:
+            self.remove_virtual_nodes()
+
+    def compute_shortest_path(self, from_node: Point, to_node: Point, weight: str = "length",
+                              algorithm: str = "dijkstra") -> List[PathFeature]:
+        """See GraphCore.compute_shortest_path: with virtual nodes, the contraction hierarchy does not include them,
+        the bidirectional search is used instead of contracting the graph again"""
+        if algorithm == "contraction" and self._virtual_state is not None:
+            algorithm = "bidirectional"
+        return super().compute_shortest_path(from_node, to_node, weight, algorithm)
+
+    def _build_path(self, node_indices: List[int]) -> PathFeature:
+        """See GraphCore._build_path: the paths built with virtual nodes are kept, to be detached from the graph when
+        the virtual nodes are removed"""
+        path = super()._build_path(node_indices)
+        if self._virtual_state is not None:
+            self._virtual_state["paths"].append(path)
+        return path
+
+    def _build_weighted_graph(self, weight: str, edges_weights: Dict[int, float]) -> csr_matrix:
+        """With virtual edges, they are added to the matrix of the graph without them, if it was built"""
+        base_graph = None
+        if self._virtual_state is not None:
+            base_graph = self._virtual_state["caches"][0].get(weight, None)
+        if base_graph is None:
+            return super()._build_weighted_graph(weight, edges_weights)
+
+        base_edges = base_graph.tocoo()
+        edges = np.array([self.graph.get_edge_endpoints_by_index(edge_indice)
+                          for edge_indice in self._virtual_state["edges"]], dtype=np.int64).reshape(-1, 2)
+        weights = np.fromiter(map(edges_weights.get, self._virtual_state["edges"]), dtype=np.float64,
+                              count=len(edges))
+        nb_nodes = max(self.graph.node_indices(), default=-1) + 1
+        return csr_matrix((np.concatenate([base_edges.data, weights]),
+                           (np.concatenate([base_edges.row, edges[:, 0]]),
+                            np.concatenate([base_edges.col, edges[:, 1]]))), shape=(nb_nodes, nb_nodes))
+
+
+def compute_distances_rows(search_graph: csr_matrix, origins_indices: np.ndarray,
+                           destinations_indices: np.ndarray, cutoff: float | None) -> np.ndarray:
+    """Run a native dijkstra from each origin on a search graph (see GraphCore._search_graph), return the distances
+    to the destinations"""
+    distances = dijkstra(search_graph, directed=True, indices=origins_indices,
+                         limit=np.inf if cutoff is None else cutoff)
+    return distances.reshape(len(origins_indices), -1)[:, destinations_indices]
+
+
+# graph and settings of a distance matrix, set once on each process (see GraphCore.distance_matrix)
+_process_search_graph: csr_matrix | None = None
+_process_destinations_indices: np.ndarray | None = None
+_process_cutoff: float | None = None
+
+
+def _init_distance_matrix_process(search_graph: csr_matrix, destinations_indices: np.ndarray,
+                                  cutoff: float | None) -> None:
+    global _process_search_graph, _process_destinations_indices, _process_cutoff
+    _process_search_graph = search_graph
+    _process_destinations_indices = destinations_indices
+    _process_cutoff = cutoff
+
+
+def _compute_distances_rows(origins_indices: np.ndarray) -> np.ndarray:
+    return compute_distances_rows(_process_search_graph, origins_indices, _process_destinations_indices,
+                                  _process_cutoff)
 
 
 class OsmNetworkManager(NetworkRxCore):
@@ -175,24 +782,21 @@ class OsmNetworkManager(NetworkRxCore):
 
         super().__init__(directed=mode == OsmFeatureModes.vehicle,
                          logger=logger)
+        self.speed_profile = SpeedProfile.from_mode(mode)
 
     @property
     def mode(self) -> OsmFeatureModes:
         return self._mode
 
-    def _adding_edge(self, arc_feature: "ArcFeature"):
-        super()._adding_edge(arc_feature=arc_feature)
+    def _edge_features(self, arc_feature: "ArcFeature") -> List["ArcFeature"]:
+        """Return the edges to add for an arc feature: with its backward edge on the two-way vehicle roads"""
+        edge_features = super()._edge_features(arc_feature)
 
         if self._mode == OsmFeatureModes.vehicle:
             if arc_feature.attributes.get("junction", None) in ["roundabout", "jughandle"]:
                 # do nothing
-                return
+                return edge_features
 
             if not arc_feature.attributes.get("oneway", None) == "yes":
-                arc_feature_backward = copy.deepcopy(arc_feature)
-                arc_feature_backward.direction = "backward"
-                self.add_edge(
-                    arc_feature_backward.from_point,
-                    arc_feature_backward.to_point,
-                    arc_feature_backward
-                )
+                edge_features.append(arc_feature.reversed_feature())
+        return edge_features
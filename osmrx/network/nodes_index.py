@@ -0,0 +1,111 @@
+from typing import Dict, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+class NodesIndex:
+    """Nearest node lookup on the graph nodes coordinates (lon, lat).
+
+    The KD-tree is built once: the nodes added later are kept apart in a small KD-tree of their own, the nodes removed
+    are masked, until there are too many of them and the tree is built again. The longitudes are scaled by the
+    cosine of the mean latitude: to compare distances in degrees of latitude.
+    """
+
+    __MIN_PENDING_NODES: int = 256  # nodes added kept apart, before building the tree again
+    __PENDING_NODES_RATIO: float = 0.01
+    __MAX_REMOVED_NODES: int = 32  # each node removed from the tree adds a neighbor to query
+
+    def __init__(self, nodes_indices: np.ndarray, nodes_coordinates: np.ndarray) -> None:
+        """
+        nodes_indices: the graph indices of the nodes
+        nodes_coordinates: their coordinates (lon, lat)
+        """
+        nodes_indices = np.asarray(nodes_indices, dtype=np.int64)
+        nodes_coordinates = np.asarray(nodes_coordinates, dtype=np.float64).reshape(-1, 2)
+        if len(nodes_indices) == 0:
+            raise ValueError("The graph has no node")
+
+        self._scale = np.array([np.cos(np.radians(nodes_coordinates[:, 1].mean())), 1.0])
+        self._tree = cKDTree(nodes_coordinates * self._scale)
+        self._tree_indices = nodes_indices
+        self._tree_positions = dict(zip(nodes_indices.tolist(), range(len(nodes_indices))))
+        self._removed_positions = set()
+        self._pending_nodes: Dict[int, np.ndarray] = {}  # scaled coordinates by node indice
+        self._pending_tree: Tuple[np.ndarray, cKDTree] | None = None  # built on the first query
+
+    def __len__(self) -> int:
+        return len(self._tree_indices) - len(self._removed_positions) + len(self._pending_nodes)
+
+    def add(self, nodes_indices: np.ndarray, nodes_coordinates: np.ndarray) -> None:
+        """Add nodes (a node indice reused by the graph replaces the node removed)"""
+        nodes_coordinates = np.asarray(nodes_coordinates, dtype=np.float64).reshape(-1, 2) * self._scale
+        for node_indice, coordinates in zip(np.asarray(nodes_indices).tolist(), nodes_coordinates):
+            if node_indice in self._tree_positions:
+                self._removed_positions.add(self._tree_positions.pop(node_indice))
+            self._pending_nodes[node_indice] = coordinates
+        self._pending_tree = None
+        self._rebuild_if_needed()
+
+    def remove(self, nodes_indices: np.ndarray) -> None:
+        """Remove nodes"""
+        for node_indice in np.asarray(nodes_indices).tolist():
+            if node_indice in self._pending_nodes:
+                del self._pending_nodes[node_indice]
+                self._pending_tree = None
+            elif node_indice in self._tree_positions:
+                self._removed_positions.add(self._tree_positions.pop(node_indice))
+        self._rebuild_if_needed()
+
+    def _rebuild_if_needed(self) -> None:
+        max_pending_nodes = max(self.__MIN_PENDING_NODES, int(len(self._tree_indices) * self.__PENDING_NODES_RATIO))
+        if len(self._pending_nodes) <= max_pending_nodes and len(self._removed_positions) <= self.__MAX_REMOVED_NODES:
+            return
+
+        nodes_indices = np.fromiter(self._tree_positions, dtype=np.int64, count=len(self._tree_positions))
+        tree_positions = np.fromiter(self._tree_positions.values(), dtype=np.int64, count=len(nodes_indices))
+        nodes_coordinates = self._tree.data[tree_positions]
+        if len(self._pending_nodes) > 0:
+            nodes_indices = np.concatenate([nodes_indices, np.fromiter(self._pending_nodes, dtype=np.int64)])
+            nodes_coordinates = np.vstack([nodes_coordinates, np.array(list(self._pending_nodes.values()))])
+
+        # the scaled coordinates are kept: the scale does not change
+        self._tree = cKDTree(nodes_coordinates)
+        self._tree_indices = nodes_indices
+        self._tree_positions = dict(zip(nodes_indices.tolist(), range(len(nodes_indices))))
+        self._removed_positions = set()
+        self._pending_nodes = {}
+        self._pending_tree = None
+
+    def nearest(self, coordinates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the indices of the nearest nodes of some coordinates (lon, lat), and their distances (in degrees
+        of latitude)"""
+        if len(self) == 0:
+            raise ValueError("The graph has no node")
+        coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2) * self._scale
+
+        distances = np.full(len(coordinates), np.inf)
+        nodes_indices = np.full(len(coordinates), -1, dtype=np.int64)
+        if len(self._tree_positions) > 0:
+            # enough neighbors to find one not removed
+            nb_neighbors = min(len(self._removed_positions) + 1, len(self._tree_indices))
+            tree_distances, positions = self._tree.query(coordinates, k=nb_neighbors)
+            tree_distances = tree_distances.reshape(len(coordinates), nb_neighbors)
+            positions = positions.reshape(len(coordinates), nb_neighbors)
+            if len(self._removed_positions) > 0:
+                removed = np.isin(positions, list(self._removed_positions))
+                tree_distances[removed] = np.inf
+            nearest = np.argmin(tree_distances, axis=1)
+            distances = tree_distances[np.arange(len(coordinates)), nearest]
+            nodes_indices = self._tree_indices[positions[np.arange(len(coordinates)), nearest]]
+
+        if len(self._pending_nodes) > 0:
+            if self._pending_tree is None:
+                self._pending_tree = (np.fromiter(self._pending_nodes, dtype=np.int64),
+                                      cKDTree(np.array(list(self._pending_nodes.values()))))
+            pending_indices, pending_tree = self._pending_tree
+            pending_distances, nearest = pending_tree.query(coordinates)
+            closer = pending_distances < distances
+            distances[closer] = pending_distances[closer]
+            nodes_indices[closer] = pending_indices[nearest[closer]]
+        return nodes_indices, distances
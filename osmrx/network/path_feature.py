@@ -1,33 +1,108 @@
 from typing import List, Dict
 
-from shapely import LineString, MultiLineString
-from shapely.ops import linemerge
+import numpy as np
+import shapely
+from shapely import LineString
 
 from osmrx.network.arc_feature import ArcFeature
 
 
 class PathFeature:
+    """A path found on a graph: its nodes, edges and cumulative weights as arrays. The geometry and the edges
+    attributes are read from the graph on demand"""
+
     _graph = None
     _nodes_indices = None
     _features = None
 
-    def __init__(self, graph, nodes_indice: List[int]):
+    def __init__(self, graph, nodes_indice: List[int] | np.ndarray, edges_indices: np.ndarray | None = None,
+                 reversed_edges: np.ndarray | None = None, cumulative_lengths: np.ndarray | None = None,
+                 cumulative_times: np.ndarray | None = None):
+        """
+        nodes_indice: the nodes of the path, in order
+        edges_indices: the edge of each hop, found on the graph if not set
+        reversed_edges: True for the hops going from the target to the source of an undirected edge
+        cumulative_lengths, cumulative_times: the weights from the first node to each node (meters, seconds)
+        """
         self._graph = graph
-        self._nodes_indices = nodes_indice
-        self._features = self._build_features()
+        self._nodes_indices = np.asarray(nodes_indice, dtype=np.int64)
+        if edges_indices is None:
+            hops = list(zip(self._nodes_indices.tolist(), self._nodes_indices[1:].tolist()))
+            edges_indices = np.array([self._find_edge(*hop) for hop in hops], dtype=np.int64).reshape(-1)
+            reversed_edges = np.array([self._graph.get_edge_endpoints_by_index(edge_indice) != hop
+                                       for edge_indice, hop in zip(edges_indices.tolist(), hops)], dtype=bool)
+        self._edges_indices = edges_indices
+        self._reversed_edges = reversed_edges if reversed_edges is not None else np.zeros(len(edges_indices), bool)
+        self._cumulative_lengths = cumulative_lengths
+        self._cumulative_times = cumulative_times
+
+    def _find_edge(self, from_indice: int, to_indice: int) -> int:
+        edges_indices = self._graph.edge_indices_from_endpoints(from_indice, to_indice)
+        if len(edges_indices) == 0:
+            edges_indices = self._graph.edge_indices_from_endpoints(to_indice, from_indice)
+        return edges_indices[0]
+
+    @property
+    def nodes_indices(self) -> np.ndarray:
+        """Return the graph indices of the path nodes"""
+        return self._nodes_indices
+
+    @property
+    def edges_indices(self) -> np.ndarray:
+        """Return the graph indices of the path edges"""
+        return self._edges_indices
 
     @property
-    def path(self) -> LineString | MultiLineString:
-        """ Return the path as a LineString geometry. If a MultiLineString is returned
-            it means that something wrong happened on the graph...
+    def cumulative_lengths(self) -> np.ndarray:
+        """Return the length (meters) from the first node to each node of the path"""
+        if self._cumulative_lengths is None:
+            lengths = np.fromiter((feature.length for feature in self._build_features()), dtype=np.float64,
+                                  count=len(self._edges_indices))
+            self._cumulative_lengths = np.concatenate([[0.0], np.cumsum(lengths)])
+        return self._cumulative_lengths
+
+    @property
+    def cumulative_times(self) -> np.ndarray | None:
+        """Return the travel time (seconds) from the first node to each node of the path, None without travel
+        times"""
+        return self._cumulative_times
+
+    @property
+    def length(self) -> float:
+        """Return the path length (meters)"""
+        return float(self.cumulative_lengths[-1])
+
+    @property
+    def path(self) -> LineString:
+        """ Return the path as a LineString geometry, made of the edges coordinates, in order
         """
-        return linemerge(feat.geometry for feat in self._features)
+        features = self._build_features()
+        coordinates, lines_indices = shapely.get_coordinates(
+            [feature.geometry for feature in features], return_index=True
+        )
+        # the hops going backward on an undirected edge read its coordinates reversed
+        positions = np.arange(len(coordinates))
+        starts = np.searchsorted(lines_indices, lines_indices, side="left")
+        ends = np.searchsorted(lines_indices, lines_indices, side="right") - 1
+        coordinates = coordinates[np.where(self._reversed_edges[lines_indices], starts + ends - positions, positions)]
+
+        # the first coordinates of an edge are the last ones of the previous edge
+        is_first = np.r_[False, lines_indices[1:] != lines_indices[:-1]]
+        return LineString(coordinates[~is_first])
 
     def features(self) -> List[Dict]:
         """Return each LineStrings composing the path with their attributes"""
         return [feature.to_dict(with_attr=True) for feature in self._build_features()]
 
+    def detach(self) -> None:
+        """Read the edges of the path from the graph now: the path stays valid once the graph edges are removed
+        (e.g. the virtual edges, see NetworkRxCore.remove_virtual_nodes)"""
+        self._build_features()
+        self._graph = None
+
     def _build_features(self) -> List[ArcFeature]:
-        """Get all the ArcFeature composing the path found"""
-        return [self._graph.get_all_edge_data(*indices)[0]
-                for indices in list(zip(self._nodes_indices, self._nodes_indices[1:]))]
+        """Get all the ArcFeature composing the path found, read once"""
+        if self._features is None:
+            self._features = [self._graph.get_edge_data_by_index(edge_indice)
+                              for edge_indice in self._edges_indices.tolist()]
+        return self._features
@@ -0,0 +1,126 @@
+import heapq
+import math
+from typing import Callable, Dict, List
+
+import numpy as np
+
+EARTH_RADIUS: float = 6371008.8  # mean earth radius in meters
+
+
+class Adjacency:
+    """Outgoing edges of each node, as python lists: the point to point searches run in python and read a few
+    nodes only"""
+
+    __slots__ = ("_indptr", "_indices", "_weights")
+
+    def __init__(self, nb_nodes: int, from_indices: np.ndarray, to_indices: np.ndarray, weights: np.ndarray):
+        order = np.argsort(from_indices, kind="stable")
+        self._indptr = np.concatenate([[0], np.cumsum(np.bincount(from_indices, minlength=nb_nodes))]).tolist()
+        self._indices = to_indices[order].tolist()
+        self._weights = weights[order].tolist()
+
+    def neighbors(self, node: int):
+        """Return the (node, weight) of the outgoing edges of a node"""
+        start, end = self._indptr[node], self._indptr[node + 1]
+        return zip(self._indices[start:end], self._weights[start:end])
+
+
+class GreatCircleHeuristic:
+    """Lower bound of the cost from a node to the target: the great circle distance (haversine), scaled down to stay
+    below the geodesic lengths on the ellipsoid, and converted to a cost (e.g. divided by the highest speed)"""
+
+    # the great circle distance on the mean sphere can exceed the geodesic distance by up to ~0.5%
+    __SPHERE_TO_ELLIPSOID_FACTOR: float = 0.99
+
+    def __init__(self, longitudes: List[float], latitudes: List[float], to_indice: int, cost_by_meter: float = 1.0):
+        """longitudes, latitudes: nodes coordinates in radians, by node indice"""
+        self._longitudes = longitudes
+        self._latitudes = latitudes
+        self._to_longitude = longitudes[to_indice]
+        self._to_latitude = latitudes[to_indice]
+        self._to_latitude_cos = math.cos(self._to_latitude)
+        self._factor = 2 * EARTH_RADIUS * self.__SPHERE_TO_ELLIPSOID_FACTOR * cost_by_meter
+
+    def __call__(self, node: int) -> float:
+        latitude = self._latitudes[node]
+        longitude_delta = self._longitudes[node] - self._to_longitude
+        haversine = (
+            math.sin((latitude - self._to_latitude) / 2) ** 2
+            + math.cos(latitude) * self._to_latitude_cos * math.sin(longitude_delta / 2) ** 2
+        )
+        return self._factor * math.asin(min(1.0, math.sqrt(haversine)))
+
+
+def _rebuild_path(predecessors: Dict[int, int | None], node: int) -> List[int]:
+    nodes_indices = [node]
+    while predecessors[nodes_indices[-1]] is not None:
+        nodes_indices.append(predecessors[nodes_indices[-1]])
+    return nodes_indices[::-1]
+
+
+def astar_path(adjacency: Adjacency, from_indice: int, to_indice: int,
+               heuristic: Callable[[int], float]) -> List[int] | None:
+    """Return the nodes of the shortest path found with A*, None if the target is not reached. The heuristic must
+    be consistent (never above the cost of an edge plus the heuristic of its target)"""
+    costs = {from_indice: 0.0}
+    predecessors: Dict[int, int | None] = {from_indice: None}
+    settled = set()
+    queue = [(heuristic(from_indice), 0.0, from_indice)]
+
+    while queue:
+        _, cost, node = heapq.heappop(queue)
+        if node in settled:
+            continue
+        if node == to_indice:
+            return _rebuild_path(predecessors, node)
+        settled.add(node)
+
+        for neighbor, weight in adjacency.neighbors(node):
+            neighbor_cost = cost + weight
+            if neighbor_cost < costs.get(neighbor, math.inf):
+                costs[neighbor] = neighbor_cost
+                predecessors[neighbor] = node
+                heapq.heappush(queue, (neighbor_cost + heuristic(neighbor), neighbor_cost, neighbor))
+    return None
+
+
+def bidirectional_dijkstra_path(forward_adjacency: Adjacency, backward_adjacency: Adjacency, from_indice: int,
+                                to_indice: int) -> List[int] | None:
+    """Return the nodes of the shortest path found by 2 dijkstra searches, from the source and from the target
+    (on the reversed edges), None if the target is not reached"""
+    if from_indice == to_indice:
+        return [from_indice]
+
+    costs = ({from_indice: 0.0}, {to_indice: 0.0})
+    predecessors: tuple[Dict[int, int | None], Dict[int, int | None]] = ({from_indice: None}, {to_indice: None})
+    settled = (set(), set())
+    queues = ([(0.0, from_indice)], [(0.0, to_indice)])
+    adjacencies = (forward_adjacency, backward_adjacency)
+
+    best_cost, meeting_node = math.inf, None
+    while queues[0] and queues[1]:
+        # the searches stop once no path through their frontiers can be shorter than the best one found
+        if queues[0][0][0] + queues[1][0][0] >= best_cost:
+            break
+
+        # the search with the smallest frontier is expanded
+        direction = 0 if len(queues[0]) <= len(queues[1]) else 1
+        cost, node = heapq.heappop(queues[direction])
+        if node in settled[direction]:
+            continue
+        settled[direction].add(node)
+
+        for neighbor, weight in adjacencies[direction].neighbors(node):
+            neighbor_cost = cost + weight
+            if neighbor_cost < costs[direction].get(neighbor, math.inf):
+                costs[direction][neighbor] = neighbor_cost
+                predecessors[direction][neighbor] = node
+                heapq.heappush(queues[direction], (neighbor_cost, neighbor))
+
+            path_cost = neighbor_cost + costs[1 - direction].get(neighbor, math.inf)
+            if path_cost < best_cost and costs[direction][neighbor] == neighbor_cost:
+                best_cost, meeting_node = path_cost, neighbor
+
+    if meeting_node is None:
+        return None
+    return _rebuild_path(predecessors[0], meeting_node) + _rebuild_path(predecessors[1], meeting_node)[::-1][1:]
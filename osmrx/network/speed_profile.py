@@ -0,0 +1,81 @@
+import hashlib
+import re
+from typing import Dict, Iterable
+
+import numpy as np
+
+from osmrx.globals.queries import OsmFeatureModes
+from osmrx.globals.speeds import highway_speeds, maxspeed_values
+
+
+class SpeedProfile:
+    """Travel speeds (km/h) of a network mode, based on the highway and maxspeed tags"""
+
+    __HIGHWAY_FIELD: str = "highway"
+    __MAXSPEED_FIELD: str = "maxspeed"
+    __MPH_TO_KMH: float = 1.609344
+    __MAXSPEED_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(mph|km/h|kmh|kph)?\s*$")
+
+    def __init__(self, speeds: Dict[str, float], default_speed: float, use_maxspeed: bool = True,
+                 max_tagged_speed: float = 150.0) -> None:
+        """
+        speeds: speed by highway value
+        default_speed: speed of the highway values not found
+        use_maxspeed: if True, the maxspeed tag is used when it is a valid speed
+        max_tagged_speed: the maxspeed tag values are capped to it
+        """
+        self._speeds = speeds
+        self._default_speed = default_speed
+        self._use_maxspeed = use_maxspeed
+        self._max_tagged_speed = max_tagged_speed
+        self._maxspeeds_parsed = {}  # the tag values are repeated a lot
+
+    @classmethod
+    def from_mode(cls, mode: OsmFeatureModes) -> "SpeedProfile":
+        """Build the default speed profile of a mode (see osmrx.globals.speeds)"""
+        return cls(**highway_speeds[mode])
+
+    @property
+    def max_speed(self) -> float:
+        """Return the highest speed (km/h) the profile can return, the maxspeed tags included"""
+        highway_speeds = [self._default_speed, *self._speeds.values()]
+        if self._use_maxspeed:
+            return max([*highway_speeds, self._max_tagged_speed])
+        return max(highway_speeds)
+
+    def digest(self) -> str:
+        """Return a digest of the profile speeds: the travel times computed depend on it (see GraphCache)"""
+        values = (sorted(self._speeds.items()), self._default_speed, self._use_maxspeed, self._max_tagged_speed)
+        return hashlib.sha256(repr(values).encode("utf-8")).hexdigest()
+
+    def speed(self, attributes: Dict) -> float:
+        """Return the speed (km/h) of a way from its tags"""
+        if self._use_maxspeed:
+            maxspeed = self._parse_maxspeed(attributes.get(self.__MAXSPEED_FIELD, None))
+            if maxspeed is not None:
+                return maxspeed
+        return self._speeds.get(attributes.get(self.__HIGHWAY_FIELD, None), self._default_speed)
+
+    def _parse_maxspeed(self, maxspeed: str | None) -> float | None:
+        """Return the maxspeed tag value in km/h, None if it is not a speed (e.g. 'none', 'FR:urban')"""
+        if maxspeed is None:
+            return None
+
+        if maxspeed not in self._maxspeeds_parsed:
+            # several values (lanes, conditions): the first one is kept
+            value = str(maxspeed).split(";")[0].strip()
+            speed = maxspeed_values.get(value, None)
+
+            value_found = self.__MAXSPEED_PATTERN.match(value)
+            if value_found is not None:
+                number, unit = value_found.groups()
+                speed = float(number) * (self.__MPH_TO_KMH if unit == "mph" else 1)
+            self._maxspeeds_parsed[maxspeed] = min(speed, self._max_tagged_speed) if speed else None
+
+        return self._maxspeeds_parsed[maxspeed]
+
+    def travel_times(self, lengths: np.ndarray, attributes: Iterable[Dict]) -> np.ndarray:
+        """Return the travel times (seconds) of ways from their lengths (meters) and their tags"""
+        speeds = np.fromiter((self.speed(way_attributes) for way_attributes in attributes), dtype=np.float64,
+                             count=len(lengths))
+        return lengths / (speeds / 3.6)
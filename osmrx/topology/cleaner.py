@@ -1,28 +1,27 @@
-import itertools
 from typing import Tuple, Generator, Any
 from typing import List
 from typing import Dict
 from typing import Optional
-from typing import Set
 from typing import Union
 from typing import Iterator
+from typing import Iterable
+
+import itertools
 
 from numpy import ndarray
-from scipy import spatial
 
+import shapely
 from shapely.geometry import LineString
 
-import rtree
-
 import numpy as np
 
-from collections import Counter
-
-from more_itertools import split_at
-
 import concurrent.futures
 
+from osmrx.helpers.instrumentation import Instrumentation
+from osmrx.helpers.misc import quantize_coordinates
 from osmrx.network.arc_feature import ArcFeature
+from osmrx.topology.intersections import IntersectionIndex, first_intersections_mask, split_way_ranges, \
+    split_ways_ranges
 
 
 class NetworkTopologyError(Exception):
@@ -34,15 +33,18 @@ class LineBuilder:
 
     __CLEANING_FILED_STATUS: str = "topology"
 
-    __LINESTRING_SEPARATOR: str = "_"
-
-    def __init__(self, feature: Dict, intersection_nodes: set[tuple[float, float]],
-                 interpolate_level: int | None = None):
+    def __init__(self, feature: Dict, intersection_nodes: IntersectionIndex | None,
+                 interpolate_level: int | None = None, split_ranges: List[List[int]] | None = None):
+        """
+        split_ranges: the (start, end) coordinates indices (inclusive) of the lines to build (see
+        TopologyCleaner.ways_split_ranges), found on intersection_nodes if not set
+        """
         self._feature = feature
-        del self._feature["geometry"]
+        self._feature.pop("geometry", None)  # could be already removed (see TopologyCleaner.build_arc_features)
         self._coordinates = self._feature.pop("coordinates")
         self._unique_coordinates = set(self._coordinates)
         self._intersection_nodes = intersection_nodes
+        self._split_ranges = split_ranges
         self._interpolate_level = interpolate_level
 
         self._output = []
@@ -51,22 +53,20 @@ class LineBuilder:
         if not self.is_line_valid():
             return []
 
-        geometry_lines = self.split_line_at_intersections(
-            self._coordinates, self.intersections_points()
-        )
+        if self._split_ranges is not None:
+            geometry_lines = [self._coordinates[start:end + 1] for start, end in self._split_ranges]
+        elif len(self._coordinates) == 2:
+            # a segment is never split
+            geometry_lines = [self._coordinates]
+        else:
+            geometry_lines = self.split_line_at_intersections(self._coordinates, self.intersections_mask())
         if len(geometry_lines) > 1:
             self._feature[self.__CLEANING_FILED_STATUS] = self.__TOPOLOGY_TAG_SPLIT
 
-            data = []
             for suffix_id, line_coordinates in enumerate(geometry_lines):
                 feature_copy = self.feature_copy()
                 feature_copy["topo_uuid"] = f"{feature_copy['topo_uuid']}_{suffix_id}"
-                data.append([feature_copy, line_coordinates])
-
-                # feature_updated[self.__COORDINATES_FIELD] = line_coordinates
                 self._direction_processing(feature_copy, line_coordinates)
-            # with concurrent.futures.ThreadPoolExecutor() as executor:
-            #     executor.map(lambda f: self._direction_processing(*f), data)
         else:
             self._direction_processing(self._feature, geometry_lines[0])
 
@@ -110,48 +110,26 @@ class LineBuilder:
     def feature_copy(self) -> Dict:
         return dict(self._feature)
 
-    def intersections_points(self) -> Set[Tuple[float, float]]:
-        """Return intersections points matching with the feature"""
-        return self._unique_coordinates.intersection(self._intersection_nodes)
+    def intersections_mask(self) -> np.ndarray:
+        """Return a boolean mask of the coordinates where the line must be split"""
+        keys = quantize_coordinates(self._coordinates)
+        return first_intersections_mask(keys, self._intersection_nodes.contains_keys(keys),
+                                        np.array([0, keys.size]))
 
     def is_line_valid(self) -> True:
         # meaning that there is none point or line length is equals to 0
         return not len(self._unique_coordinates) <= 1
 
     def split_line_at_intersections(self, coordinates: List[Tuple[float, float]],
-                                    points_intersections: Set[Tuple[float, float]]) -> List[List[Tuple[float, float]]]:
-
-        if len(points_intersections) > 0:
-
-            # split coordinates found at intersection to respect the topology
-            first_value, *middle_coordinates_values, last_value = coordinates
-            for point_intersection in points_intersections:
-
-                if point_intersection in middle_coordinates_values:
-                    # we get the middle values from coordinates to avoid to catch the first and last value when editing
-
-                    # duplicate the intersection point
-                    index: int = middle_coordinates_values.index(point_intersection)
-                    middle_coordinates_values[index:index] = [point_intersection]
-                    # add an _ to split the line at the intersection point index
-                    middle_coordinates_values[index + 1:index + 1] = self.__LINESTRING_SEPARATOR
-
-            coordinates = [first_value] + middle_coordinates_values + [last_value]
-            coordinates_updated = list(split_at(coordinates, lambda x: x == self.__LINESTRING_SEPARATOR))
-        else:
-            coordinates_updated = list([coordinates])
-
-        return coordinates_updated
+                                    is_intersection: np.ndarray) -> List[List[Tuple[float, float]]]:
+        """Split the coordinates at the intersections (boolean mask of the coordinates), in a single pass"""
+        return [coordinates[start:end + 1] for start, end in split_way_ranges(is_intersection).tolist()]
 
 
 class TopologyCleaner:
-    __FIELD_ID: str = "topo_uuid"  # values linked must be integer.. due to rtree...
-
-    # if increased, the node connections will be better, but will generate more feature
-    __INTERPOLATION_LEVEL: int = 7
-    __NB_OF_NEAREST_LINE_ELEMENTS_TO_FIND: int = 10
+    __FIELD_ID: str = "topo_uuid"  # values linked must be integer
 
-    __NUMBER_OF_NODES_INTERSECTIONS: int = 2
+    __CHUNKS_BY_WORKER: int = 4
 
     __CLEANING_FILED_STATUS: str = "topology"
     __GEOMETRY_FIELD: str = "geometry"
@@ -163,10 +141,14 @@ class TopologyCleaner:
     def __init__(
         self,
         logger,  # TODO: add a logger if not set
-        network_data: List[Dict],
+        network_data: Iterable[Dict],
         additional_nodes: Optional[List[Dict]],
         interpolation_line_level: int | None = None,  # 4 is a good value
+        workers: int | None = None,
     ) -> None:
+        """
+        workers: number of processes used to build the lines, None (or 1) to build them on the current process
+        """
 
         self.logger = logger
         self.logger.info("Network cleaning...")
@@ -178,26 +160,67 @@ class TopologyCleaner:
         if self._additional_nodes is None:
             self._additional_nodes: Dict = {}
 
-        self._intersections_found: Optional[Set[Tuple[float, float]]] = None
+        self._intersections_found: Optional[IntersectionIndex] = None
+        self._workers = workers
         self.__connections_added: Dict = {}
 
     def build_arc_features(self) -> Generator[ArcFeature, Any, None]:
-        self._prepare_data()
+        instrumentation = Instrumentation.shared()
+        with instrumentation.stage("topology.prepare") as measure:
+            self._prepare_data()
+            measure.count("ways", len(self._network_data))
+            measure.count("vertices", sum(len(feature[self.__COORDINATES_FIELD])
+                                          for feature in self._network_data.values()))
 
         # connect all the added nodes
         if len(self._additional_nodes) > 0:
-            self.compute_added_node_connections()
+            with instrumentation.stage("topology.snap") as measure:
+                self.compute_added_node_connections()
+                measure.count("nodes_added", len(self._additional_nodes))
+                measure.count("lines_split", sum(len(node_keys) > 0
+                                                 for node_keys in self.__node_by_nearest_lines.values()))
 
         # find all the existing intersection from coordinates
-        intersections_found = self.find_intersections_from_ways()
+        with instrumentation.stage("topology.intersections") as measure:
+            intersections_found = self.find_intersections_from_ways()
+            ways_split_ranges = self.ways_split_ranges(intersections_found)
+            measure.count("intersections", len(intersections_found))
 
         self.logger.info("Build lines")
 
-        for feature in self._network_data.values():
-            for feature_built in LineBuilder(feature, intersections_found,
-                                             self._interpolation_line_level).build_features():
+        # the lines are streamed: the stage includes the time spent by the consumer
+        with instrumentation.stage("topology.lines", workers=str(self._workers or 1)) as measure:
+            if self._workers is not None and self._workers > 1:
+                features_built = self._build_lines_on_processes(ways_split_ranges)
+            else:
+                features_built = (
+                    feature_built
+                    for feature, split_ranges in zip(self._network_data.values(), ways_split_ranges)
+                    for feature_built in LineBuilder(feature, intersections_found, self._interpolation_line_level,
+                                                     split_ranges).build_features()
+                )
+            for feature_built in features_built:
+                measure.count("arc_features")
                 yield feature_built
 
+    def _build_lines_on_processes(self, ways_split_ranges: List[List[List[int]]]
+                                  ) -> Generator[ArcFeature, Any, None]:
+        """Build the lines on a pool of processes, the lines are returned in the same order"""
+        # geometries are not used by LineBuilder: avoid to send them
+        features = [
+            ({key: value for key, value in feature.items() if key != self.__GEOMETRY_FIELD}, split_ranges)
+            for feature, split_ranges in zip(self._network_data.values(), ways_split_ranges)
+        ]
+        chunk_size = max(1, len(features) // (self._workers * self.__CHUNKS_BY_WORKER))
+
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=self._workers,
+            initializer=_init_line_builder_process,
+            initargs=(self._interpolation_line_level,),  # sent once by process
+        ) as executor:
+            for features_built in executor.map(_build_line_features, features, chunksize=chunk_size):
+                yield from features_built
+
     def _prepare_data(self):
 
         self._network_data = {
@@ -227,58 +250,26 @@ class TopologyCleaner:
         )
 
         self.logger.info("Split line")
-        # for nearest_line_key in node_keys_by_nearest_lines_filled:
-        #     self.split_line(nearest_line_key)
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            executor.map(self.split_line, node_keys_by_nearest_lines_filled)
+        for nearest_line_key in node_keys_by_nearest_lines_filled:
+            self.split_line(nearest_line_key)
 
         self._network_data: Dict = self._network_data | self.__connections_added
 
-    def split_line(self, node_key_by_nearest_lines):
-        nearest_line_content = self.__node_by_nearest_lines[node_key_by_nearest_lines]
-        default_line_updater = self.proceed_nodes_on_network(
-            (node_key_by_nearest_lines, nearest_line_content)
-        )
-        if default_line_updater is not None:
-            self.insert_new_nodes_on_its_line(default_line_updater)
-
-    def insert_new_nodes_on_its_line(self, item):
-        original_line_key = item["original_line_key"]
-        end_points_found = item["end_points_found"]
-
-        linestring_with_new_nodes = self._network_data[original_line_key][self.__COORDINATES_FIELD]
-        linestring_with_new_nodes.extend(end_points_found)
-        linestring_with_new_nodes = set(linestring_with_new_nodes)
-
-        # build new LineStrings
-        linestring_linked_updated = list(filter(lambda x: x in linestring_with_new_nodes, item["interpolated_line"]))
-
-        self._network_data[original_line_key][self.__COORDINATES_FIELD] = linestring_linked_updated
-
-    def proceed_nodes_on_network(self, nearest_line_content):
-        nearest_line_key, node_keys = nearest_line_content
-
-        interpolated_line_coords = interpolate_curve_based_on_original_points(
-            np.array(self._network_data[nearest_line_key][self.__COORDINATES_FIELD]),
-            self.__INTERPOLATION_LEVEL,
-        )
-        line_tree = spatial.cKDTree(interpolated_line_coords)
-        interpolated_line_coords_rebuilt = list(map(tuple, interpolated_line_coords))
-
+    def split_line(self, nearest_line_key: int) -> None:
+        """Snap on a line all the nodes for which it is the nearest line, and connect them to it"""
+        node_keys = self.__node_by_nearest_lines[nearest_line_key]
         nodes_coords = [
             self._additional_nodes[node_key][self.__COORDINATES_FIELD]
             for node_key in node_keys
         ]
-        _, nearest_line_object_idxes = line_tree.query(nodes_coords)
-        end_points_found = [
-            interpolated_line_coords_rebuilt[nearest_line_key]
-            for nearest_line_key in nearest_line_object_idxes
-        ]
 
-        connections_coords = zip(node_keys, list(zip(nodes_coords, end_points_found)))
-        connections_coords_valid = filter(lambda x: len(set(x[-1])) > 0, connections_coords)
-        for node_key, connection in connections_coords_valid:
+        line_coordinates_updated, end_points_found = snap_points_on_line(
+            np.array(self._network_data[nearest_line_key][self.__COORDINATES_FIELD], dtype=np.float64),
+            np.array(nodes_coords, dtype=np.float64),
+        )
+        self._network_data[nearest_line_key][self.__COORDINATES_FIELD] = line_coordinates_updated
 
+        for node_key, connection in zip(node_keys, zip(nodes_coords, end_points_found)):
             # to split line at node (and also if node is on the network). it builds intersection used to split lines
             # additional are converted to lines
             self.__connections_added[f"from_node_id_{node_key}"] = {
@@ -288,52 +279,58 @@ class TopologyCleaner:
                 self.__FIELD_ID: f"{self.__TOPOLOGY_TAG_ADDED}_{node_key}",
             }
 
-        return {
-            "interpolated_line": interpolated_line_coords_rebuilt,
-            "original_line_key": nearest_line_key,
-            "end_points_found": end_points_found,
-        }
-
-    def find_intersections_from_ways(self) -> Set[Tuple[float, float]]:
+    def find_intersections_from_ways(self) -> IntersectionIndex:
         self.logger.info("Starting: Find intersections")
-        all_coord_points = Counter(
-            itertools.chain.from_iterable([
-                feature[self.__COORDINATES_FIELD]
-                for feature in self._network_data.values()
-            ]),
+        intersections_found = IntersectionIndex.from_ways(
+            feature[self.__COORDINATES_FIELD]
+            for feature in self._network_data.values()
         )
+        self.logger.info(f"Done: Find intersections ({len(intersections_found)} found)")
+
+        return intersections_found
+
+    def ways_split_ranges(self, intersections_found: IntersectionIndex) -> List[List[List[int]]]:
+        """Return the (start, end) coordinates indices (inclusive) of the lines to build from each way, split at
+        its intersections: the ranges of all the ways are computed at once"""
+        ways_coordinates = [feature[self.__COORDINATES_FIELD] for feature in self._network_data.values()]
+        ways_offsets = np.cumsum([0, *map(len, ways_coordinates)])
+        all_coordinates = np.fromiter(
+            itertools.chain.from_iterable(itertools.chain.from_iterable(ways_coordinates)),
+            dtype=np.float64,
+            count=ways_offsets[-1] * 2,
+        )
+        keys = quantize_coordinates(all_coordinates)
+        is_intersection = first_intersections_mask(keys, intersections_found.contains_keys(keys), ways_offsets)
+        ranges = split_ways_ranges(is_intersection, ways_offsets)
 
-        intersections_found = dict(
-            filter(
-                lambda x: x[1] >= self.__NUMBER_OF_NODES_INTERSECTIONS,
-                all_coord_points.items(),
-            )
-        ).keys()
-        self.logger.info("Done: Find intersections")
-
-        return set(intersections_found)
-
-    def __rtree_generator_func(
-        self,
-    ) -> Iterator[Tuple[int, Tuple[str, str, str, float], None]]:
-        for fid, feature in self._network_data.items():
-            # fid is an integer
-            yield fid, feature[self.__GEOMETRY_FIELD].bounds, None
+        # back to the coordinates indices of each way
+        ranges_ways = np.searchsorted(ways_offsets, ranges[:, 0], side="right") - 1
+        ranges_by_way = iter((ranges - ways_offsets[ranges_ways, np.newaxis]).tolist())
+        nb_ranges_by_way = np.bincount(ranges_ways, minlength=len(ways_coordinates)).tolist()
+        return [list(itertools.islice(ranges_by_way, nb_ranges)) for nb_ranges in nb_ranges_by_way]
 
     def __find_nearest_line_for_each_key_nodes(self) -> Iterator[int]:
-        # find the nearest network arc to interpolate
-        self._tree_index = rtree.index.Index(self.__rtree_generator_func())
+        # find the nearest line of all the nodes at once (true geometry distances)
+        lines_keys = list(self._network_data.keys())
+        nodes_keys = list(self._additional_nodes.keys())
+        lines_tree = shapely.STRtree([self._network_data[key][self.__GEOMETRY_FIELD] for key in lines_keys])
+        nodes_positions, lines_positions = lines_tree.query_nearest(
+            [self._additional_nodes[key][self.__GEOMETRY_FIELD] for key in nodes_keys],
+            all_matches=True,
+        )
+
+        # equidistant lines: the first line is kept
+        order = np.lexsort((lines_positions, nodes_positions))
+        nodes_positions, lines_positions = nodes_positions[order], lines_positions[order]
+        is_first_match = np.ones(nodes_positions.size, dtype=bool)
+        is_first_match[1:] = nodes_positions[1:] != nodes_positions[:-1]
 
-        # find the nearest line
         self.__node_by_nearest_lines = dict(
-            (key, []) for key in self._network_data.keys()
+            (key, []) for key in lines_keys
         )
-
-        # not working because rtree cannot be MultiThreaded
-        # with concurrent.futures.ThreadPoolExecutor(4) as executor:
-        #     executor.map(self.__get_nearest_line, self._additional_nodes.items())
-        for node_info in self._additional_nodes.items():
-            self.__get_nearest_line(node_info)
+        for node_position, line_position in zip(nodes_positions[is_first_match].tolist(),
+                                                lines_positions[is_first_match].tolist()):
+            self.__node_by_nearest_lines[lines_keys[line_position]].append(nodes_keys[node_position])
 
         node_keys_by_nearest_lines_filled = filter(
             lambda x: len(self.__node_by_nearest_lines[x]) > 0,
@@ -342,21 +339,82 @@ class TopologyCleaner:
 
         return node_keys_by_nearest_lines_filled
 
-    def __get_nearest_line(self, node_info: Tuple[int, Dict]) -> None:
-        node_uuid, node = node_info
-        distances_computed: List[Tuple[float, int]] = []
-        node_geom = node[self.__GEOMETRY_FIELD]
-
-        for index_feature in self._tree_index.nearest(node_geom.bounds, self.__NB_OF_NEAREST_LINE_ELEMENTS_TO_FIND):
-            line_geom = self._network_data[index_feature][self.__GEOMETRY_FIELD]
-            distance_from_node_to_line = node_geom.distance(line_geom)
-            distances_computed.append((distance_from_node_to_line, index_feature))
-            if distance_from_node_to_line == 0:
-                # means that the node is on the network, looping is not necessary anymore
-                break
-
-        _, line_min_index = min(distances_computed)
-        self.__node_by_nearest_lines[line_min_index].append(node_uuid)
+
+# data shared by the LineBuilder processes (see TopologyCleaner._build_lines_on_processes)
+_process_interpolation_level: int | None = None
+
+
+def _init_line_builder_process(interpolation_level: int | None) -> None:
+    global _process_interpolation_level
+    _process_interpolation_level = interpolation_level
+
+
+def _build_line_features(feature_and_ranges: Tuple[Dict, List[List[int]]]) -> List[ArcFeature]:
+    # the ranges are computed on the main process: the intersections are not needed
+    feature, split_ranges = feature_and_ranges
+    return LineBuilder(feature, None, _process_interpolation_level, split_ranges).build_features()
+
+
+# bound of the (points, segments) matrices built to project points on a line: the points are processed by chunks
+PROJECTION_MAX_MATRIX_SIZE: int = 2 ** 18
+
+
+def project_points_on_line(line_coordinates: np.ndarray, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Project each point on its nearest segment of a line.
+
+    Return the segment indices and the position of the projected points on them (0: segment start, 1: segment end)
+    """
+    segments_starts = line_coordinates[:-1]
+    segments_vectors = line_coordinates[1:] - segments_starts
+    segments_squared_lengths = np.einsum("ij,ij->i", segments_vectors, segments_vectors)
+
+    segments_indices = np.empty(points.shape[0], dtype=np.int64)
+    segments_positions = np.empty(points.shape[0], dtype=np.float64)
+    chunk_size = max(1, PROJECTION_MAX_MATRIX_SIZE // segments_starts.shape[0])
+    for chunk_start in range(0, points.shape[0], chunk_size):
+        chunk = slice(chunk_start, chunk_start + chunk_size)
+
+        # (points, segments) matrices
+        starts_to_points = points[chunk, np.newaxis, :] - segments_starts[np.newaxis, :, :]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            positions = np.einsum("ijk,jk->ij", starts_to_points, segments_vectors) / segments_squared_lengths
+        positions = np.clip(np.nan_to_num(positions, nan=0.0), 0.0, 1.0)  # nan: segment of length 0
+
+        projections_to_points = starts_to_points - positions[:, :, np.newaxis] * segments_vectors[np.newaxis, :, :]
+        squared_distances = np.einsum("ijk,ijk->ij", projections_to_points, projections_to_points)
+
+        segments_indices[chunk] = squared_distances.argmin(axis=1)
+        segments_positions[chunk] = positions[np.arange(positions.shape[0]), segments_indices[chunk]]
+    return segments_indices, segments_positions
+
+
+def snap_points_on_line(line_coordinates: np.ndarray, points: np.ndarray
+                        ) -> Tuple[List[Tuple[float, float]], List[Tuple[float, float]]]:
+    """Insert on a line the projection of each point: one vertex by projection, the existing vertices are reused.
+
+    Return the line coordinates updated and the projected coordinates of each point
+    """
+    segments_indices, positions = project_points_on_line(line_coordinates, points)
+    segments_starts = line_coordinates[segments_indices]
+    segments_ends = line_coordinates[segments_indices + 1]
+    projected = segments_starts + positions[:, np.newaxis] * (segments_ends - segments_starts)
+
+    # projections matching a vertex (at the coordinates precision) are snapped on it
+    projected_keys = quantize_coordinates(projected)
+    on_start = (positions == 0.0) | (projected_keys == quantize_coordinates(segments_starts))
+    on_end = ~on_start & ((positions == 1.0) | (projected_keys == quantize_coordinates(segments_ends)))
+    projected[on_start] = segments_starts[on_start]
+    projected[on_end] = segments_ends[on_end]
+
+    # the other projections are new vertices, inserted once, ordered along the line
+    to_insert = np.flatnonzero(~on_start & ~on_end)
+    _, first_positions, inverse = np.unique(projected_keys[to_insert], return_index=True, return_inverse=True)
+    projected[to_insert] = projected[to_insert[first_positions]][inverse.ravel()]
+    new_vertices = to_insert[first_positions]
+    new_vertices = new_vertices[np.lexsort((positions[new_vertices], segments_indices[new_vertices]))]
+
+    line_coordinates = np.insert(line_coordinates, segments_indices[new_vertices] + 1, projected[new_vertices], axis=0)
+    return list(map(tuple, line_coordinates.tolist())), list(map(tuple, projected.tolist()))
 
 
 def interpolate_curve_based_on_original_points(values: np.array, interpolation_factor: int) -> np.ndarray:
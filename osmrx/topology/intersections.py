@@ -0,0 +1,116 @@
+import itertools
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from osmrx.helpers.misc import quantize_coordinates
+
+
+class IntersectionIndex:
+    """Compact lookup of the coordinates shared by several ways vertices.
+
+    Coordinates are stored as a sorted array of quantized uint64 keys (see quantize_coordinates), so a
+    lookup is a binary search instead of hashing python tuples.
+    """
+
+    def __init__(self, keys: np.ndarray) -> None:
+        self._keys = np.sort(np.asarray(keys, dtype=np.uint64))
+
+    @classmethod
+    def from_ways(cls, ways_coordinates: Iterable[List[Tuple[float, float]]]) -> "IntersectionIndex":
+        """Find the vertices used at least twice by packing all the ways coordinates in one array"""
+        ways_coordinates = list(ways_coordinates)
+        nb_coordinates = sum(map(len, ways_coordinates))
+        all_coordinates = np.fromiter(
+            itertools.chain.from_iterable(itertools.chain.from_iterable(ways_coordinates)),
+            dtype=np.float64,
+            count=nb_coordinates * 2,
+        )
+        keys = quantize_coordinates(all_coordinates)
+        keys.sort()
+
+        # the keys are sorted: a key found at least twice is equal to its previous one
+        duplicated = keys[1:][keys[1:] == keys[:-1]]
+        return cls(np.unique(duplicated))
+
+    @property
+    def keys(self) -> np.ndarray:
+        """Return the sorted intersection keys"""
+        return self._keys
+
+    def __len__(self) -> int:
+        return self._keys.size
+
+    def contains(self, coordinates: List[Tuple[float, float]] | np.ndarray) -> np.ndarray:
+        """Return a boolean mask: True for each coordinates matching an intersection"""
+        if self._keys.size == 0 or len(coordinates) == 0:
+            return np.zeros(len(coordinates), dtype=bool)
+
+        return self.contains_keys(quantize_coordinates(coordinates))
+
+    def contains_keys(self, keys: np.ndarray) -> np.ndarray:
+        """Return a boolean mask: True for each coordinates key (see quantize_coordinates) matching an intersection"""
+        if self._keys.size == 0 or keys.size == 0:
+            return np.zeros(keys.size, dtype=bool)
+
+        positions = np.searchsorted(self._keys, keys)
+        positions[positions == self._keys.size] = 0
+        return self._keys[positions] == keys
+
+
+def split_ways_ranges(is_intersection: np.ndarray, ways_offsets: np.ndarray) -> np.ndarray:
+    """Compute the segments of several ways split at their intersections, in a single pass.
+
+    is_intersection: boolean mask of all the ways vertices (concatenated)
+    ways_offsets: position of the first vertex of each way (a way has at least one vertex), followed by the
+    number of vertices
+    Return an array of (start, end) vertex indices (inclusive), sorted by way then by position.
+    """
+    is_intersection = np.asarray(is_intersection, dtype=bool)
+    ways_offsets = np.asarray(ways_offsets, dtype=np.int64)
+    if is_intersection.size == 0:
+        return np.empty((0, 2), dtype=np.int64)
+
+    first_vertices = ways_offsets[:-1]
+    last_vertices = ways_offsets[1:] - 1
+
+    # a way is split at its intersections, except at its first and last vertices
+    boundaries = np.zeros(is_intersection.size, dtype=bool)
+    boundaries[first_vertices] = True
+    boundaries[last_vertices] = True
+    boundaries |= is_intersection
+    boundaries_indices = np.flatnonzero(boundaries)
+
+    ways_ids = np.repeat(np.arange(first_vertices.size), ways_offsets[1:] - first_vertices)
+    starts, ends = boundaries_indices[:-1], boundaries_indices[1:]
+    # keep the segments inside a way: the last vertex of a way and the first one of the next way are not linked
+    is_segment = (ways_ids[starts] == ways_ids[ends]) & (starts != ends)
+    return np.column_stack((starts[is_segment], ends[is_segment]))
+
+
+def first_intersections_mask(keys: np.ndarray, is_intersection: np.ndarray, ways_offsets: np.ndarray) -> np.ndarray:
+    """Keep the first occurrence of each intersection inside each way: a way is split once by intersection, the
+    first and last vertices are ignored (see split_ways_ranges for the arguments)"""
+    keys = np.asarray(keys, dtype=np.uint64)
+    ways_offsets = np.asarray(ways_offsets, dtype=np.int64)
+    ways_ids = np.repeat(np.arange(ways_offsets.size - 1), np.diff(ways_offsets))
+
+    is_inner = np.ones(keys.size, dtype=bool)
+    is_inner[ways_offsets[:-1][ways_offsets[:-1] < keys.size]] = False
+    is_inner[ways_offsets[1:][ways_offsets[1:] > 0] - 1] = False
+    candidates = np.flatnonzero(np.asarray(is_intersection, dtype=bool) & is_inner)
+
+    # sorted by way, key then position: the first candidate of each (way, key) is its first occurrence
+    candidates = candidates[np.lexsort((candidates, keys[candidates], ways_ids[candidates]))]
+    is_first = np.ones(candidates.size, dtype=bool)
+    is_first[1:] = ((ways_ids[candidates[1:]] != ways_ids[candidates[:-1]])
+                    | (keys[candidates[1:]] != keys[candidates[:-1]]))
+
+    mask = np.zeros(keys.size, dtype=bool)
+    mask[candidates[is_first]] = True
+    return mask
+
+
+def split_way_ranges(is_intersection: np.ndarray) -> np.ndarray:
+    """Compute the segments of a way split at its intersections (see split_ways_ranges)"""
+    return split_ways_ranges(is_intersection, np.array([0, len(is_intersection)]))
@@ -5,13 +5,14 @@ from osmrx.network.arc_feature import ArcFeature
 from osmrx.topology.cleaner import TopologyCleaner
 
 
-def build_network_features(line_features, point_features, interpolation_level: int | None = None
-                           ) -> List[ArcFeature]:
+def build_network_features(line_features, point_features, interpolation_level: int | None = None,
+                           workers: int | None = None) -> List[ArcFeature]:
     features = TopologyCleaner(
         Logger().logger,
         line_features,
         point_features,
-        interpolation_level
+        interpolation_level,
+        workers=workers,
     ).build_arc_features()
 
     return [feature for feature in features]
@@ -1,9 +1,29 @@
+import os
 from typing import Tuple, List, Dict
 
 import pytest
 from shapely import Point
 from shapely import LineString
 
+from osmrx.apis_handler.core import ApiCore
+from osmrx.apis_handler.response_cache import ResponseCache
+
+
+@pytest.fixture(scope="session", autouse=True)
+def recorded_responses():
+    """Run the tests against a recorded response cache if OSMRX_RESPONSE_CACHE is set (a directory):
+    the responses missing are recorded, or raise an error if OSMRX_OFFLINE=1"""
+    cache_directory = os.environ.get("OSMRX_RESPONSE_CACHE")
+    if cache_directory is None:
+        yield None
+        return
+
+    response_cache = ResponseCache(cache_directory, ttl=None, max_size=None,
+                                   offline=os.environ.get("OSMRX_OFFLINE") == "1")
+    ApiCore.set_response_cache(response_cache)
+    yield response_cache
+    ApiCore.set_response_cache(None)
+
 
 @pytest.fixture()
 def bbox_values() -> Tuple[float, float, float, float]:
@@ -115,3 +135,17 @@ def some_point_features() -> List[Dict]:
         },
 
     ]
+
+
+@pytest.fixture
+def some_way_elements(some_line_features) -> List[Dict]:
+    """The line features as overpass elements"""
+    return [
+        {
+            "type": "way",
+            "id": int(feature["id"]),
+            "geometry": [{"lon": lon, "lat": lat} for lon, lat in feature["geometry"].coords],
+            "tags": {key: value for key, value in feature.items() if key not in {"geometry", "id", "topo_uuid"}},
+        }
+        for feature in some_line_features
+    ]
@@ -1,4 +1,12 @@
+import json
+
+import pytest
+
+from osmrx.apis_handler.json_stream import ErrorJsonStream, iter_json_array
 from osmrx.apis_handler.overpass import OverpassApi
+from osmrx.apis_handler.response_cache import ResponseCache
+from osmrx.apis_handler.session import HttpSession
+from osmrx.data_processing.overpass_data_builder import OverpassDataBuilder
 from osmrx.helpers.logger import Logger
 
 
@@ -13,3 +21,67 @@ def test_api_overpass_highway_lines():
 
     assert len(osm_data) == 4
     assert len(osm_data["elements"]) > 0
+
+
+def test_shared_http_session():
+    session = HttpSession.shared()
+    assert HttpSession.shared() is session
+
+    configured_session = HttpSession.configure(pool_size=2, max_workers=3, timeout=5)
+    try:
+        assert HttpSession.shared() is configured_session
+        assert configured_session.max_workers == 3
+        assert configured_session.timeout == 5
+        assert configured_session._session.get_adapter("https://www.overpass-api.de")._pool_maxsize == 2
+    finally:
+        HttpSession.configure()
+
+
+def test_api_overpass_concurrent_queries(tmp_path):
+    response_cache = ResponseCache(str(tmp_path), offline=True)
+    overpass_api = OverpassApi(Logger().logger, response_cache=response_cache)
+    queries = []
+    for node_id in range(10):
+        parameters = overpass_api._build_parameters(f"node({node_id});out;")
+        response_cache.set("https://www.overpass-api.de/api/interpreter", parameters, {"elements": [node_id]})
+        queries.append(("https://www.overpass-api.de/api/interpreter", parameters, {}))
+
+    responses = overpass_api.request_queries(queries, max_concurrency=4)
+    assert [response["elements"][0] for response in responses] == list(range(10))
+
+
+def test_stream_overpass_elements(some_way_elements):
+    payload = json.dumps({"version": 0.6, "osm3s": {"copyright": "é"}, "elements": some_way_elements,
+                          "remark": "ok"}, ensure_ascii=False).encode("utf-8")
+
+    for chunk_size in [1, 7, 1024]:
+        chunks = (payload[start:start + chunk_size] for start in range(0, len(payload), chunk_size))
+        elements = iter_json_array(chunks, "elements")
+        assert not isinstance(elements, list)
+        assert list(elements) == some_way_elements
+
+    with pytest.raises(ErrorJsonStream):
+        list(iter_json_array([payload[:100]], "elements"))
+
+
+
+def test_stream_a_large_element_is_not_decoded_on_each_chunk(monkeypatch):
+    payload = json.dumps({"elements": [{"tags": {"note": "x" * 100000}}, 1]}).encode("utf-8")
+    chunks = (payload[start:start + 16] for start in range(0, len(payload), 16))
+    raw_decode = json.JSONDecoder.raw_decode
+    decodings = []
+
+    def count_raw_decode(decoder, *args):
+        decodings.append(args[1])
+        return raw_decode(decoder, *args)
+
+    monkeypatch.setattr(json.JSONDecoder, "raw_decode", count_raw_decode)
+    assert list(iter_json_array(chunks, "elements")) == [{"tags": {"note": "x" * 100000}}, 1]
+    assert len(decodings) < 30  # about log2(6250 chunks) decodings, not one by chunk
+
+def test_overpass_data_builder_from_a_stream(some_way_elements):
+    elements = (element for element in some_way_elements)
+    line_features = OverpassDataBuilder(elements).iter_line_features()
+
+    assert [feature["id"] for feature in line_features] == ["10", "11", "12"]
+    assert next(iter(elements), None) is None  # consumed once
@@ -0,0 +1,38 @@
+import pytest
+
+from benchmarks.bench_pipeline import compare, run_pipeline
+from benchmarks.synthetic import GENERATORS, grid_city, nodes_elements
+from osmrx.data_processing.overpass_data_builder import OverpassDataBuilder
+from osmrx.globals.queries import OsmFeatureModes
+
+
+def test_synthetic_grid_city_ways_share_their_crossings():
+    elements = grid_city(4, block_vertices=3)
+    assert len(elements) == 8
+    assert all(len(element["geometry"]) == 10 for element in elements)
+    # the first vertical way crosses each horizontal way on its first vertex
+    assert [elements[4]["geometry"][row * 3] for row in range(4)] == [
+        elements[row]["geometry"][0] for row in range(4)]
+
+    line_features = OverpassDataBuilder(elements + nodes_elements(elements, 3)).line_features()
+    assert len(line_features) == 8
+
+
+@pytest.mark.parametrize("network, scale", [("grid", 6), ("planar", 60), ("rural", 5)])
+def test_pipeline_benchmark(network, scale):
+    results = run_pipeline(network, scale, OsmFeatureModes.vehicle, nb_connected_nodes=3, nb_routes=3,
+                           nb_isochrones=2)
+    assert list(results["stages"]) == [
+        "overpass_data_builder", "topology_cleaner", "network_build", "shortest_paths", "isochrones"]
+    assert all({"seconds", "peak_mb"} == set(measures) for measures in results["stages"].values())
+    assert results["data"]["graph_edges"] > 0
+
+    assert compare(results, results, tolerance=0.0) == []
+    baseline = {**results, "stages": {stage: {name: value / 2 for name, value in measures.items()}
+                                      for stage, measures in results["stages"].items()}}
+    assert len(compare(results, baseline, tolerance=0.5)) > 0
+
+
+def test_synthetic_generators_are_reproducible():
+    for generator in GENERATORS.values():
+        assert generator(5, seed=1) == generator(5, seed=1)
@@ -0,0 +1,211 @@
+import os
+import time
+
+import pytest
+
+from osmrx.apis_handler.core import ApiCore, ErrorCacheMiss
+from osmrx.apis_handler.models import Bbox
+from osmrx.apis_handler.nominatim import NominatimApi
+from osmrx.apis_handler.overpass import OverpassApi
+from osmrx.apis_handler.query_builder import QueryBuilder
+from osmrx.apis_handler.response_cache import ResponseCache
+from osmrx.globals.queries import OsmFeatureModes
+from osmrx.helpers.cache import DiskCache
+from osmrx.helpers.logger import Logger
+from osmrx.main.roads import GraphSession, Roads
+from osmrx.network.graph_cache import GraphCache
+from osmrx.network.network_rx import OsmNetworkManager
+from osmrx.network.speed_profile import SpeedProfile
+
+
+def test_disk_cache(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    key = cache.build_key("a", 1)
+
+    assert key == cache.build_key("a", 1)
+    assert key not in cache
+    assert cache.get(key) is None
+
+    cache.set(key, {"value": [1, 2]})
+    assert key in cache
+    assert cache.get(key) == {"value": [1, 2]}
+
+    cache.delete(key)
+    assert cache.get(key, "missing") == "missing"
+
+
+def test_disk_cache_ttl(tmp_path):
+    cache = DiskCache(str(tmp_path), ttl=60)
+    cache.set("old", 1)
+    cache.set("new", 2)
+    # age the first value
+    old_time = time.time() - 120
+    os.utime(os.path.join(str(tmp_path), "old.pkl"), (old_time, old_time))
+
+    assert cache.get("old") is None
+    assert cache.get("new") == 2
+    assert not os.path.exists(os.path.join(str(tmp_path), "old.pkl"))
+
+
+def test_disk_cache_lru_eviction(tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=2500)
+    cache.set("first", b"0" * 1000)
+    cache.set("second", b"0" * 1000)
+    # read the first value: the second one become the least recently used
+    first_time = time.time() + 10
+    os.utime(os.path.join(str(tmp_path), "first.pkl"), (first_time, first_time))
+
+    cache.set("third", b"0" * 1000)
+    assert "first" in cache
+    assert "second" not in cache
+    assert "third" in cache
+
+
+def test_graph_cache(tmp_path, some_line_features, some_point_features):
+    graph_cache = GraphCache(str(tmp_path))
+    network = OsmNetworkManager(OsmFeatureModes.vehicle)
+    network.connected_nodes = some_point_features
+    network.line_features = some_line_features
+    graph_cache.set_graph(OsmFeatureModes.vehicle, "query", some_point_features, network.dump_state())
+
+    assert graph_cache.get_graph(OsmFeatureModes.pedestrian, "query", some_point_features) is None
+    assert graph_cache.get_graph(OsmFeatureModes.vehicle, "query", None) is None
+
+    network_loaded = OsmNetworkManager(OsmFeatureModes.vehicle)
+    network_loaded.load_state(graph_cache.get_graph(OsmFeatureModes.vehicle, "query", some_point_features[::-1]))
+    assert network_loaded.graph.num_edges() == network.graph.num_edges()
+    assert [feature.topo_uuid for feature in network_loaded.features] == [
+        feature.topo_uuid for feature in network.features]
+
+    from_node, to_node = some_point_features[3]["geometry"], some_point_features[9]["geometry"]
+    path = network.compute_shortest_path(from_node, to_node)[0]
+    path_loaded = network_loaded.compute_shortest_path(from_node, to_node)[0]
+    assert path_loaded.path.equals(path.path)
+
+
+def test_graph_cache_key_on_the_speed_profile(tmp_path, some_line_features):
+    graph_cache = GraphCache(str(tmp_path))
+    network = OsmNetworkManager(OsmFeatureModes.vehicle)
+    network.line_features = some_line_features
+    graph_cache.set_graph(OsmFeatureModes.vehicle, "query", None, network.dump_state(), network.speed_profile)
+
+    assert graph_cache.get_graph(OsmFeatureModes.vehicle, "query", None, SpeedProfile.from_mode(
+        OsmFeatureModes.vehicle)) is not None
+    # the travel times stored were computed with other speeds
+    custom_speed_profile = SpeedProfile({"residential": 20}, 20)
+    assert graph_cache.get_graph(OsmFeatureModes.vehicle, "query", None, custom_speed_profile) is None
+    assert graph_cache.get_graph(OsmFeatureModes.vehicle, "query", None) is None
+
+
+def test_graph_cache_keeps_the_contraction_hierarchy(tmp_path, some_line_features, some_point_features):
+    graph_cache = GraphCache(str(tmp_path))
+    network = OsmNetworkManager(OsmFeatureModes.vehicle)
+    network.connected_nodes = some_point_features
+    network.line_features = some_line_features
+    contraction_hierarchy = network.prepare_contraction_hierarchy("time")
+    graph_cache.set_graph(OsmFeatureModes.vehicle, "query", some_point_features, network.dump_state())
+
+    network_loaded = OsmNetworkManager(OsmFeatureModes.vehicle)
+    network_loaded.load_state(graph_cache.get_graph(OsmFeatureModes.vehicle, "query", some_point_features))
+    assert network_loaded.prepare_contraction_hierarchy("time").nb_shortcuts == contraction_hierarchy.nb_shortcuts
+
+    from_node, to_node = some_point_features[3]["geometry"], some_point_features[9]["geometry"]
+    path = network.compute_shortest_path(from_node, to_node, "time")[0]
+    path_loaded = network_loaded.compute_shortest_path(from_node, to_node, "time", "contraction")[0]
+    assert path_loaded.path.equals(path.path)
+
+
+def test_roads_warm_start_from_graph_cache(tmp_path, vehicle_mode, bbox_values, some_line_features):
+    graph_cache = GraphCache(str(tmp_path))
+    network = OsmNetworkManager(OsmFeatureModes.vehicle)
+    network.line_features = some_line_features
+    query = QueryBuilder(OsmFeatureModes.vehicle).from_geo_filter(Bbox(*bbox_values))
+    graph_cache.set_graph(OsmFeatureModes.vehicle, query, None, network.dump_state(), network.speed_profile)
+
+    roads_object = Roads(vehicle_mode, graph_cache=graph_cache)
+    roads_object.from_bbox(bbox_values)  # no overpass query: the graph is loaded from the cache
+
+    assert roads_object.query == query
+    assert len(roads_object.data) == len(network.features)
+    assert roads_object.graph.num_edges() == network.graph.num_edges()
+
+
+def test_graph_session_from_graph_cache(tmp_path, vehicle_mode, bbox_values, some_line_features,
+                                        some_point_features):
+    graph_cache = GraphCache(str(tmp_path))
+    network = OsmNetworkManager(OsmFeatureModes.vehicle)
+    network.line_features = some_line_features
+    query = QueryBuilder(OsmFeatureModes.vehicle).from_geo_filter(Bbox(*bbox_values))
+    graph_cache.set_graph(OsmFeatureModes.vehicle, query, None, network.dump_state(), network.speed_profile)
+
+    session = GraphSession(vehicle_mode, graph_cache=graph_cache)
+    session.from_bbox(bbox_values)  # loaded once, then queried without any rebuild
+    points = [feature["geometry"] for feature in some_point_features]
+
+    nodes = session.snap(points)
+    assert all(node in network.graph.nodes() for node in nodes)
+    assert session.snap([nodes[0]]) == [nodes[0]]
+
+    for from_point, to_point in zip(points, points[1:]):
+        paths = list(session.get_shortest_path([from_point, to_point]))
+        expected_paths = network.compute_shortest_path(*session.snap([from_point, to_point]))
+        assert len(paths) == len(expected_paths)
+        assert all(path.path.equals(expected.path) for path, expected in zip(paths, expected_paths))
+
+    isochrones = session.isochrones_from_distance(points[3], [0, 50, 100])
+    assert len(isochrones.data) == 2
+
+    paths = list(session.get_shortest_path(points[:2], snap_on_edges=True))
+    assert len(paths) == 1
+    path_features = paths[0].features()
+    assert path_features[0]["topo_status"] == path_features[-1]["topo_status"] == "virtual"
+    assert session.graph.num_edges() == network.graph.num_edges()
+
+
+def test_response_cache(tmp_path):
+    response_cache = ResponseCache(str(tmp_path), memory_items=1)
+    response_cache.set("url", {"a": 1, "b": 2}, {"elements": [1]})
+    response_cache.set("url", {"a": 2}, {"elements": [2]})
+
+    assert response_cache.get("url", {"b": 2, "a": 1}) == {"elements": [1]}  # from the disk
+    assert response_cache.get("url", {"a": 2}) == {"elements": [2]}
+    assert response_cache.get("other_url", {"a": 2}) is None
+
+    memory_cache = ResponseCache(None, ttl=0)
+    memory_cache.set("url", {}, {"elements": []})
+    time.sleep(0.01)
+    assert memory_cache.get("url", {}) is None
+
+
+
+def test_response_cache_ttl_from_the_disk(tmp_path):
+    response_cache = ResponseCache(str(tmp_path), ttl=2, memory_items=1)
+    response_cache.set("url", {"a": 1}, {"elements": [1]})
+    response_cache.set("url", {"a": 2}, {"elements": [2]})
+    # age the first response on the disk, then read it back in memory
+    disk_path = os.path.join(str(tmp_path), f"{response_cache.build_key('url', {'a': 1})}.pkl")
+    old_time = time.time() - 1.5
+    os.utime(disk_path, (old_time, old_time))
+    assert response_cache.get("url", {"a": 1}) == {"elements": [1]}
+
+    os.remove(disk_path)
+    time.sleep(0.6)
+    assert response_cache.get("url", {"a": 1}) is None  # expired in memory too
+
+def test_apis_with_an_offline_response_cache(tmp_path):
+    response_cache = ResponseCache(str(tmp_path), offline=True)
+    overpass_api = OverpassApi(Logger().logger, response_cache=response_cache)
+
+    with pytest.raises(ErrorCacheMiss):
+        overpass_api.query("node(1);out;")
+
+    response_cache.set("https://www.overpass-api.de/api/interpreter", {"data": "[out:json];node(1);out;"},
+                       {"elements": [{"type": "node", "id": 1, "lat": 46.0, "lon": 4.0}]})
+    assert overpass_api.query("node(1);out;")["elements"][0]["id"] == 1
+
+    ApiCore.set_response_cache(response_cache)
+    try:
+        with pytest.raises(ErrorCacheMiss):
+            NominatimApi(Logger().logger, q="roanne", limit=1)
+    finally:
+        ApiCore.set_response_cache(None)
@@ -1,11 +1,19 @@
+import copy
+
+import numpy as np
+
+from osmrx.topology.intersections import IntersectionIndex, first_intersections_mask, split_way_ranges, \
+    split_ways_ranges
 from osmrx.topology.checker import TopologyChecker
+from osmrx.topology import cleaner
+from osmrx.topology.cleaner import project_points_on_line, snap_points_on_line
 from tests.common.geom_builder import build_network_features
 
 
 def test_connect_lines(some_line_features, some_point_features):
     features = build_network_features(some_line_features, some_point_features, None)
 
-    assert len(features) == 21
+    assert len(features) == 19
 
     all_uuid = [feature.topo_uuid for feature in features]
     # check duplicated
@@ -13,7 +21,6 @@ def test_connect_lines(some_line_features, some_point_features):
     assert sorted(all_uuid) == sorted(['11_0_forward',
                                        '11_1_forward',
                                        '11_2_forward',
-                                       '11_3_forward',
                                        '12_forward',
                                        '1_0_forward',
                                        '1_1_forward',
@@ -23,7 +30,6 @@ def test_connect_lines(some_line_features, some_point_features):
                                        '1_5_forward',
                                        '1_6_forward',
                                        '1_7_forward',
-                                       '1_8_forward',
                                        'added_1_forward',
                                        'added_2_forward',
                                        'added_3_forward',
@@ -46,7 +52,7 @@ def test_connect_lines(some_line_features, some_point_features):
 def test_connect_lines_interpolate_lines(some_line_features, some_point_features):
     features = build_network_features(some_line_features, some_point_features, 4)
 
-    assert len(features) == 178
+    assert len(features) == 134
 
     all_uuid = [feature.topo_uuid for feature in features]
 
@@ -68,7 +74,71 @@ def test_topology(some_line_features, some_point_features):
     features = build_network_features(some_line_features, some_point_features, None)
 
     topology = TopologyChecker(features, False)
-    assert len(topology.intersections_added) == 26
-    assert len(topology.lines_split) == 13
+    assert len(topology.intersections_added) == 22
+    assert len(topology.lines_split) == 11
     assert len(topology.lines_unchanged) == 1
     assert len(topology.nodes_added) == 7
+
+
+def test_intersection_index(some_line_features):
+    ways = [feature["geometry"].coords[:] for feature in some_line_features]
+    intersections = IntersectionIndex.from_ways(ways)
+
+    assert len(intersections) == 1
+    assert intersections.contains(ways[0]).tolist() == [False, False, True]
+    assert intersections.contains(ways[1]).tolist() == [True, False, False, False, False, False]
+    assert not intersections.contains(ways[2]).any()
+    assert intersections.contains([]).size == 0
+
+
+def test_connect_lines_on_processes(some_line_features, some_point_features):
+    features = build_network_features(copy.deepcopy(some_line_features), copy.deepcopy(some_point_features), 4)
+    features_on_processes = build_network_features(some_line_features, some_point_features, 4, workers=2)
+
+    assert [feature.topo_uuid for feature in features_on_processes] == [feature.topo_uuid for feature in features]
+    assert all(
+        feature_on_process.geometry.equals(feature.geometry) and feature_on_process.attributes == feature.attributes
+        for feature_on_process, feature in zip(features_on_processes, features)
+    )
+
+
+def test_split_ways_ranges():
+    is_intersection = np.array([0, 0, 1, 0, 1, 1, 0, 1, 1, 0], dtype=bool)
+    ranges = split_ways_ranges(is_intersection, np.array([0, 4, 6, 10]))
+    # the first and last vertices of a way do not split it
+    assert ranges.tolist() == [[0, 2], [2, 3], [4, 5], [6, 7], [7, 8], [8, 9]]
+
+    assert split_way_ranges(np.array([False, False, False])).tolist() == [[0, 2]]
+    assert split_way_ranges(np.array([], dtype=bool)).tolist() == []
+
+
+def test_first_intersections_mask():
+    keys = np.array([1, 2, 3, 2, 1, 5, 6, 5, 6, 5], dtype=np.uint64)
+    is_intersection = np.array([1, 1, 0, 1, 1, 1, 1, 1, 1, 1], dtype=bool)
+    mask = first_intersections_mask(keys, is_intersection, np.array([0, 5, 10]))
+    # once by way and by key, the first and last vertices are ignored
+    assert np.flatnonzero(mask).tolist() == [1, 6, 7]
+
+
+def test_snap_points_on_line():
+    line = np.array([(0.0, 0.0), (1.0, 0.0), (2.0, 0.0)])
+    points = np.array([(1.5, 1.0), (0.5, -1.0), (1.0, 1.0), (-1.0, 0.0), (1.5, -2.0)])
+
+    line_coordinates, end_points = snap_points_on_line(line, points)
+
+    # one vertex by projection, ordered along the line, the existing vertices are reused
+    assert line_coordinates == [(0.0, 0.0), (0.5, 0.0), (1.0, 0.0), (1.5, 0.0), (2.0, 0.0)]
+    assert end_points == [(1.5, 0.0), (0.5, 0.0), (1.0, 0.0), (0.0, 0.0), (1.5, 0.0)]
+
+
+def test_project_points_on_line_by_chunks(monkeypatch):
+    rng = np.random.default_rng(0)
+    line = np.cumsum(rng.random((50, 2)), axis=0)
+    points = rng.random((1000, 2)) * line.max(axis=0)
+    segments_indices, positions = project_points_on_line(line, points)
+
+    # the (points, segments) matrices are bounded: the points are projected by chunks of 3
+    monkeypatch.setattr(cleaner, "PROJECTION_MAX_MATRIX_SIZE", 150)
+    chunked_segments_indices, chunked_positions = project_points_on_line(line, points)
+    assert np.array_equal(chunked_segments_indices, segments_indices)
+    assert np.array_equal(chunked_positions, positions)
@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+from osmrx.apis_handler.overpass import OverpassApi
+from osmrx.apis_handler.response_cache import ResponseCache
+from osmrx.data_processing.overpass_data_builder import OverpassDataBuilder
+from osmrx.globals.queries import OsmFeatureModes
+from osmrx.helpers.instrumentation import (CallbackSink, Instrumentation, JsonLogSink, PrometheusSink,
+                                           StageMeasure)
+from osmrx.helpers.logger import Logger
+from osmrx.network.network_rx import OsmNetworkManager
+
+
+@pytest.fixture
+def measures():
+    measures_found = []
+    sink = CallbackSink(measures_found.append)
+    Instrumentation.shared().add_sink(sink)
+    yield measures_found
+    Instrumentation.shared().remove_sink(sink)
+
+
+def test_graph_build_stages(measures, some_line_features, some_point_features):
+    network = OsmNetworkManager(OsmFeatureModes.vehicle)
+    network.connected_nodes = some_point_features
+    network.line_features = some_line_features
+    network.compute_shortest_path(some_point_features[3]["geometry"], some_point_features[9]["geometry"])
+
+    measures_by_stage = {measure.stage: measure for measure in measures}
+    assert list(measures_by_stage) == ["topology.prepare", "topology.snap", "topology.intersections",
+                                       "topology.lines", "graph.build", "query.shortest_path"]
+    assert all(measure.seconds >= 0 for measure in measures)
+    assert measures_by_stage["topology.prepare"].counts["ways"] == len(some_line_features)
+    assert measures_by_stage["topology.snap"].counts["nodes_added"] == len(some_point_features)
+    nearest_lines = {
+        min(range(len(some_line_features)), key=lambda position: some_line_features[position]["geometry"].distance(
+            point_feature["geometry"]))
+        for point_feature in some_point_features
+    }
+    assert measures_by_stage["topology.snap"].counts["lines_split"] == len(nearest_lines) < len(some_line_features)
+    assert measures_by_stage["graph.build"].counts["edges"] == network.graph.num_edges()
+    assert measures_by_stage["graph.build"].counts["nodes"] == network.graph.num_nodes()
+    assert measures_by_stage["query.shortest_path"].labels == {"algorithm": "dijkstra", "weight": "length"}
+    assert measures_by_stage["query.shortest_path"].counts["paths"] == 1
+
+
+def test_data_stage_on_streamed_features(measures, some_way_elements):
+    # the features streamed to the topology cleaning (see OsmNetworkRoads) are measured
+    line_features = OverpassDataBuilder(some_way_elements).iter_line_features()
+    assert measures == []
+    assert len(list(line_features)) == len(some_way_elements)
+
+    assert [measure.stage for measure in measures] == ["data.line_features"]
+    assert measures[0].counts == {
+        "ways": len(some_way_elements),
+        "vertices": sum(len(element["geometry"]) for element in some_way_elements),
+    }
+
+
+def test_api_query_stage(measures, tmp_path):
+    response_cache = ResponseCache(str(tmp_path), offline=True)
+    api = OverpassApi(Logger(logger_level="warning").logger, response_cache=response_cache)
+    response_cache.set("https://www.overpass-api.de/api/interpreter", {"data": "[out:json];query"}, {"elements": []})
+    api.query("query")
+
+    assert [measure.stage for measure in measures] == ["api.query"]
+    assert measures[0].labels == {"api": "OverpassApi"}
+    assert measures[0].counts == {"cache_hits": 1}
+
+
+def test_failed_stage(measures):
+    with pytest.raises(ValueError):
+        with Instrumentation.shared().stage("failing"):
+            raise ValueError("failed")
+    assert measures[0].counts == {"failed": 1}
+
+
+def test_json_log_sink(tmp_path):
+    log_path = tmp_path / "stages.jsonl"
+    sink = JsonLogSink(str(log_path))
+    for value in [1, 2]:
+        measure = StageMeasure("graph.build", {"directed": "True"})
+        measure.count("edges", value)
+        measure.stop()
+        sink.emit(measure)
+
+    lines = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert [line["counts"]["edges"] for line in lines] == [1, 2]
+    assert {"timestamp", "stage", "labels", "seconds", "counts"} == set(lines[0])
+
+
+def test_prometheus_sink(tmp_path):
+    metrics_path = tmp_path / "osmrx.prom"
+    sink = PrometheusSink(str(metrics_path), flush_interval=60)
+    for value in [3, 4]:
+        measure = StageMeasure("api.request", {"api": 'Overpass"Api'})
+        measure.count("bytes", value)
+        measure.stop()
+        sink.emit(measure)
+
+    assert not metrics_path.exists()  # written on the flush interval
+    sink.close()
+    metrics = metrics_path.read_text().splitlines()
+    assert "# TYPE osmrx_stage_seconds_total counter" in metrics
+    assert 'osmrx_stage_calls_total{stage="api.request",api="Overpass\\"Api"} 2' in metrics
+    assert 'osmrx_stage_items_total{stage="api.request",api="Overpass\\"Api",item="bytes"} 7' in metrics
+
+
+def test_prometheus_sink_flush_interval(tmp_path):
+    metrics_path = tmp_path / "osmrx.prom"
+    sink = PrometheusSink(str(metrics_path), flush_interval=0)
+    measure = StageMeasure("graph.build", {})
+    measure.stop()
+    sink.emit(measure)
+
+    assert 'osmrx_stage_calls_total{stage="graph.build"} 1' in metrics_path.read_text().splitlines()
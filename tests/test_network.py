@@ -1,11 +1,20 @@
 from typing import List, Dict
 
+import numpy as np
 import pytest
 
 import rustworkx as rx
+from pyproj import Geod
+from scipy.sparse.csgraph import dijkstra
+from shapely import Point
+from shapely.ops import linemerge
 
 from osmrx.globals.queries import OsmFeatureModes
-from osmrx.network.network_rx import OsmNetworkManager, NetworkRxCore
+from osmrx.network.isochrones_feature import IsochronesFeature
+from osmrx.network.network_rx import GraphCore, OsmNetworkManager, NetworkRxCore
+from osmrx.network.nodes_index import NodesIndex
+from osmrx.network.path_feature import PathFeature
+from osmrx.network.speed_profile import SpeedProfile
 from osmrx.helpers.logger import Logger
 
 from tests.common.geom_builder import build_network_features
@@ -43,7 +52,7 @@ def test_vehicle_graph_building(some_line_features, some_point_features):
     assert len(osm_network_rx.connected_nodes) == len(some_point_features)
     assert osm_network_rx.directed
     assert isinstance(osm_network_rx.graph, rx.PyDiGraph)
-    assert len(osm_network_rx.graph.edge_list()) == 36
+    assert len(osm_network_rx.graph.edge_list()) == 34
 
     assert len(osm_network_rx.graph.nodes()) == 21
     assert len(set(osm_network_rx.graph.nodes())) == 21
@@ -73,7 +82,7 @@ def test_build_undirected_graph_network_from_external_data(some_line_features, s
     assert len(network_rx.connected_nodes) == len(some_point_features)
     assert not network_rx.directed
     assert isinstance(network_rx.graph, rx.PyGraph)
-    assert len(network_rx.graph.edge_list()) == 21
+    assert len(network_rx.graph.edge_list()) == 19
 
     assert len(network_rx.graph.nodes()) == 21
     assert len(set(network_rx.graph.nodes())) == 21
@@ -87,7 +96,331 @@ def test_build_directed_graph_network_from_external_data(some_line_features, som
     assert len(network_rx.connected_nodes) == len(some_point_features)
     assert network_rx.directed
     assert isinstance(network_rx.graph, rx.PyDiGraph)
-    assert len(network_rx.graph.edge_list()) == 21
+    assert len(network_rx.graph.edge_list()) == 19
 
     assert len(network_rx.graph.nodes()) == 21
     assert len(set(network_rx.graph.nodes())) == 21
+
+
+def test_edges_weights_are_precomputed(some_line_features, some_point_features):
+    osm_network_rx = OsmNetworkManager(OsmFeatureModes.vehicle)
+    osm_network_rx.connected_nodes = some_point_features
+    osm_network_rx.line_features = some_line_features
+
+    weighted_graph = osm_network_rx.weighted_graph
+    assert weighted_graph.nnz == osm_network_rx.graph.num_edges()
+    for (from_indice, to_indice), edge in zip(osm_network_rx.graph.edge_list(), osm_network_rx.graph.edges()):
+        expected_length = Geod(ellps="WGS84").geometry_length(edge.geometry)
+        assert weighted_graph[from_indice, to_indice] == pytest.approx(expected_length)
+
+
+def test_compute_isochrone_from_distance(some_line_features, some_point_features):
+    osm_network_rx = OsmNetworkManager(OsmFeatureModes.pedestrian)
+    osm_network_rx.connected_nodes = some_point_features
+    osm_network_rx.line_features = some_line_features
+
+    from_node = some_point_features[3]["geometry"]
+    isochrones = osm_network_rx.compute_isochrone_from_distance(from_node, [0, 50, 100, 300])
+
+    assert osm_network_rx.nodes_coordinates.shape == (len(osm_network_rx.graph.nodes()), 2)
+    assert [isochrone["distance"] for isochrone in isochrones.data] == ["100 to 300", "50 to 100", "0 to 50"]
+    assert isochrones.data[-1]["geometry"].intersects(from_node)
+    assert all(not isochrone["geometry"].is_empty for isochrone in isochrones.data)
+
+    # built from the graph and the rustworkx lengths
+    from_node_indice = osm_network_rx.get_node_indice(from_node)
+    isochrones_from_graph = IsochronesFeature(from_node)
+    isochrones_from_graph.from_distances([0, 50, 100, 300])
+    isochrones_from_graph.build(osm_network_rx.graph, rx.dijkstra_shortest_path_lengths(
+        osm_network_rx.graph, from_node_indice, lambda edge: edge.length))
+    assert all(isochrone_from_graph["geometry"].equals(isochrone["geometry"])
+               for isochrone_from_graph, isochrone in zip(isochrones_from_graph.data, isochrones.data))
+
+
+def test_compute_distances_within(some_line_features, some_point_features):
+    osm_network_rx = OsmNetworkManager(OsmFeatureModes.pedestrian)
+    osm_network_rx.connected_nodes = some_point_features
+    osm_network_rx.line_features = some_line_features
+
+    from_node = some_point_features[3]["geometry"]
+    all_distances = osm_network_rx.compute_distances_within(from_node, float("inf"))
+    distances = osm_network_rx.compute_distances_within(from_node, 100)
+
+    assert distances[osm_network_rx.get_node_indice(from_node)] == 0
+    assert 1 < len(distances) < len(all_distances)
+    assert distances == {indice: distance for indice, distance in all_distances.items() if distance <= 100}
+
+
+def test_undirected_search_graph(some_line_features, some_point_features):
+    osm_network_rx = OsmNetworkManager(OsmFeatureModes.pedestrian)
+    osm_network_rx.connected_nodes = some_point_features
+    osm_network_rx.line_features = some_line_features
+
+    weighted_graph = osm_network_rx.get_weighted_graph("length")
+    search_graph = osm_network_rx._search_graph("length")
+    assert search_graph is osm_network_rx._search_graph("length")
+    assert (search_graph != search_graph.T).nnz == 0
+
+    from_indice = osm_network_rx.get_node_indice(some_point_features[3]["geometry"])
+    expected = dijkstra(weighted_graph, directed=False, indices=from_indice)
+    np.testing.assert_array_equal(osm_network_rx._dijkstra(from_indice), expected)
+
+
+def test_speed_profile():
+    speed_profile = SpeedProfile.from_mode(OsmFeatureModes.vehicle)
+
+    assert speed_profile.speed({"highway": "motorway"}) == 110
+    assert speed_profile.speed({"highway": "residential", "maxspeed": "50"}) == 50
+    assert speed_profile.speed({"highway": "residential", "maxspeed": "30 mph"}) == pytest.approx(48.28, rel=1e-3)
+    assert speed_profile.speed({"highway": "residential", "maxspeed": "FR:urban"}) == 30
+    assert speed_profile.speed({"highway": "residential", "maxspeed": "none"}) == 30
+    assert speed_profile.speed({"highway": "unknown"}) == 30
+    # the tagged speeds can be above the highway ones, up to a cap
+    assert speed_profile.speed({"highway": "motorway", "maxspeed": "130"}) == 130
+    assert speed_profile.speed({"highway": "motorway", "maxspeed": "300"}) == 150
+    assert speed_profile.max_speed == 150
+    assert SpeedProfile.from_mode(OsmFeatureModes.pedestrian).max_speed == 5
+    assert SpeedProfile.from_mode(OsmFeatureModes.pedestrian).speed({"highway": "primary", "maxspeed": "50"}) == 5
+
+    travel_times = speed_profile.travel_times(np.array([100.0, 100.0]), [{"highway": "motorway"}, {}])
+    assert travel_times.tolist() == pytest.approx([100 / (110 / 3.6), 100 / (30 / 3.6)])
+
+
+def test_compute_travel_times(some_line_features, some_point_features):
+    osm_network_rx = OsmNetworkManager(OsmFeatureModes.pedestrian)
+    osm_network_rx.connected_nodes = some_point_features
+    osm_network_rx.line_features = some_line_features
+
+    times_graph = osm_network_rx.get_weighted_graph("time")
+    assert times_graph.nnz == osm_network_rx.graph.num_edges()
+    assert np.allclose(times_graph.data, osm_network_rx.weighted_graph.data / (5 / 3.6))
+
+    from_node, to_node = some_point_features[3]["geometry"], some_point_features[9]["geometry"]
+    fastest_paths = osm_network_rx.compute_shortest_path(from_node, to_node, "time")
+    shortest_paths = osm_network_rx.compute_shortest_path(from_node, to_node)
+    assert fastest_paths[0].path.equals(shortest_paths[0].path)
+
+    isochrones = osm_network_rx.compute_isochrone_from_time(from_node, [0, 1, 2])
+    assert [isochrone["time"] for isochrone in isochrones.data] == ["1 to 2", "0 to 1"]
+
+
+def test_travel_times_require_a_speed_profile(some_line_features, some_point_features):
+    network_rx = NetworkRxCore(directed=False)
+    network_rx.connected_nodes = some_point_features
+    network_rx.line_features = some_line_features
+
+    with pytest.raises(ValueError):
+        network_rx.get_weighted_graph("time")
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_distance_matrix(some_line_features, some_point_features, workers):
+    osm_network_rx = OsmNetworkManager(OsmFeatureModes.vehicle)
+    osm_network_rx.connected_nodes = some_point_features
+    osm_network_rx.line_features = some_line_features
+
+    nodes = [feature["geometry"] for feature in some_point_features]
+    matrix = osm_network_rx.distance_matrix(nodes[:4], nodes, workers=workers)
+
+    assert matrix.shape == (4, len(nodes))
+    for origin_position, origin in enumerate(nodes[:4]):
+        for destination_position, destination in enumerate(nodes):
+            paths = osm_network_rx.compute_shortest_path(origin, destination)
+            expected = Geod(ellps="WGS84").geometry_length(paths[0].path) if paths else None
+            if origin == destination:
+                assert matrix[origin_position, destination_position] == 0
+            elif expected is None:
+                assert np.isinf(matrix[origin_position, destination_position])
+            else:
+                assert matrix[origin_position, destination_position] == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("mode", [OsmFeatureModes.vehicle, OsmFeatureModes.pedestrian])
+@pytest.mark.parametrize("weight", ["length", "time"])
+@pytest.mark.parametrize("algorithm", ["astar", "bidirectional", "contraction"])
+def test_compute_shortest_path_algorithms(some_line_features, some_point_features, mode, weight, algorithm):
+    osm_network_rx = OsmNetworkManager(mode)
+    osm_network_rx.connected_nodes = some_point_features
+    osm_network_rx.line_features = some_line_features
+
+    nodes = [feature["geometry"] for feature in some_point_features]
+    costs = osm_network_rx.distance_matrix(nodes, nodes, weight=weight)
+    for from_position, from_node in enumerate(nodes):
+        for to_position, to_node in enumerate(nodes):
+            paths = osm_network_rx.compute_shortest_path(from_node, to_node, weight, algorithm)
+            if from_node == to_node or np.isinf(costs[from_position, to_position]):
+                assert paths == []
+                continue
+
+            path_edges = paths[0]._build_features()
+            path_cost = sum(edge.length if weight == "length" else edge.travel_time for edge in path_edges)
+            assert path_cost == pytest.approx(costs[from_position, to_position])
+            assert paths[0].path.intersects(from_node) and paths[0].path.intersects(to_node)
+
+
+def test_compute_shortest_path_unknown_algorithm(some_line_features, some_point_features):
+    osm_network_rx = OsmNetworkManager(OsmFeatureModes.pedestrian)
+    osm_network_rx.connected_nodes = some_point_features
+    osm_network_rx.line_features = some_line_features
+
+    with pytest.raises(ValueError):
+        osm_network_rx.compute_shortest_path(some_point_features[3]["geometry"], some_point_features[9]["geometry"],
+                                             algorithm="unknown")
+
+
+@pytest.mark.parametrize("mode", [OsmFeatureModes.vehicle, OsmFeatureModes.pedestrian])
+def test_virtual_nodes(some_line_features, some_point_features, mode):
+    osm_network_rx = OsmNetworkManager(mode)
+    osm_network_rx.line_features = some_line_features
+    nb_nodes, nb_edges = osm_network_rx.graph.num_nodes(), osm_network_rx.graph.num_edges()
+    weighted_graph = osm_network_rx.weighted_graph
+
+    points = [feature["geometry"] for feature in some_point_features]
+    with osm_network_rx.virtual_nodes(points) as virtual_nodes:
+        assert len(virtual_nodes) == len(points)
+        assert osm_network_rx.graph.num_nodes() > nb_nodes
+        assert all(
+            virtual_node.distance(point) == pytest.approx(
+                min(edge.geometry.distance(point) for edge in osm_network_rx.features))
+            for point, virtual_node in zip(points, virtual_nodes)
+        )
+
+        costs = osm_network_rx.distance_matrix(virtual_nodes, virtual_nodes)
+        for from_position, from_node in enumerate(virtual_nodes):
+            for to_position, to_node in enumerate(virtual_nodes):
+                paths = osm_network_rx.compute_shortest_path(from_node, to_node, algorithm="astar")
+                if paths:
+                    path_edges = paths[0]._build_features()
+                    assert sum(edge.length for edge in path_edges) == pytest.approx(costs[from_position, to_position])
+                    assert paths[0].path.intersects(from_node) and paths[0].path.intersects(to_node)
+
+    assert osm_network_rx.graph.num_nodes() == nb_nodes
+    assert osm_network_rx.graph.num_edges() == nb_edges
+    assert osm_network_rx.weighted_graph is weighted_graph
+    assert all(edge.topo_status != "virtual" for edge in osm_network_rx.graph.edges())
+
+
+def test_virtual_nodes_on_the_same_edge(some_line_features):
+    network_rx = NetworkRxCore(directed=False)
+    network_rx.line_features = some_line_features
+    edge = network_rx.features[0]
+    points = [edge.geometry.interpolate(0.25, normalized=True), edge.geometry.interpolate(0.75, normalized=True)]
+
+    with network_rx.virtual_nodes(points) as virtual_nodes:
+        paths = network_rx.compute_shortest_path(*virtual_nodes)
+        path_length = sum(path_edge.length for path_edge in paths[0]._build_features())
+        assert len(paths[0]._build_features()) == 1
+        # the points are interpolated on the planar coordinates: the geodesic half is close
+        assert path_length == pytest.approx(edge.length / 2, rel=1e-2)
+
+
+def test_paths_stay_valid_once_the_virtual_nodes_removed(some_line_features, some_point_features):
+    network_rx = NetworkRxCore(directed=False)
+    network_rx.line_features = some_line_features
+    points = [feature["geometry"] for feature in some_point_features]
+
+    with network_rx.virtual_nodes(points[:2]) as virtual_nodes:
+        expected_geometry = network_rx.compute_shortest_path(*virtual_nodes)[0].path
+        path = network_rx.compute_shortest_path(*virtual_nodes)[0]  # its edges are not read in the context
+    # other virtual edges reuse the indices of the removed ones
+    with network_rx.virtual_nodes(points[2:4]):
+        features = path.features()
+        assert path.path.equals(expected_geometry)
+    assert features[0]["geometry"].intersects(virtual_nodes[0])
+    assert features[-1]["geometry"].intersects(virtual_nodes[1])
+    assert path.path.equals(expected_geometry)
+
+
+def test_backward_edges_share_the_forward_edges_data(some_line_features):
+    osm_network_rx = OsmNetworkManager(OsmFeatureModes.vehicle)
+    osm_network_rx.line_features = some_line_features
+
+    edges = {edge.topo_uuid: edge for edge in osm_network_rx.graph.edges()}
+    backward_edges = [edge for edge in edges.values() if edge.direction == "backward"]
+    assert len(backward_edges) > 0
+    for backward_edge in backward_edges:
+        forward_edge = edges[backward_edge.topo_uuid.replace("_backward", "_forward")]
+        assert backward_edge.attributes is forward_edge.attributes
+        assert backward_edge._geometry is forward_edge._geometry
+        assert backward_edge.geometry.coords[:] == forward_edge.geometry.coords[::-1]
+        assert backward_edge.from_point == forward_edge.to_point
+        assert backward_edge.to_point == forward_edge.from_point
+        assert backward_edge.length == forward_edge.length
+
+
+def test_add_edges_in_bulk(some_line_features):
+    network_rx = NetworkRxCore(directed=True)
+    network_rx.line_features = some_line_features
+
+    bulk_network_rx = GraphCore(directed=True)
+    bulk_network_rx.add_edges(network_rx.features)
+    assert bulk_network_rx.graph.num_nodes() == network_rx.graph.num_nodes()
+    assert bulk_network_rx.graph.num_edges() == network_rx.graph.num_edges()
+    for edge in network_rx.features:
+        assert bulk_network_rx.get_node_indice(edge.from_point) == network_rx.get_node_indice(edge.from_point)
+        # the nodes are found at the OSM precision (1e-7 degree)
+        shifted_node = Point(edge.to_point.x + 1e-9, edge.to_point.y - 1e-9)
+        assert bulk_network_rx.get_node_indice(shifted_node) == network_rx.get_node_indice(edge.to_point)
+
+    with pytest.raises(ValueError):
+        bulk_network_rx.add_edges(network_rx.features[:1])
+
+
+def test_nearest_nodes(some_line_features, some_point_features):
+    network_rx = NetworkRxCore(directed=False)
+    network_rx.line_features = some_line_features
+    points = [feature["geometry"] for feature in some_point_features]
+
+    nodes = network_rx.nearest_nodes(points)
+    for point, node in zip(points, nodes):
+        assert node.distance(point) == min(graph_node.distance(point) for graph_node in network_rx.graph.nodes())
+    assert network_rx.nearest_node(nodes[0]) == nodes[0]
+
+    # the index is refreshed with the nodes added and removed
+    with network_rx.virtual_nodes(points) as virtual_nodes:
+        assert network_rx.nearest_nodes(virtual_nodes) == virtual_nodes
+    assert network_rx.nearest_nodes(points) == nodes
+
+
+def test_nodes_index_refresh():
+    rng = np.random.default_rng(0)
+    coordinates = rng.random((1000, 2)) + [4.0, 46.0]
+    nodes_index = NodesIndex(np.arange(500), coordinates[:500])
+    for start in range(500, 1000, 100):
+        nodes_index.add(np.arange(start, start + 100), coordinates[start:start + 100])
+    nodes_index.remove(np.arange(0, 1000, 7))
+    nodes_index.add([7], coordinates[7])  # an indice reused
+
+    kept = np.union1d(np.setdiff1d(np.arange(1000), np.arange(0, 1000, 7)), [7])
+    queries = rng.random((50, 2)) + [4.0, 46.0]
+    nodes_indices, _ = nodes_index.nearest(queries)
+    scale = np.array([np.cos(np.radians(coordinates[:500, 1].mean())), 1.0])
+    distances = np.linalg.norm((queries[:, np.newaxis] - coordinates[np.newaxis, kept]) * scale, axis=-1)
+    assert len(nodes_index) == len(kept)
+    assert nodes_indices.tolist() == kept[np.argmin(distances, axis=1)].tolist()
+
+
+@pytest.mark.parametrize("mode", [OsmFeatureModes.vehicle, OsmFeatureModes.pedestrian])
+def test_path_feature_arrays(some_line_features, mode):
+    osm_network_rx = OsmNetworkManager(mode)
+    osm_network_rx.line_features = some_line_features
+
+    nodes = osm_network_rx.graph.nodes()
+    for from_node, to_node in zip(nodes, nodes[::-1]):
+        for path in osm_network_rx.compute_shortest_path(from_node, to_node, "time"):
+            edges = path._build_features()
+            assert path.nodes_indices[0] == osm_network_rx.get_node_indice(from_node)
+            assert path.nodes_indices[-1] == osm_network_rx.get_node_indice(to_node)
+            assert len(path.edges_indices) == len(path.nodes_indices) - 1
+            assert path.length == pytest.approx(sum(edge.length for edge in edges))
+            assert path.cumulative_times[-1] == pytest.approx(sum(edge.travel_time for edge in edges))
+
+            # the coordinates are concatenated in the path direction
+            assert path.path.equals(linemerge([edge.geometry for edge in edges]))
+            assert path.path.coords[0] == from_node.coords[0]
+            assert path.path.coords[-1] == to_node.coords[0]
+
+            path_found = PathFeature(osm_network_rx.graph, path.nodes_indices)
+            assert path_found.edges_indices.tolist() == path.edges_indices.tolist()
+            assert path_found.path.equals(path.path)
+            assert path_found.length == pytest.approx(path.length)